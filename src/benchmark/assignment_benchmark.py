@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -*-
+"""
+python3 -m src.benchmark.assignment_benchmark
+python3 -m src.benchmark.assignment_benchmark --counts 100 500 2000 --crowding 0.5 2
+
+Compares the tracker assignment methods (Assigner: lapjv, sparse, greedy)
+on synthetic track/detection frames, for several detection counts and
+crowd levels. Tracks are boxes in a region sized so that each box overlaps
+about `crowding` others. Detections are the same boxes jittered, with
+misses and false positives. For each method it reports the time per
+match() call (cost computation included), the number of matched pairs and
+the agreement with the exact LAPJV matching: the share of the LAPJV pairs
+it reproduces, and its total cost above the optimum.
+"""
+
+import argparse
+
+import numpy as np
+
+from src.benchmark.hot_path_benchmark import time_call
+from src.modules.tracker.utils.assignment import Assigner
+from src.modules.tracker.utils.matching import pair_iou
+
+
+def random_frame(rng, count, crowding, box_size=60.0):
+    """(tracks, detections, scores): tlbr boxes of one crowded frame"""
+    # Region where `count` boxes overlap about `crowding` others each
+    side = box_size * np.sqrt(4 * count / max(crowding, 1e-3))
+    sizes = rng.uniform(0.6, 1.4, (count, 2)) * box_size
+    corners = rng.uniform(0, side, (count, 2))
+    tracks = np.concatenate([corners, corners + sizes], axis=1)
+
+    # Detections: jittered tracks, 10% missed, 10% false positives
+    seen = tracks[rng.random(count) > 0.1]
+    detections = seen + rng.normal(0, 0.08 * box_size, seen.shape)
+    false_count = count // 10
+    false_corners = rng.uniform(0, side, (false_count, 2))
+    false_boxes = np.concatenate([false_corners, false_corners + box_size], axis=1)
+    detections = np.concatenate([detections, false_boxes])
+    detections = detections[rng.permutation(len(detections))]
+    scores = rng.uniform(0.5, 1.0, len(detections))
+    return tracks, detections, scores
+
+
+def matching_cost(tracks, detections, matches):
+    if len(matches) == 0:
+        return 0.0
+    return float((1 - pair_iou(tracks, detections, matches[:, 0], matches[:, 1])).sum())
+
+
+def run(counts, crowding_levels, thresh=0.8, min_time=0.2, seed=0):
+    """{(count, crowding): {method: {"us", "matches", "agreement", "excess_cost"}}}"""
+    results = {}
+    for count in counts:
+        for crowding in crowding_levels:
+            rng = np.random.default_rng(seed)
+            tracks, detections, _ = random_frame(rng, count, crowding)
+
+            reference = None
+            results[(count, crowding)] = {}
+            for method in Assigner.METHODS:
+                assigner = Assigner(method)
+                matches, _, _ = assigner.match(tracks, detections, thresh)
+                if reference is None:
+                    reference = matches
+                    optimum = matching_cost(tracks, detections, matches)
+                reference_pairs = set(map(tuple, reference.tolist()))
+                same = len(reference_pairs & set(map(tuple, matches.tolist())))
+                # Leaving a pair unmatched costs thresh, as in the LAPJV extension
+                unmatched = len(reference) - len(matches)
+                cost = matching_cost(tracks, detections, matches) + unmatched * thresh
+                timing = time_call(lambda: assigner.match(tracks, detections, thresh), min_time)
+                results[(count, crowding)][method] = {
+                    "us": timing["min_us"],
+                    "matches": len(matches),
+                    "agreement": same / max(len(reference_pairs), 1),
+                    "excess_cost": cost - optimum,
+                }
+    return results
+
+
+def print_results(results):
+    methods = Assigner.METHODS
+    header = "".join(f"{name:>30}" for name in methods)
+    print(f"{'Detections':>10}{'Crowding':>10}{header}")
+    for (count, crowding), per_method in results.items():
+        cells = "".join(
+            f"{per_method[name]['us'] / 1000:>10.2f} ms {per_method[name]['agreement']:>7.2%}"
+            f" {per_method[name]['excess_cost']:>+8.3f}"
+            for name in methods
+        )
+        print(f"{count:>10}{crowding:>10}{cells}")
+    print("\n(time per call, share of the LAPJV pairs reproduced, cost above the optimum)")
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description="Tracker assignment comparison.")
+    parser.add_argument(
+        "--counts", nargs="+", type=int, default=[100, 500, 2000],
+        help="Tracks (and about as many detections) per frame",
+    )
+    parser.add_argument(
+        "--crowding", nargs="+", type=float, default=[0.5, 2.0],
+        help="Average number of boxes each box overlaps",
+    )
+    parser.add_argument("--thresh", type=float, default=0.8, help="Match threshold (1 - IoU)")
+    parser.add_argument("--min-time", type=float, default=0.2, help="Seconds per timing")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_arguments()
+    results = run(args.counts, args.crowding, args.thresh, args.min_time)
+    print_results(results)
+
+
+if __name__ == "__main__":
+    main()
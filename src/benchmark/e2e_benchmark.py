@@ -0,0 +1,447 @@
+# -*- coding: utf-8 -*-
+"""
+python3 -m src.benchmark.e2e_benchmark
+python3 -m src.benchmark.e2e_benchmark --models yolo11s --trackers bytetrack
+--frame-skip 1 2 --detections model --output Summary/benchmark_e2e.json
+python3 -m src.benchmark.e2e_benchmark --detections model --backends torch onnx
+python3 -m src.benchmark.e2e_benchmark --detections model --precisions fp32 int8
+python3 -m src.benchmark.e2e_benchmark --compare Summary/old.json Summary/new.json
+
+End-to-end benchmark over deterministic synthetic videos (see
+src/config/benchmark.yaml). Each scenario (resolution x density) is
+generated once with its counting lines and ground truth. Each
+scenario/model/backend/precision/tracker/frame_skip job then runs VideoProcessor in a fresh
+process, so the peak RSS belongs to that job only.
+
+Detections:
+- "oracle": the detection cache is filled with the ground-truth boxes and
+  the model is not loaded. The run works offline and measures decode,
+  tracking, counting, render and encode. Count accuracy then reflects the
+  tracker and counter.
+- "model": the detector runs on the synthetic frames (the weights must be
+  available locally). With several backends (torch, onnx) the same jobs
+  run with each, for a speed comparison. With int8 in the precisions, the
+  int8 jobs also report accuracy_delta_fp32: their count accuracy minus
+  the one of the same fp32 job. Oracle jobs run next to them, one per
+  scenario/tracker/frame_skip: no detector does better than the tracker
+  on the ground-truth boxes, so every model job reports that accuracy as
+  oracle_accuracy, its ceiling.
+
+The JSON output (sorted keys, one entry per job) holds throughput,
+per-frame latency percentiles, the per-stage breakdown, the startup
+(model load, warm-up, time to first frame), peak RSS and the count
+accuracy against ground truth. It is meant to be diffed between
+commits (--compare).
+"""
+
+import argparse
+import itertools
+import json
+import logging
+import os
+import resource
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+
+import numpy as np
+import torch
+
+from src.benchmark.benchmark_utils import environment, rounded
+from src.benchmark.synthetic_video import SyntheticVideo
+from src.config.config import ConfigManager
+from src.main import setup_logging
+from src.models.model_manager import ModelManager
+from src.modules.detector.detector_manager import DetectorManager
+from src.modules.utils.allowed_classes import AllowedClasses
+from src.modules.utils.detections import Detections
+
+
+def _run_job(job):
+    """Worker: one VideoProcessor run over a synthetic scenario"""
+    if job["cpu_only"]:
+        # Set before the first CUDA call of this (spawned) process
+        os.environ["CUDA_VISIBLE_DEVICES"] = ""
+    if job["threads"]:
+        torch.set_num_threads(job["threads"])
+    # Imported here, after the CUDA/threads settings
+    from src.modules.engine.video_processor import VideoProcessor
+
+    config = ConfigManager()
+    output_path = os.path.join(
+        job["work_dir"], "outputs",
+        f"{job['scenario']}_{job['model']}_{job['backend']}_{job['precision']}_"
+        f"{job['tracker']}_fs{job['frame_skip']}_{job['detections']}.mp4",
+    )
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    overrides = {
+        "video": {
+            "input_path": job["paths"]["video"],
+            "lines_path": job["paths"]["lines"],
+            "output_path": output_path,
+        },
+        "processor": {
+            "model": job["model"],
+            "tracker": job["tracker"],
+            "frame_skip": job["frame_skip"],
+            "enable_tracking": True,
+            "enable_counter": True,
+            "enable_display": False,
+            "enable_drawer": False,
+            "enable_save": job["save_video"],
+            "trace_export": False,
+            # Keeps the summaries of real runs in Summary/ untouched
+            "summary_dir": os.path.join(job["work_dir"], "summaries"),
+        },
+    }
+    overrides["runtime"] = {"backend": job["backend"], "precision": job["precision"]}
+    if job["detections"] == "oracle":
+        overrides["detector"] = {
+            "cache_enabled": True,
+            "cache_dir": os.path.join(job["work_dir"], "detections"),
+        }
+    for section, values in overrides.items():
+        for key, value in values.items():
+            config.set(section, key, value)
+
+    with open(job["paths"]["ground_truth"], "r") as file:
+        ground_truth = json.load(file)
+    num_frames = ground_truth["scenario"]["num_frames"]
+
+    class_names, allowed_classes = AllowedClasses(config).get_allowed_classes()
+    image_size = ModelManager.model_image_size(job["model"])
+    if job["detections"] == "oracle":
+        fill_oracle_cache(config, job["model"], image_size, ground_truth, class_names,
+                          allowed_classes, job["precision"], job["backend"])
+    load_model = not DetectorManager.cached_run_available(
+        config, job["model"], image_size, allowed_classes, num_frames
+    )
+
+    model_handler = ModelManager(
+        job["model"], config.sub_configs.get("model", None), load_model=load_model
+    )
+    video_processor = VideoProcessor(model_handler, config, max_frame=num_frames)
+    start_time = time.perf_counter()
+    video_processor.process_video(config)
+    summary = video_processor.summary
+    # The detector warm-up is reported with the startup, not the throughput
+    wall_seconds = time.perf_counter() - start_time - (summary.warmup_seconds or 0.0)
+
+    latencies = 1000.0 / np.asarray(summary.fps_measurements or [np.inf])
+    return {
+        "scenario": job["scenario"],
+        "model": job["model"],
+        "backend": job["backend"],
+        "precision": job["precision"],
+        "tracker": job["tracker"],
+        "frame_skip": job["frame_skip"],
+        "detections": job["detections"],
+        "device": str(model_handler.device),
+        "frames_processed": summary.frame_count,
+        "wall_seconds": wall_seconds,
+        # Sampled frames per second, and video frames covered per second
+        "throughput_fps": summary.frame_count / wall_seconds,
+        "video_fps": summary.frame_count * job["frame_skip"] / wall_seconds,
+        "latency_ms": {
+            "mean": float(latencies.mean()),
+            "p50": float(np.percentile(latencies, 50)),
+            "p95": float(np.percentile(latencies, 95)),
+            "p99": float(np.percentile(latencies, 99)),
+            "max": float(latencies.max()),
+        },
+        "stages": summary.stage_stats,
+        # Model load, warm-up and time to first frame
+        "startup": summary.startup_stats(),
+        # ru_maxrss is in kilobytes on Linux
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "counts": count_accuracy(
+            video_processor.counter.lines_geometry, ground_truth["counts"], class_names
+        ),
+    }
+
+
+def fill_oracle_cache(config, model_name, image_size, ground_truth, class_names,
+                      allowed_classes, precision="fp32", backend="torch"):
+    """Store the ground-truth boxes as the detections of every frame"""
+    config_detector = config.sub_configs.get("detector")["detector"]
+    config_video = config.sub_configs.get("video")["video"]
+    # Same key as the run: int8 runs with ONNX Runtime
+    backend, precision = ModelManager.runtime_settings(
+        {"backend": backend, "precision": precision}
+    )
+    cache = DetectorManager.create_detection_cache(
+        config_detector, config_video["input_path"], model_name, image_size,
+        allowed_classes, config_video["lines_path"], precision, backend,
+        config_video.get("reduced_decode", False),
+    )
+    num_frames = ground_truth["scenario"]["num_frames"]
+    if cache.covers(range(num_frames)):
+        return
+
+    for frame_index, objects in enumerate(ground_truth["frames"]):
+        boxes = torch.tensor([obj["box"] for obj in objects], dtype=torch.float32)
+        labels = torch.tensor(
+            [class_names.index(obj["class_name"]) for obj in objects], dtype=torch.int64
+        )
+        cache.put(frame_index, Detections(boxes, torch.full((len(objects),), 0.9), labels))
+    cache.close(end_frame=num_frames)
+
+
+def count_accuracy(lines_geometry, expected, class_names):
+    """Compare the line counts (class ids) with the expected counts (class names)"""
+    counted = {}
+    for line in lines_geometry:
+        counted[line["name"]] = {}
+        for direction in ["up", "down"]:
+            counted[line["name"]][direction] = {
+                class_names[int(class_id)]: count
+                for class_id, count in line["counts"][direction].items()
+            }
+
+    abs_error = 0
+    for line_name in set(counted) | set(expected):
+        for direction in ["up", "down"]:
+            got = counted.get(line_name, {}).get(direction, {})
+            want = expected.get(line_name, {}).get(direction, {})
+            abs_error += sum(
+                abs(got.get(name, 0) - want.get(name, 0)) for name in set(got) | set(want)
+            )
+
+    expected_total = sum(
+        sum(per_class.values())
+        for directions in expected.values()
+        for per_class in directions.values()
+    )
+    counted_total = sum(
+        sum(per_class.values())
+        for directions in counted.values()
+        for per_class in directions.values()
+    )
+    return {
+        "expected_total": expected_total,
+        "counted_total": counted_total,
+        "abs_error": abs_error,
+        "accuracy": max(0.0, 1 - abs_error / expected_total) if expected_total else 1.0,
+        "counted": counted,
+    }
+
+
+def build_jobs(config_benchmark):
+    """Generate the scenarios, one job per scenario/model/backend/precision/tracker/frame_skip"""
+    work_dir = config_benchmark["work_dir"]
+    scenarios = config_benchmark["scenarios"]
+
+    jobs = []
+    for width, height in scenarios["resolutions"]:
+        for density in scenarios["densities"]:
+            video = SyntheticVideo(
+                width, height, density, config_benchmark["num_frames"],
+                seed=config_benchmark["seed"],
+            )
+            paths = video.generate(os.path.join(work_dir, "synthetic"))
+            combinations = dict.fromkeys(
+                # int8 always runs with ONNX Runtime, whatever the backend
+                (config_benchmark["detections"], model,
+                 "onnx" if precision == "int8" else backend, precision, tracker, frame_skip)
+                for model, backend, precision, tracker, frame_skip in itertools.product(
+                    config_benchmark["models"],
+                    config_benchmark.get("backends", ["torch"]),
+                    config_benchmark.get("precisions", ["fp32"]),
+                    config_benchmark["trackers"],
+                    config_benchmark["frame_skip"],
+                )
+            )
+            if config_benchmark["detections"] == "model":
+                # Accuracy ceiling of the model jobs: ground-truth boxes
+                # through each tracker (the model only keys the cache)
+                combinations.update(dict.fromkeys(
+                    ("oracle", config_benchmark["models"][0], "torch", "fp32", tracker,
+                     frame_skip)
+                    for tracker, frame_skip in itertools.product(
+                        config_benchmark["trackers"], config_benchmark["frame_skip"]
+                    )
+                ))
+            for detections, model, backend, precision, tracker, frame_skip in combinations:
+                jobs.append({
+                    "scenario": video.name,
+                    "paths": paths,
+                    "model": model,
+                    "backend": backend,
+                    "precision": precision,
+                    "tracker": tracker,
+                    "frame_skip": frame_skip,
+                    "detections": detections,
+                    "save_video": config_benchmark["save_video"],
+                    "cpu_only": config_benchmark["cpu_only"],
+                    "threads": config_benchmark["threads"],
+                    "work_dir": work_dir,
+                })
+    return jobs
+
+
+def run(config_benchmark):
+    """Run every job in its own process, return the JSON report"""
+    jobs = build_jobs(config_benchmark)
+    logging.info(f"Running {len(jobs)} end-to-end benchmark jobs")
+
+    results = []
+    for index, job in enumerate(jobs, 1):
+        logging.info(
+            f"[{index}/{len(jobs)}] {job['scenario']} {job['model']} "
+            f"{job['backend']} {job['precision']} {job['tracker']} "
+            f"frame_skip={job['frame_skip']} ({job['detections']} detections)"
+        )
+        # A fresh spawned process per job: clean peak RSS and CUDA settings
+        with ProcessPoolExecutor(max_workers=1, mp_context=get_context("spawn")) as pool:
+            results.append(pool.submit(_run_job, job).result())
+
+    results.sort(key=_job_key)
+    accuracy_delta(results)
+    oracle_accuracy(results)
+    return {
+        "environment": environment(),
+        "benchmark": config_benchmark,
+        "results": rounded(results),
+    }
+
+
+def accuracy_delta(results):
+    """
+    Count accuracy of every quantized job minus the one of the same fp32 job
+    (same backend if it ran, else PyTorch)
+    """
+    fp32 = {
+        _job_key(result): result for result in results if result["precision"] == "fp32"
+    }
+    for result in results:
+        if result["precision"] == "fp32":
+            continue
+        key = list(_job_key(result))
+        key[3] = "fp32"
+        reference = fp32.get(tuple(key))
+        if reference is None:
+            key[2] = "torch"
+            reference = fp32.get(tuple(key))
+        if reference is None:
+            continue
+        result["accuracy_delta_fp32"] = (
+            result["counts"]["accuracy"] - reference["counts"]["accuracy"]
+        )
+        logging.info(
+            f"{result['scenario']} {result['model']} {result['precision']} "
+            f"{result['tracker']} frame_skip={result['frame_skip']}: accuracy "
+            f"{reference['counts']['accuracy']:.3f} -> {result['counts']['accuracy']:.3f}, "
+            f"{reference['throughput_fps']:.1f} -> {result['throughput_fps']:.1f} FPS"
+        )
+
+
+def oracle_accuracy(results):
+    """Count accuracy of the oracle job of the same scenario, tracker and frame_skip"""
+    oracle = {
+        (result["scenario"], result["tracker"], result["frame_skip"]): result
+        for result in results
+        if result["detections"] == "oracle"
+    }
+    for result in results:
+        reference = oracle.get((result["scenario"], result["tracker"], result["frame_skip"]))
+        if result["detections"] == "oracle" or reference is None:
+            continue
+        result["oracle_accuracy"] = reference["counts"]["accuracy"]
+        logging.info(
+            f"{result['scenario']} {result['model']} {result['backend']} "
+            f"{result['precision']} {result['tracker']} frame_skip={result['frame_skip']}: "
+            f"accuracy {result['counts']['accuracy']:.3f} "
+            f"(oracle {reference['counts']['accuracy']:.3f})"
+        )
+
+
+def compare(old_path, new_path):
+    """Print throughput, p95 latency, peak RSS, startup and accuracy changes per job"""
+    with open(old_path, "r") as file:
+        old = {_job_key(r): r for r in json.load(file)["results"]}
+    with open(new_path, "r") as file:
+        new = {_job_key(r): r for r in json.load(file)["results"]}
+
+    print(f"{'Job':<60}{'FPS':>18}{'P95 ms':>18}{'RSS MB':>18}{'TTFF s':>18}{'Accuracy':>16}")
+    for key in sorted(set(old) & set(new)):
+        a, b = old[key], new[key]
+        # Reports from before the startup stats have no time to first frame
+        ttff = [r.get("startup", {}).get("time_to_first_frame") for r in (a, b)]
+        print(
+            f"{' '.join(map(str, key)):<60}"
+            f"{_change(a['throughput_fps'], b['throughput_fps']):>18}"
+            f"{_change(a['latency_ms']['p95'], b['latency_ms']['p95']):>18}"
+            f"{_change(a['peak_rss_mb'], b['peak_rss_mb']):>18}"
+            f"{_change(*ttff) if None not in ttff else '-':>18}"
+            f"{a['counts']['accuracy']:>7.3f} -> {b['counts']['accuracy']:.3f}"
+        )
+    for key in sorted(set(old) ^ set(new)):
+        print(f"{' '.join(map(str, key)):<60}only in {old_path if key in old else new_path}")
+
+
+def _job_key(result):
+    # Reports from before the backend/precision options ran PyTorch in fp32
+    return (result["scenario"], result["model"], result.get("backend", "torch"),
+            result.get("precision", "fp32"), result["tracker"], result["frame_skip"],
+            result["detections"])
+
+
+def _change(old, new):
+    return f"{new:.1f} ({(new - old) / old:+.1%})" if old else f"{new:.1f}"
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(
+        description="End-to-end benchmark over synthetic videos with ground truth."
+    )
+    parser.add_argument("--models", nargs="+", help="Models to benchmark")
+    parser.add_argument(
+        "--backends", nargs="+", choices=["torch", "onnx"], help="Inference backends"
+    )
+    parser.add_argument(
+        "--precisions", nargs="+", choices=["fp32", "int8"], help="Model precisions"
+    )
+    parser.add_argument("--trackers", nargs="+", help="Trackers to benchmark")
+    parser.add_argument("--frame-skip", nargs="+", type=int, help="frame_skip values")
+    parser.add_argument(
+        "--detections", choices=["oracle", "model"],
+        help="Ground-truth boxes from the cache, or run the detector",
+    )
+    parser.add_argument("--num-frames", type=int, help="Frames per synthetic video")
+    parser.add_argument("--output", type=str, help="JSON report path")
+    parser.add_argument(
+        "--compare", nargs=2, metavar=("OLD", "NEW"), help="Compare two JSON reports"
+    )
+    return parser.parse_args()
+
+
+def main():
+    setup_logging()
+    args = parse_arguments()
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    # Loaded from src/config/benchmark.yaml (not saved back)
+    config = ConfigManager()
+    config.set("benchmark", "models", args.models)
+    config.set("benchmark", "backends", args.backends)
+    config.set("benchmark", "precisions", args.precisions)
+    config.set("benchmark", "trackers", args.trackers)
+    config.set("benchmark", "frame_skip", args.frame_skip)
+    config.set("benchmark", "detections", args.detections)
+    config.set("benchmark", "num_frames", args.num_frames)
+    config.set("benchmark", "output_file", args.output)
+    config_benchmark = config.sub_configs.get("benchmark")["benchmark"]
+
+    report = run(config_benchmark)
+
+    output_file = config_benchmark["output_file"]
+    os.makedirs(os.path.dirname(output_file) or ".", exist_ok=True)
+    with open(output_file, "w") as file:
+        json.dump(report, file, indent=2, sort_keys=True)
+    logging.info(f"Benchmark report exported to {output_file}")
+
+
+if __name__ == "__main__":
+    main()
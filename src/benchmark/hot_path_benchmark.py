@@ -0,0 +1,360 @@
+# -*- coding: utf-8 -*-
+"""
+python3 -m src.benchmark.hot_path_benchmark --save-baseline
+python3 -m src.benchmark.hot_path_benchmark --check --tolerance 0.25
+python3 -m src.benchmark.hot_path_benchmark --cases detection_filter nms_torchvision
+
+Micro-benchmarks of the functions called on every frame, parameterised by
+the number of detections (0-2000) and, for the counter, the number of
+lines. Each case is timed over `repeats` loops of calls lasting about
+`min_time` seconds in total. The fastest loop is what gets compared,
+because slower loops mostly measure other load on the machine.
+
+--save-baseline stores the results in the baseline file. --check runs the
+same cases and exits with status 1 when a case is slower than its
+baseline by more than `tolerance`. Changes under an absolute floor
+(ABSOLUTE_TOLERANCE_US) do not count, because sub-microsecond cases are
+mostly timer noise. Baselines depend on the machine, so compare runs on
+the same box. Cases whose optional dependency is missing are skipped.
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from types import SimpleNamespace
+
+import numpy as np
+import torch
+
+from src.benchmark.benchmark_utils import environment, rounded
+from src.modules.counter.algorithms.counter_visualizer import CounterVisualizer
+from src.modules.counter.algorithms.object_counter import ObjectCounter
+from src.modules.detector.utils.detection_filter import DetectionFilter
+from src.modules.detector.utils.nms_filter import NMSFilter
+from src.modules.display.display_action import DisplayAction
+from src.modules.engine.utils.image_square import ImageSquare
+from src.modules.engine.utils.letterbox import Letterbox
+from src.modules.utils.detections import Detections, Tracks
+
+DETECTION_COUNTS = [0, 10, 100, 500, 2000]
+LINE_COUNTS = [1, 4, 16]
+FRAME_SIZE = (1920, 1080)
+TARGET_SIZE = 640
+# COCO-80 ids of person, car, bus, truck (AllowedClasses)
+ALLOWED_CLASSES = [0, 2, 5, 7]
+CLASS_NAMES = [f"class_{idx}" for idx in range(80)]
+# Slowdowns smaller than this (microseconds) are never a regression
+ABSOLUTE_TOLERANCE_US = 2.0
+
+
+def random_boxes(rng, count, width=FRAME_SIZE[0], height=FRAME_SIZE[1]):
+    """(count, 4) float32 x1y1x2y2 boxes, clustered so that NMS has overlaps"""
+    centers = rng.uniform((0, 0), (width, height), (max(1, count // 4), 2))
+    center = centers[rng.integers(len(centers), size=count)] + rng.normal(0, 8, (count, 2))
+    size = rng.uniform(20, 120, (count, 2))
+    boxes = np.concatenate([center - size / 2, center + size / 2], axis=1)
+    return torch.from_numpy(boxes.astype(np.float32))
+
+
+def random_tracks(rng, count, frames):
+    """Per frame, Tracks of 40x30 boxes moving vertically (crossing horizontal lines)"""
+    x = rng.uniform(50, FRAME_SIZE[0] - 50, count)
+    y = rng.uniform(0, FRAME_SIZE[1], count)
+    speed = rng.uniform(-15, 15, count)
+    labels = rng.choice(ALLOWED_CLASSES, count)
+    sequence = []
+    for frame_index in range(frames):
+        cy = (y + speed * frame_index) % FRAME_SIZE[1]
+        boxes = np.stack([x - 20, cy - 15, x + 20, cy + 15], axis=1)
+        sequence.append(Tracks(
+            np.arange(1, count + 1), boxes, np.full(count, 0.9), labels,
+            np.ones(count, dtype=bool),
+        ))
+    return sequence
+
+
+def random_lines(count):
+    """Horizontal lines spread over the frame"""
+    return [
+        {
+            "name": f"L{idx + 1}",
+            "start_point": [0, int(FRAME_SIZE[1] * (idx + 1) / (count + 1))],
+            "end_point": [FRAME_SIZE[0], int(FRAME_SIZE[1] * (idx + 1) / (count + 1))],
+            "color": [0, 0, 255],
+            "counts": {"up": {}, "down": {}},
+        }
+        for idx in range(count)
+    ]
+
+
+def case_letterbox_to_tensor(rng, detections, lines):
+    frame = rng.integers(0, 256, (FRAME_SIZE[1], FRAME_SIZE[0], 3), dtype=np.uint8)
+    padding_info = ImageSquare.calculate_dimensions(*FRAME_SIZE, TARGET_SIZE)
+    letterbox = Letterbox(padding_info, target_size=TARGET_SIZE)
+    return lambda: letterbox.to_tensor_batch([frame])
+
+
+def case_letterbox_unmap_boxes(rng, detections, lines):
+    boxes = random_boxes(rng, detections, TARGET_SIZE, TARGET_SIZE)
+    padding_info = ImageSquare.calculate_dimensions(*FRAME_SIZE, TARGET_SIZE)
+    letterbox = Letterbox(padding_info, target_size=TARGET_SIZE)
+    return lambda: letterbox.unmap_boxes(boxes)
+
+
+def case_detection_filter(rng, detections, lines):
+    detection_filter = DetectionFilter(0.5, ALLOWED_CLASSES)
+    boxes = random_boxes(rng, detections)
+    scores = torch.from_numpy(rng.uniform(0, 1, detections).astype(np.float32))
+    labels = torch.from_numpy(rng.integers(0, 80, detections))
+    return lambda: detection_filter.filter_detections(boxes, scores, labels)
+
+
+def _case_nms(nms_type):
+    def case(rng, detections, lines):
+        nms_filter = NMSFilter(0.5, nms_type, score_threshold=0.3)
+        boxes = random_boxes(rng, detections)
+        scores = torch.from_numpy(rng.uniform(0.3, 1, detections).astype(np.float32))
+        labels = torch.from_numpy(rng.choice(ALLOWED_CLASSES, detections))
+        return lambda: nms_filter.apply(boxes, scores, labels)
+    return case
+
+
+def case_bytetrack_labels(rng, detections, lines):
+    from src.modules.tracker.trackers.tracker_bytetrack import Tracker_ByteTrack
+
+    tracker = Tracker_ByteTrack(1, {
+        "track_thresh": 0.5, "track_buffer": 30, "match_thresh": 0.8, "mot20": False,
+    })
+    scores = rng.uniform(0.5, 1, detections).astype(np.float32).astype(np.float64)
+    labels = rng.choice(ALLOWED_CLASSES, detections)
+    # Tracks carry the score of the detection they were updated with
+    score_index = tracker.unique_scores(scores)
+    tracks = [
+        SimpleNamespace(track_id=idx + 1, score=scores[idx], label=None)
+        for idx in rng.permutation(detections)
+    ]
+    return lambda: tracker.assign_labels(tracks, score_index, labels)
+
+
+def case_bytetrack_update(rng, detections, lines):
+    from src.modules.tracker.trackers.tracker_bytetrack import Tracker_ByteTrack
+
+    tracker = Tracker_ByteTrack(1, {
+        "track_thresh": 0.5, "track_buffer": 30, "match_thresh": 0.8, "mot20": False,
+    })
+    frame = np.zeros((FRAME_SIZE[1], FRAME_SIZE[0], 3), dtype=np.uint8)
+    frame_detections = Detections(
+        random_boxes(rng, detections),
+        torch.from_numpy(rng.uniform(0.5, 1, detections).astype(np.float32)),
+        torch.from_numpy(rng.choice(ALLOWED_CLASSES, detections)),
+    )
+    return lambda: tracker.update(frame, frame_detections)
+
+
+def case_bytetrack_native_update(rng, detections, lines):
+    from src.modules.tracker.trackers.tracker_bytetrack_native import Tracker_ByteTrackNative
+
+    tracker = Tracker_ByteTrackNative(1, {
+        "track_thresh": 0.5, "track_buffer": 30, "match_thresh": 0.8, "mot20": False,
+    })
+    frame = np.zeros((FRAME_SIZE[1], FRAME_SIZE[0], 3), dtype=np.uint8)
+    frame_detections = Detections(
+        random_boxes(rng, detections),
+        torch.from_numpy(rng.uniform(0.5, 1, detections).astype(np.float32)),
+        torch.from_numpy(rng.choice(ALLOWED_CLASSES, detections)),
+    )
+    return lambda: tracker.update(frame, frame_detections)
+
+
+def case_object_counter(rng, detections, lines):
+    counter = ObjectCounter(ALLOWED_CLASSES, CLASS_NAMES)
+    line_list = random_lines(lines)
+    sequence = random_tracks(rng, detections, 32)
+    frames = iter(range(1 << 62))
+    return lambda: counter.update(sequence[next(frames) % len(sequence)], line_list)
+
+
+def case_counter_visualizer(rng, detections, lines):
+    visualizer = CounterVisualizer(None, CLASS_NAMES)
+    frame = np.zeros((FRAME_SIZE[1], FRAME_SIZE[0], 3), dtype=np.uint8)
+    line_list = random_lines(lines)
+    for line in line_list:
+        line["counts"] = {
+            "up": {label: int(rng.integers(100)) for label in ALLOWED_CLASSES},
+            "down": {label: int(rng.integers(100)) for label in ALLOWED_CLASSES},
+        }
+    return lambda: visualizer.draw(frame, line_list)
+
+
+def case_draw_tracks(rng, detections, lines):
+    display = DisplayAction(CLASS_NAMES)
+    frame = np.zeros((FRAME_SIZE[1], FRAME_SIZE[0], 3), dtype=np.uint8)
+    tracks = random_tracks(rng, detections, 1)[0]
+    return lambda: display.draw_tracks(frame, tracks, 30.0)
+
+
+# name -> (setup, uses detection counts, uses line counts)
+CASES = {
+    "letterbox_to_tensor": (case_letterbox_to_tensor, False, False),
+    "letterbox_unmap_boxes": (case_letterbox_unmap_boxes, True, False),
+    "detection_filter": (case_detection_filter, True, False),
+    "nms_torchvision": (_case_nms("torchvision"), True, False),
+    "nms_opencv": (_case_nms("opencv"), True, False),
+    "nms_numpy": (_case_nms("numpy"), True, False),
+    "nms_soft": (_case_nms("soft"), True, False),
+    "bytetrack_labels": (case_bytetrack_labels, True, False),
+    "bytetrack_update": (case_bytetrack_update, True, False),
+    "bytetrack_native_update": (case_bytetrack_native_update, True, False),
+    "object_counter": (case_object_counter, True, True),
+    "counter_visualizer": (case_counter_visualizer, False, True),
+    "draw_tracks": (case_draw_tracks, True, False),
+}
+
+
+def case_keys(name):
+    """(key, detections, lines) for every parameter combination of a case"""
+    _, by_detections, by_lines = CASES[name]
+    detections = DETECTION_COUNTS if by_detections else [0]
+    lines = LINE_COUNTS if by_lines else [0]
+    keys = []
+    for num_detections in detections:
+        for num_lines in lines:
+            params = []
+            if by_detections:
+                params.append(f"n={num_detections}")
+            if by_lines:
+                params.append(f"lines={num_lines}")
+            key = f"{name}[{','.join(params)}]" if params else name
+            keys.append((key, num_detections, num_lines))
+    return keys
+
+
+def time_call(function, min_time=0.05, repeats=7):
+    """Median and min time per call (microseconds) over `repeats` timed loops"""
+    function()  # warm-up (lazy init, caches)
+    # Calls per loop so that one loop lasts about min_time / repeats
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            function()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time / repeats:
+            break
+        number *= 2 if elapsed == 0 else max(2, int(min_time / repeats / elapsed))
+
+    per_call = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        for _ in range(number):
+            function()
+        per_call.append((time.perf_counter() - start) / number * 1e6)
+    return {"median_us": float(np.median(per_call)), "min_us": min(per_call), "calls": number}
+
+
+def run(names, min_time=0.05, repeats=7, seed=0):
+    """Time every case, return {key: timing} and the skipped cases"""
+    results = {}
+    skipped = {}
+    for name in names:
+        setup = CASES[name][0]
+        for key, num_detections, num_lines in case_keys(name):
+            rng = np.random.default_rng(seed)
+            try:
+                function = setup(rng, num_detections, num_lines)
+            except ImportError as error:
+                skipped[name] = str(error)
+                break
+            results[key] = time_call(function, min_time, repeats)
+            print(f"  {key:<40}{results[key]['min_us']:>12.2f} us")
+    return results, skipped
+
+
+def check(results, baseline, tolerance):
+    """Keys slower than the baseline by more than tolerance (and the floor)"""
+    regressions = []
+    print(f"\n{'Case':<40}{'Baseline us':>14}{'Current us':>14}{'Change':>10}")
+    for key, timing in results.items():
+        if key not in baseline:
+            print(f"{key:<40}{'-':>14}{timing['min_us']:>14.2f}{'new':>10}")
+            continue
+        old, new = baseline[key]["min_us"], timing["min_us"]
+        change = (new - old) / old if old else 0.0
+        regressed = new > old * (1 + tolerance) and new - old > ABSOLUTE_TOLERANCE_US
+        print(
+            f"{key:<40}{old:>14.2f}{new:>14.2f}{change:>+10.1%}"
+            f"{'  REGRESSION' if regressed else ''}"
+        )
+        if regressed:
+            regressions.append(key)
+    return regressions
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description="Hot-path micro-benchmarks.")
+    parser.add_argument(
+        "--cases", nargs="+", choices=list(CASES), default=list(CASES),
+        help="Cases to run (default: all)",
+    )
+    parser.add_argument(
+        "--baseline", type=str, default="Summary/hot_path_baseline.json",
+        help="Baseline file",
+    )
+    parser.add_argument(
+        "--save-baseline", action="store_true", help="Store the results as the baseline"
+    )
+    parser.add_argument(
+        "--check", action="store_true", help="Fail when a case regressed past tolerance"
+    )
+    parser.add_argument(
+        "--tolerance", type=float, default=0.25, help="Allowed slowdown (0.25 = 25%%)"
+    )
+    parser.add_argument("--min-time", type=float, default=0.05, help="Seconds per case")
+    parser.add_argument("--repeats", type=int, default=7, help="Timed loops per case")
+    parser.add_argument("--threads", type=int, default=1, help="torch threads")
+    parser.add_argument("--output", type=str, help="Also write the results to this file")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_arguments()
+    # A fixed thread count keeps the torch timings comparable between runs
+    torch.set_num_threads(args.threads)
+
+    # Read before --save-baseline can replace it
+    baseline = None
+    if args.check:
+        with open(args.baseline, "r") as file:
+            baseline = json.load(file)
+
+    results, skipped = run(args.cases, args.min_time, args.repeats)
+    for name, reason in skipped.items():
+        print(f"  {name:<40}skipped ({reason})")
+
+    report = {
+        "environment": environment(),
+        "settings": {"min_time": args.min_time, "repeats": args.repeats,
+                     "threads": args.threads},
+        "results": rounded(results),
+    }
+    for path in filter(None, [args.output, args.save_baseline and args.baseline]):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "w") as file:
+            json.dump(report, file, indent=2, sort_keys=True)
+        print(f"Results written to {path}")
+
+    if baseline:
+        if baseline["environment"]["platform"] != report["environment"]["platform"]:
+            print("Warning: the baseline was recorded on a different platform")
+        regressions = check(results, baseline["results"], args.tolerance)
+        if regressions:
+            print(f"\n{len(regressions)} hot path(s) regressed by more than "
+                  f"{args.tolerance:.0%}: {', '.join(regressions)}")
+            sys.exit(1)
+        print("\nNo hot path regression")
+
+
+if __name__ == "__main__":
+    main()
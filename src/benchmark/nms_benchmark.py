@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+"""
+python3 -m src.benchmark.nms_benchmark
+python3 -m src.benchmark.nms_benchmark --counts 100 1000 5000 --device cuda
+
+Compares the NMSFilter backends on the same clustered, multi-class
+detections for several detection counts. For each backend it reports the
+time per call, the number of kept boxes and whether the kept set matches
+torchvision (Soft-NMS decays scores instead of removing boxes, so it is not
+expected to match). It then names the fastest exact backend per count, to
+choose nms_type per deployment.
+"""
+
+import argparse
+
+import numpy as np
+import torch
+
+from src.benchmark.hot_path_benchmark import ALLOWED_CLASSES, random_boxes, time_call
+from src.modules.detector.utils.nms_filter import NMSFilter
+
+
+def run(counts, device="cpu", iou_threshold=0.5, class_aware=True, min_time=0.05, seed=0):
+    """{count: {backend: {"us", "kept", "matches"}}}"""
+    results = {}
+    for count in counts:
+        rng = np.random.default_rng(seed)
+        boxes = random_boxes(rng, count).to(device)
+        scores = torch.from_numpy(rng.uniform(0.3, 1, count).astype(np.float32)).to(device)
+        labels = torch.from_numpy(rng.choice(ALLOWED_CLASSES, count)).to(device)
+
+        reference = None
+        results[count] = {}
+        for backend in NMSFilter.BACKENDS:
+            nms_filter = NMSFilter(iou_threshold, backend, class_aware, score_threshold=0.3)
+            kept_boxes, _, _ = nms_filter.apply(boxes, scores, labels)
+            if reference is None:
+                reference = kept_boxes
+            timing = time_call(lambda: nms_filter.apply(boxes, scores, labels), min_time)
+            results[count][backend] = {
+                "us": timing["min_us"],
+                "kept": len(kept_boxes),
+                "matches": torch.equal(kept_boxes, reference),
+            }
+    return results
+
+
+def print_results(results):
+    backends = NMSFilter.BACKENDS
+    print(f"{'Detections':>10}" + "".join(f"{name:>22}" for name in backends) + "   Fastest")
+    for count, per_backend in results.items():
+        cells = "".join(
+            f"{per_backend[name]['us']:>12.1f} us {per_backend[name]['kept']:>5}"
+            f"{'' if per_backend[name]['matches'] or name == 'soft' else '!':>1}"
+            for name in backends
+        )
+        exact = [name for name in backends if name != "soft"]
+        fastest = min(exact, key=lambda name: per_backend[name]["us"])
+        print(f"{count:>10}{cells}   {fastest}")
+    print("\n(time per call, kept boxes; '!' = kept set differs from torchvision)")
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description="NMS backend comparison.")
+    parser.add_argument(
+        "--counts", nargs="+", type=int, default=[10, 100, 500, 2000],
+        help="Detection counts",
+    )
+    parser.add_argument("--device", type=str, default="cpu", help="Tensor device")
+    parser.add_argument("--iou", type=float, default=0.5, help="IoU threshold")
+    parser.add_argument(
+        "--class-agnostic", action="store_true", help="Suppress across classes"
+    )
+    parser.add_argument("--threads", type=int, default=1, help="torch threads")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_arguments()
+    torch.set_num_threads(args.threads)
+    results = run(args.counts, args.device, args.iou, not args.class_agnostic)
+    print_results(results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,234 @@
+# -*- coding: utf-8 -*-
+"""
+python3 -m src.benchmark.onnx_benchmark
+python3 -m src.benchmark.onnx_benchmark --models yolo11s fasterrcnn_resnet50_fpn --batch-size 4
+python3 -m src.benchmark.onnx_benchmark --video data/input/video.mp4 --frames 100 --check
+python3 -m src.benchmark.onnx_benchmark --precision int8 --min-match 0.9 --check
+
+Parity and speed of the ONNX Runtime backend against PyTorch. For each
+model, both backends run the same detector (letterbox, filtering, NMS) on
+the same frames, on the CPU. The frames come from --video, or from a
+synthetic scenario (see SyntheticVideo) by default. The ONNX model is
+exported on the first run (see ONNXHandler), so load_seconds of that run
+includes the export. With --precision int8 the ONNX side runs the
+quantized model (calibrated on the same video on its first run), so the
+report shows what int8 costs in agreement with the fp32 PyTorch model.
+
+Parity: on every frame, detections of the two backends are matched one to
+one (same class, highest IoU first, IoU >= --min-iou). match_rate is
+2 x matched / (torch + onnx detections), 1.0 when they are identical. The
+largest box coordinate (pixels) and score differences are over the
+matched pairs.
+
+Speed: milliseconds per frame of the whole detection pipeline (median
+over the batches, after one warm-up batch), and the ONNX speedup.
+
+--check exits with status 1 when the match rate of a model is below
+--min-match. The JSON report (sorted keys) is written to --output.
+"""
+
+import argparse
+import json
+import logging
+import os
+import time
+
+import numpy as np
+import torch
+import torchvision
+from scipy.optimize import linear_sum_assignment
+
+from src.benchmark.benchmark_utils import environment, rounded
+from src.benchmark.synthetic_video import SyntheticVideo
+from src.config.config import ConfigManager
+from src.main import setup_logging
+from src.models.model_manager import ModelManager
+from src.modules.detector.detector_manager import DetectorManager
+from src.modules.engine.utils.image_square import ImageSquare
+from src.modules.utils.allowed_classes import AllowedClasses
+from src.modules.videoIO.video_io import VideoReader
+
+BACKENDS = ["torch", "onnx"]
+
+
+def read_frames(video_path, num_frames):
+    video_reader = VideoReader(video_path)
+    frames = [frame for _, frame in video_reader.read_frames(1, num_frames)]
+    video_reader.release()
+    return frames
+
+
+def load_detector(config, model_name, backend, precision, video_path):
+    """(detector, image size, load seconds) of a model on one backend"""
+    config.set("processor", "model", model_name)
+    config.set("runtime", "backend", backend)
+    config.set("runtime", "precision", precision)
+    config_detector = dict(config.sub_configs.get("detector")["detector"])
+    # Measure the detector itself, never the detection cache
+    config_detector["cache_enabled"] = False
+    _, allowed_classes = AllowedClasses(config).get_allowed_classes()
+
+    start_time = time.perf_counter()
+    model_handler = ModelManager(model_name, config.sub_configs.get("model", None))
+    detector = DetectorManager(
+        model_handler, config_detector, allowed_classes, {"input_path": video_path}
+    ).get_detector()
+    # Includes the int8 calibration, done when the detector is created
+    load_seconds = time.perf_counter() - start_time
+    return detector, model_handler.image_size, load_seconds
+
+
+def detect(detector, frames, padding_info, batch_size):
+    """(detections per frame, milliseconds per frame of every batch)"""
+    # Warm up: buffers, sessions and lazy initialisation
+    detector.detection_pipeline_batch(frames[:batch_size], padding_info)
+
+    detections, batch_ms = [], []
+    for start in range(0, len(frames), batch_size):
+        batch = frames[start:start + batch_size]
+        start_time = time.perf_counter()
+        results = detector.detection_pipeline_batch(batch, padding_info)
+        batch_ms.append((time.perf_counter() - start_time) * 1000 / len(batch))
+        detections.extend(result.to("cpu") for result in results)
+    return detections, batch_ms
+
+
+def match(reference, candidate, min_iou):
+    """Matched pairs (reference index, candidate index) of one frame"""
+    if len(reference) == 0 or len(candidate) == 0:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    iou = torchvision.ops.box_iou(reference.boxes, candidate.boxes).numpy()
+    iou[reference.class_ids.numpy()[:, None] != candidate.class_ids.numpy()[None, :]] = 0
+    rows, cols = linear_sum_assignment(-iou)
+    keep = iou[rows, cols] >= min_iou
+    return rows[keep], cols[keep]
+
+
+def parity(reference, candidate, min_iou):
+    """Detection agreement of two backends over all frames"""
+    totals = {"torch_detections": 0, "onnx_detections": 0, "matched": 0}
+    box_diff, score_diff, mismatched_frames = 0.0, 0.0, 0
+    for ref, cand in zip(reference, candidate):
+        rows, cols = match(ref, cand, min_iou)
+        totals["torch_detections"] += len(ref)
+        totals["onnx_detections"] += len(cand)
+        totals["matched"] += len(rows)
+        if len(rows) != len(ref) or len(cols) != len(cand):
+            mismatched_frames += 1
+        if len(rows):
+            box_diff = max(box_diff, float(
+                (ref.boxes[rows] - cand.boxes[cols]).abs().max()
+            ))
+            score_diff = max(score_diff, float(
+                (ref.scores[rows] - cand.scores[cols]).abs().max()
+            ))
+
+    detections = totals["torch_detections"] + totals["onnx_detections"]
+    return {
+        **totals,
+        "mismatched_frames": mismatched_frames,
+        "match_rate": 2 * totals["matched"] / detections if detections else 1.0,
+        "max_box_diff_px": box_diff,
+        "max_score_diff": score_diff,
+    }
+
+
+def run_model(config, model_name, frames, video_path, batch_size, min_iou, precision):
+    height, width = frames[0].shape[:2]
+    result = {"model": model_name, "precision": precision, "backends": {}}
+    detections = {}
+    for backend in BACKENDS:
+        detector, image_size, load_seconds = load_detector(
+            config, model_name, backend, precision if backend == "onnx" else "fp32", video_path
+        )
+        padding_info = ImageSquare.calculate_dimensions(width, height, image_size)
+        detections[backend], batch_ms = detect(detector, frames, padding_info, batch_size)
+        result["backends"][backend] = {
+            "load_seconds": load_seconds,
+            "ms_per_frame": float(np.median(batch_ms)),
+        }
+
+    backends = result["backends"]
+    result["speedup"] = backends["torch"]["ms_per_frame"] / backends["onnx"]["ms_per_frame"]
+    result["parity"] = parity(detections["torch"], detections["onnx"], min_iou)
+    return result
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(
+        description="ONNX Runtime vs PyTorch detector parity and speed."
+    )
+    parser.add_argument("--models", nargs="+", default=["yolo11s"], help="Models to compare")
+    parser.add_argument("--video", type=str, help="Input video (default: synthetic scenario)")
+    parser.add_argument("--frames", type=int, default=32, help="Frames to detect")
+    parser.add_argument("--batch-size", type=int, default=1, help="Frames per inference")
+    parser.add_argument("--precision", choices=["fp32", "int8"], default="fp32",
+                        help="Precision of the ONNX model (PyTorch runs in fp32)")
+    parser.add_argument("--threads", type=int, help="torch CPU threads")
+    parser.add_argument("--min-iou", type=float, default=0.9,
+                        help="IoU for two detections to be the same")
+    parser.add_argument("--min-match", type=float, default=0.99,
+                        help="Lowest match rate accepted by --check")
+    parser.add_argument("--check", action="store_true",
+                        help="Fail if a model's match rate is below --min-match")
+    parser.add_argument("--output", type=str, default="Summary/benchmark_onnx.json",
+                        help="JSON report path")
+    return parser.parse_args()
+
+
+def main():
+    setup_logging()
+    args = parse_arguments()
+    # Both backends on the CPU, so the comparison is like for like
+    os.environ["CUDA_VISIBLE_DEVICES"] = ""
+    if args.threads:
+        torch.set_num_threads(args.threads)
+
+    video_path = args.video
+    if video_path is None:
+        video = SyntheticVideo(1280, 720, density=8, num_frames=args.frames)
+        video_path = video.generate(os.path.join("cache", "benchmark", "synthetic"))["video"]
+    frames = read_frames(video_path, args.frames)
+
+    # Loaded from src/config (not saved back)
+    config = ConfigManager()
+    results = [
+        run_model(config, model_name, frames, video_path, args.batch_size, args.min_iou,
+                  args.precision)
+        for model_name in args.models
+    ]
+
+    print(f"{'Model':<28}{'torch ms':>10}{'onnx ms':>10}{'speedup':>9}"
+          f"{'match':>8}{'box px':>9}{'score':>9}")
+    for result in results:
+        backends, parity_ = result["backends"], result["parity"]
+        print(
+            f"{result['model']:<28}{backends['torch']['ms_per_frame']:>10.1f}"
+            f"{backends['onnx']['ms_per_frame']:>10.1f}{result['speedup']:>8.2f}x"
+            f"{parity_['match_rate']:>8.3f}{parity_['max_box_diff_px']:>9.3f}"
+            f"{parity_['max_score_diff']:>9.4f}"
+        )
+
+    report = {
+        "environment": environment(),
+        "frames": len(frames),
+        "video": video_path,
+        "batch_size": args.batch_size,
+        "results": rounded(results, 4),
+    }
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    with open(args.output, "w") as file:
+        json.dump(report, file, indent=2, sort_keys=True)
+    logging.info(f"ONNX benchmark report exported to {args.output}")
+
+    if args.check:
+        failed = [
+            result["model"] for result in results
+            if result["parity"]["match_rate"] < args.min_match
+        ]
+        if failed:
+            raise SystemExit(f"ONNX outputs differ from PyTorch: {', '.join(failed)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+# -*- coding: utf-8 -*-
+"""
+python3 -m src.benchmark.preprocess_benchmark --frames 200 --check
+
+Compares the per-frame preprocessing of the detectors: the previous
+resize + pad + to_tensor + normalize path against the preallocated
+Letterbox engine. Reports time per frame and the memory allocated per
+frame: numpy/OpenCV arrays (tracemalloc) and torch tensors (torch
+profiler). With --check the run fails if the engine allocates a
+frame-sized buffer.
+"""
+
+import argparse
+import time
+import tracemalloc
+
+import cv2
+import numpy as np
+import torchvision.transforms.functional as F
+from torch.profiler import ProfilerActivity, profile
+
+from src.modules.engine.utils.image_square import ImageSquare
+from src.modules.engine.utils.letterbox import Letterbox
+
+MEAN = (0.485, 0.456, 0.406)
+STD = (0.229, 0.224, 0.225)
+# Python scalar wrappers (a few bytes per op) are not buffer allocations
+ALLOCATION_TOLERANCE = 1024
+
+
+def legacy_preprocess(frame, padding_info):
+    """Previous EfficientDet preprocessing (a new array per step)"""
+    resized_image = cv2.resize(frame, padding_info["resized_size"])
+    width, height = padding_info["padded_size"]
+    padded_image = np.zeros((height, width, 3), dtype=np.uint8)
+    top, left = padding_info["top_pad"], padding_info["left_pad"]
+    padded_image[
+        top : top + resized_image.shape[0], left : left + resized_image.shape[1]
+    ] = resized_image
+    padded_image = cv2.cvtColor(padded_image, cv2.COLOR_BGR2RGB)
+    img_tensor = F.to_tensor(padded_image).unsqueeze(0)
+    return F.normalize(img_tensor, mean=MEAN, std=STD)
+
+
+def numpy_bytes_per_frame(preprocess, frames):
+    """Peak numpy/OpenCV memory allocated while preprocessing a frame"""
+    tracemalloc.start()
+    total = 0
+    for frame in frames:
+        current, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        preprocess(frame)
+        _, peak = tracemalloc.get_traced_memory()
+        total += peak - current
+    tracemalloc.stop()
+    return total / len(frames)
+
+
+def torch_bytes_per_frame(preprocess, frames):
+    """Memory allocated by torch ops while preprocessing a frame"""
+    with profile(activities=[ProfilerActivity.CPU], profile_memory=True) as prof:
+        for frame in frames:
+            preprocess(frame)
+    allocated = sum(
+        max(0, event.self_cpu_memory_usage) for event in prof.key_averages()
+    )
+    return allocated / len(frames)
+
+
+def time_per_frame(preprocess, frames):
+    start_time = time.perf_counter()
+    for frame in frames:
+        preprocess(frame)
+    return (time.perf_counter() - start_time) * 1000 / len(frames)
+
+
+def run(num_frames=200, width=1920, height=1080, target_size=640, seed=0):
+    rng = np.random.default_rng(seed)
+    # A few distinct frames, cycled, so the source is not cached between iterations
+    pool = [rng.integers(0, 256, (height, width, 3), dtype=np.uint8) for _ in range(4)]
+    frames = [pool[idx % len(pool)] for idx in range(num_frames)]
+
+    padding_info = ImageSquare.calculate_dimensions(width, height, target_size)
+    letterbox = Letterbox(padding_info, mean=MEAN, std=STD)
+
+    candidates = {
+        "legacy": lambda frame: legacy_preprocess(frame, padding_info),
+        "letterbox": letterbox.to_tensor,
+    }
+
+    results = {}
+    for name, preprocess in candidates.items():
+        # Warm up (first call allocates the persistent buffers)
+        for frame in pool:
+            preprocess(frame)
+        results[name] = {
+            "ms_per_frame": time_per_frame(preprocess, frames),
+            "numpy_bytes_per_frame": numpy_bytes_per_frame(preprocess, frames),
+            "torch_bytes_per_frame": torch_bytes_per_frame(preprocess, frames[:20]),
+        }
+
+    reference = legacy_preprocess(pool[0], padding_info)
+    results["max_abs_diff"] = float((letterbox.to_tensor(pool[0]) - reference).abs().max())
+    return results
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description="Preprocessing allocation benchmark.")
+    parser.add_argument("--frames", type=int, default=200, help="Frames per measurement")
+    parser.add_argument("--width", type=int, default=1920, help="Frame width")
+    parser.add_argument("--height", type=int, default=1080, help="Frame height")
+    parser.add_argument("--size", type=int, default=640, help="Model input size")
+    parser.add_argument("--check", action="store_true",
+                        help="Fail if the letterbox engine allocates per frame")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_arguments()
+    results = run(args.frames, args.width, args.height, args.size)
+
+    print(f"{'path':<12}{'ms/frame':>10}{'numpy B/frame':>16}{'torch B/frame':>16}")
+    for name in ("legacy", "letterbox"):
+        row = results[name]
+        print(
+            f"{name:<12}{row['ms_per_frame']:>10.3f}"
+            f"{row['numpy_bytes_per_frame']:>16.0f}{row['torch_bytes_per_frame']:>16.0f}"
+        )
+    print(f"max |letterbox - legacy| = {results['max_abs_diff']:.2e}")
+
+    if args.check:
+        engine = results["letterbox"]
+        allocated = max(engine["numpy_bytes_per_frame"], engine["torch_bytes_per_frame"])
+        if allocated > ALLOCATION_TOLERANCE:
+            raise SystemExit(f"Letterbox allocates {allocated:.0f} bytes per frame")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,281 @@
+import json
+import os
+
+import cv2
+import numpy as np
+
+from src.modules.counter.algorithms.geometry_calculator import GeometryCalculator
+from src.modules.videoIO.video_io import VideoWriter
+
+# Sprite class -> (relative width, relative height, BGR body color)
+SPRITES = {
+    "car": (0.09, 0.06, (40, 40, 200)),
+    "truck": (0.14, 0.08, (30, 140, 220)),
+    "bus": (0.18, 0.08, (40, 180, 40)),
+    "person": (0.025, 0.07, (200, 80, 40)),
+}
+# Largest move per frame, as a share of the sprite length along its lane.
+# Consecutive boxes then overlap with IoU >= 0.54 up to frame_skip 3, above
+# the tracker IoU gates, so a tracker is not asked to match disjoint boxes.
+MAX_STEP = 0.1
+
+
+class SyntheticVideo:
+    """
+    Deterministic traffic-like video with known object trajectories.
+
+    Sprites move at constant speed in lanes. Vertical lanes cross the
+    horizontal line L1 and horizontal lanes cross the vertical line L2.
+    `density` is the number of lanes, which is also the number of objects on
+    screen at a time. Every lane spawns a new object once the previous one
+    has moved two sprite lengths, never so early that it would catch up
+    with it. A sprite moves at most MAX_STEP of its length per frame.
+    Everything derives from `seed`, so the same parameters always produce
+    the same frames, boxes and counts.
+
+    generate() writes the video, the counting lines, the per-frame
+    ground-truth boxes and the expected line counts. Sprites slide in and
+    out at the frame edges, but the ground-truth boxes only cover objects
+    fully in view: clipped boxes change shape every frame, which says
+    nothing about the detector. Counts use the same side-of-line rule as
+    ObjectCounter. A tracker can still split or lose a track, so the
+    counts a tracker reaches on the ground-truth boxes (the e2e benchmark
+    oracle rows) are the ceiling of any detector, not these counts.
+    """
+
+    def __init__(self, width=1280, height=720, density=8, num_frames=300, fps=30,
+                 seed=0):
+        self.width = width
+        self.height = height
+        self.density = density
+        self.num_frames = num_frames
+        self.fps = fps
+        self.seed = seed
+        self.name = f"{width}x{height}_d{density}_n{num_frames}_s{seed}"
+
+        self.lines = [
+            {
+                "name": "L1",
+                "start_point": [int(width * 0.05), height // 2],
+                "end_point": [int(width * 0.95), height // 2],
+                "color": [0, 0, 255],
+            },
+            {
+                "name": "L2",
+                "start_point": [width // 2, int(height * 0.05)],
+                "end_point": [width // 2, int(height * 0.95)],
+                "color": [0, 255, 0],
+            },
+        ]
+        self.objects = self._build_objects()
+
+    def paths(self, output_dir):
+        """Files written by generate() for this scenario"""
+        scenario_dir = os.path.join(output_dir, self.name)
+        return {
+            "video": os.path.join(scenario_dir, "video.mp4"),
+            "lines": os.path.join(scenario_dir, "lines.json"),
+            "ground_truth": os.path.join(scenario_dir, "ground_truth.json"),
+        }
+
+    def generate(self, output_dir):
+        """Write the scenario (skipped if it already exists), return its paths"""
+        paths = self.paths(output_dir)
+        if all(os.path.exists(path) for path in paths.values()):
+            return paths
+        os.makedirs(os.path.dirname(paths["video"]), exist_ok=True)
+
+        background = self._background()
+        writer = VideoWriter(paths["video"], self.fps, (self.width, self.height))
+        frame = np.empty_like(background)
+        for frame_index in range(self.num_frames):
+            np.copyto(frame, background)
+            for obj, box in self.visible_boxes(frame_index):
+                self._draw_sprite(frame, obj["class_name"], box)
+            writer.write(frame)
+        writer.release()
+
+        with open(paths["lines"], "w") as file:
+            json.dump(self.lines, file, indent=4)
+        with open(paths["ground_truth"], "w") as file:
+            json.dump(self.ground_truth(), file, indent=2, sort_keys=True)
+        return paths
+
+    def ground_truth(self):
+        """Scenario parameters, expected counts and per-frame boxes"""
+        return {
+            "scenario": {
+                "width": self.width,
+                "height": self.height,
+                "density": self.density,
+                "num_frames": self.num_frames,
+                "fps": self.fps,
+                "seed": self.seed,
+            },
+            "num_objects": len(self.objects),
+            "counts": self.expected_counts(),
+            "frames": [
+                [
+                    {"id": obj["id"], "class_name": obj["class_name"], "box": box}
+                    for obj, box in self.visible_boxes(frame_index, full_view=True)
+                ]
+                for frame_index in range(self.num_frames)
+            ],
+        }
+
+    def expected_counts(self):
+        """Line -> direction -> class name -> count"""
+        counts = {line["name"]: {"up": {}, "down": {}} for line in self.lines}
+        for obj in self.objects:
+            for line in self.lines:
+                direction = self._crossing(obj, line)
+                if direction:
+                    per_class = counts[line["name"]][direction]
+                    per_class[obj["class_name"]] = per_class.get(obj["class_name"], 0) + 1
+        return counts
+
+    def visible_boxes(self, frame_index, full_view=False):
+        """
+        (object, [x1, y1, x2, y2]) clipped to the frame, for objects on
+        screen (full_view: only the objects entirely inside the frame)
+        """
+        boxes = []
+        for obj in self.objects:
+            box = self._box(obj, frame_index)
+            if box is None:
+                continue
+            if full_view and (
+                box[0] < 0 or box[1] < 0 or box[2] > self.width or box[3] > self.height
+            ):
+                continue
+            x1, y1 = max(0.0, box[0]), max(0.0, box[1])
+            x2, y2 = min(float(self.width), box[2]), min(float(self.height), box[3])
+            if x2 - x1 >= 2 and y2 - y1 >= 2:
+                boxes.append((obj, [round(x1, 2), round(y1, 2), round(x2, 2), round(y2, 2)]))
+        return boxes
+
+    def _build_objects(self):
+        """Lanes and spawn frames of every object in the video"""
+        rng = np.random.default_rng(self.seed)
+        class_names = list(SPRITES)
+        # Vertical lanes cross L1, horizontal lanes cross L2 (2:1)
+        num_vertical = max(1, round(self.density * 2 / 3))
+        num_horizontal = max(0, self.density - num_vertical)
+
+        lanes = []
+        for index in range(num_vertical):
+            x = self.width * (0.1 + 0.8 * (index + 0.5) / num_vertical)
+            # Keep clear of the vertical line L2
+            if abs(x - self.width / 2) < self.width * 0.05:
+                x += self.width * 0.06
+            lanes.append(("vertical", x))
+        for index in range(num_horizontal):
+            y = self.height * (0.1 + 0.8 * (index + 0.5) / num_horizontal)
+            # Keep clear of the horizontal line L1
+            if abs(y - self.height / 2) < self.height * 0.08:
+                y += self.height * 0.1
+            lanes.append(("horizontal", y))
+
+        objects = []
+        for lane_index, (axis, position) in enumerate(lanes):
+            # Lane direction and speed (frame sizes per second)
+            sign = 1 if rng.random() < 0.5 else -1
+            length = self.height if axis == "vertical" else self.width
+            lane_speed = length * rng.uniform(0.25, 0.45) / self.fps
+            frame = int(rng.integers(0, self.fps))
+            previous = None
+            while True:
+                class_name = class_names[int(rng.integers(len(class_names)))]
+                rel_width, rel_height, _ = SPRITES[class_name]
+                # Vehicles face their direction of travel
+                if axis == "vertical" and class_name != "person":
+                    size = (rel_height * self.height, rel_width * self.width)
+                else:
+                    size = (rel_width * self.width, rel_height * self.height)
+                extent = size[1] if axis == "vertical" else size[0]
+                speed = min(lane_speed, MAX_STEP * extent)
+                if previous is not None and speed > previous["speed"]:
+                    # Faster than the previous object: still one sprite length
+                    # behind it when it leaves the frame
+                    frame = max(frame, int(np.ceil(
+                        previous["end_frame"] - (length - extent) / speed
+                    )))
+                if frame >= self.num_frames:
+                    break
+                previous = {
+                    "id": len(objects) + 1,
+                    "class_name": class_name,
+                    "axis": axis,
+                    "position": position + rng.uniform(-0.01, 0.01) * length,
+                    "sign": sign,
+                    "speed": speed,
+                    "start_frame": frame,
+                    "size": size,
+                    # Travel from fully outside one edge to fully outside the other
+                    "end_frame": frame + int(np.ceil((length + extent) / speed)),
+                }
+                objects.append(previous)
+                # Next object once this one has moved two sprite lengths
+                frame += max(1, int(np.ceil(2 * extent / speed))) + int(
+                    rng.integers(0, self.fps // 2 + 1)
+                )
+        return objects
+
+    def _box(self, obj, frame_index):
+        """Unclipped box of an object at a frame, None when it is not spawned"""
+        if not obj["start_frame"] <= frame_index <= obj["end_frame"]:
+            return None
+        width, height = obj["size"]
+        travelled = (frame_index - obj["start_frame"]) * obj["speed"]
+        if obj["axis"] == "vertical":
+            cx = obj["position"]
+            start = -height / 2 if obj["sign"] > 0 else self.height + height / 2
+            cy = start + obj["sign"] * travelled
+        else:
+            cy = obj["position"]
+            start = -width / 2 if obj["sign"] > 0 else self.width + width / 2
+            cx = start + obj["sign"] * travelled
+        return [cx - width / 2, cy - height / 2, cx + width / 2, cy + height / 2]
+
+    def _crossing(self, obj, line):
+        """Counting direction of an object over a line, None if it does not cross"""
+        previous = None
+        for frame_index in range(obj["start_frame"], min(obj["end_frame"], self.num_frames - 1) + 1):
+            box = self._box(obj, frame_index)
+            center = GeometryCalculator.get_bbox_center(box)
+            side = GeometryCalculator.compute_line_side(
+                center, line["start_point"], line["end_point"]
+            )
+            if previous is not None and previous * side <= 0 and previous != side:
+                return "down" if side > 0 else "up"
+            previous = side
+        return None
+
+    def _background(self):
+        """Static road-like background with lane marks and fixed texture"""
+        rng = np.random.default_rng(self.seed + 1)
+        background = np.full((self.height, self.width, 3), 90, dtype=np.uint8)
+        noise = rng.integers(-12, 13, (self.height, self.width, 1), dtype=np.int16)
+        background = np.clip(background + noise, 0, 255).astype(np.uint8)
+        dash = max(4, self.height // 40)
+        for y in range(0, self.height, dash * 3):
+            cv2.rectangle(
+                background, (self.width // 4, y), (self.width // 4 + 2, y + dash),
+                (200, 200, 200), -1,
+            )
+        return background
+
+    @staticmethod
+    def _draw_sprite(frame, class_name, box):
+        """Body plus darker window/head so the sprite has some structure"""
+        _, _, color = SPRITES[class_name]
+        x1, y1, x2, y2 = (int(round(v)) for v in box)
+        cv2.rectangle(frame, (x1, y1), (x2 - 1, y2 - 1), color, -1)
+        dark = tuple(int(c * 0.5) for c in color)
+        inset_x, inset_y = (x2 - x1) // 4, (y2 - y1) // 4
+        if class_name == "person":
+            cv2.circle(frame, ((x1 + x2) // 2, y1 + inset_y), max(1, inset_x), dark, -1)
+        else:
+            cv2.rectangle(
+                frame, (x1 + inset_x, y1 + inset_y), (x2 - inset_x, y2 - inset_y), dark, -1
+            )
@@ -26,7 +26,7 @@ pip3 install -v -e .
 
 
 ## tracker available
-deepsort  bytetrack
+deepsort  bytetrack  bytetrack_native (ByteTrack without yolox)
 """
 
 import logging
@@ -34,6 +34,10 @@ from src.config.config import ConfigManager
 from src.models.model_manager import ModelManager
 from src.modules.utils.parse_arguments import ParseArguments
 from src.modules.engine.video_processor import VideoProcessor
+from src.modules.detector.detector_manager import DetectorManager
+from src.modules.utils.allowed_classes import AllowedClasses
+
+MAX_FRAME = 400
 
 def setup_logging():
     """Configura el sistema de logs."""
@@ -57,11 +61,20 @@ def main():
     model_name = config.get("processor", "model")
     model_config = config.sub_configs.get("model", None)
 
+    # Skip model loading when every frame can be replayed from the detection cache
+    _, allowed_classes = AllowedClasses(config).get_allowed_classes()
+    load_model = not DetectorManager.cached_run_available(
+        config, model_name, ModelManager.model_image_size(model_name),
+        allowed_classes, MAX_FRAME,
+    )
+    if not load_model:
+        logging.info("Replaying detections from cache, model is not loaded")
+
     # Initialize the model manager with the specific config
-    model_handler = ModelManager(model_name, model_config)
+    model_handler = ModelManager(model_name, model_config, load_model=load_model)
 
     # Initialize the video processor with the model handler and config
-    video_processor = VideoProcessor(model_handler, config, max_frame=400)
+    video_processor = VideoProcessor(model_handler, config, max_frame=MAX_FRAME)
     # Process the video
     video_processor.process_video(config)
 
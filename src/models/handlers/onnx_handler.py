@@ -0,0 +1,367 @@
+import hashlib
+import inspect
+import json
+import logging
+import os
+
+import numpy as np
+import torch
+
+try:
+    # Optional: ONNX Runtime inference backend (and its int8 quantization)
+    import onnxruntime
+    from onnxruntime import quantization
+except ImportError:
+    onnxruntime = None
+    quantization = None
+
+
+class ExportWrapper(torch.nn.Module):
+    """Network part of a detector, with plain tensor outputs for the ONNX export"""
+
+    def __init__(self, model, family):
+        super().__init__()
+        self.model = model
+        self.family = family
+
+    def forward(self, images):
+        if self.family == "fasterrcnn":
+            # torchvision takes a list of CHW images: one image per call
+            output = self.model([images[0]])[0]
+            return output["boxes"], output["labels"], output["scores"]
+
+        outputs = self.model(images)
+        if self.family == "efficientdet":
+            # Class outputs then box outputs, one per level
+            class_out, box_out = outputs
+            return (*class_out, *box_out)
+        if self.family == "yolo" and isinstance(outputs, (tuple, list)):
+            # Decoded predictions, without the raw head outputs
+            return outputs[0]
+        return outputs
+
+
+class CalibrationReader:
+    """Feeds model input batches to the ONNX Runtime calibration, one image at a time"""
+
+    def __init__(self, input_name, batches):
+        self.input_name = input_name
+        self.images = (image for batch in batches for image in batch)
+
+    def get_next(self):
+        image = next(self.images, None)
+        if image is None:
+            return None
+        return {self.input_name: image[None].detach().cpu().numpy().astype(np.float32)}
+
+
+class ONNXHandler:
+    """
+    Detector network exported to ONNX once and run with ONNX Runtime (CPU).
+
+    The .onnx file and its metadata (.json) are cached in `cache_dir`. They
+    are keyed like the detection cache: model name, input size, opset, torch
+    version and the weights file (size and modification time). When the
+    artifact is missing, the PyTorch model is loaded with `load_torch_model`
+    and exported. Later runs only create the inference session.
+
+    Only the network is exported. Each family's decoding and NMS stay in
+    PyTorch (ONNXDetector), so the outputs match the PyTorch backend:
+    - yolo: (B, 4 + classes, anchors) predictions, any input size;
+    - yolox: decoded (B, anchors, 5 + classes) predictions, at test_size;
+    - fasterrcnn: boxes, labels and scores of one image (preprocessing and
+      postprocessing included), any input size;
+    - efficientdet: class and box outputs of every level, at image_size.
+
+    Session options: `intra_op_threads` (0 = ONNX Runtime default),
+    `inter_op_threads` (> 1 runs independent nodes in parallel) and
+    `graph_optimization_level` (disable, basic, extended or all).
+
+    precision "int8" runs a quantized copy of the exported model, cached
+    next to it and keyed by the `quantization` settings:
+    - mode "static": weights and activations in int8 (QDQ, int8 weights,
+      uint8 activations). Activation ranges are calibrated on frames of our
+      videos, so the model is also keyed by their content: the detector
+      selects it with use_calibration() and calls calibrate() while
+      `needs_calibration`. Until then the session runs the fp32 model.
+    - mode "dynamic": int8 weights, activation ranges computed per run (no
+      calibration).
+    """
+
+    QUANTIZATION_DEFAULTS = {
+        "calibration_frames": 64,
+        "calibration_method": "minmax",
+        "calibration_videos": [],
+        "mode": "static",
+        "op_types": ["Conv", "MatMul"],
+        "per_channel": True,
+    }
+    CALIBRATION_METHODS = {
+        "minmax": "MinMax",
+        "entropy": "Entropy",
+        "percentile": "Percentile",
+    }
+
+    FAMILIES = (
+        ("tf_efficientdet", "efficientdet"),
+        ("fasterrcnn", "fasterrcnn"),
+        ("yolox", "yolox"),
+        ("yolo", "yolo"),
+    )
+    OPTIMIZATION_LEVELS = {
+        "disable": "ORT_DISABLE_ALL",
+        "basic": "ORT_ENABLE_BASIC",
+        "extended": "ORT_ENABLE_EXTENDED",
+        "all": "ORT_ENABLE_ALL",
+    }
+
+    def __init__(self, model_name, image_size, load_torch_model, model_config=None,
+                 cache_dir="checkpoints/onnx", opset=17, intra_op_threads=0,
+                 inter_op_threads=1, graph_optimization_level="all", precision="fp32",
+                 quantization=None):
+        if onnxruntime is None:
+            raise ImportError("The ONNX backend requires ONNX Runtime (pip install onnxruntime)")
+
+        self.model_name = model_name
+        self.family = self.model_family(model_name)
+        self.image_size = image_size
+        self.model_config = model_config or {}
+        self.opset = opset
+        self.precision = precision
+        self.quantization = {**self.QUANTIZATION_DEFAULTS, **(quantization or {})}
+        self.session_options = (intra_op_threads, inter_op_threads, graph_optimization_level)
+        # ONNX Runtime runs on the CPU
+        self.device = torch.device("cpu")
+
+        key_info = {
+            "model": model_name,
+            "image_size": image_size,
+            "opset": opset,
+            "torch": torch.__version__,
+            "weights": self._weights_info(),
+            "exp_file": self.model_config.get("exp_file"),
+        }
+        key = hashlib.sha1(json.dumps(key_info, sort_keys=True).encode()).hexdigest()[:16]
+        self.fp32_path = os.path.join(cache_dir, f"{model_name}_{key}.onnx")
+        self._meta_file = os.path.splitext(self.fp32_path)[0] + ".json"
+
+        if not (os.path.exists(self.fp32_path) and os.path.exists(self._meta_file)):
+            self.export(load_torch_model(), key_info)
+        with open(self._meta_file, "r") as file:
+            self.meta = json.load(file)
+
+        self.batched = self.meta["batched"]
+        self.parameter_count = self.meta["parameters"]
+        # Read by YOLOXDetector from its model handler
+        self.test_size = tuple(self.meta["input_size"])
+        self.num_classes = self.meta.get("num_classes")
+        self.confthre = self.model_config.get("confthre", 0.5)
+        self.nmsthre = self.model_config.get("nmsthre", 0.5)
+        self.legacy = self.model_config.get("legacy", False)
+
+        # Model run by the session: fp32, or its (cached) int8 version
+        self.path = self.fp32_path
+        self.needs_calibration = False
+        if precision == "int8":
+            if self.quantization["mode"] == "dynamic":
+                self.path = self._int8_path()
+                if not os.path.exists(self.path):
+                    self.quantize_dynamic()
+            else:
+                # Keyed by the calibration videos: selected by the detector
+                # (use_calibration), then calibrated if missing
+                self.needs_calibration = True
+        elif precision != "fp32":
+            raise ValueError(f"Unsupported precision: {precision}")
+
+        self.model = self._create_session()
+        self.input_name = self.model.get_inputs()[0].name
+        # Graph exported without spatial axes (yolox, efficientdet): one input size
+        self.fixed_input_size = all(
+            isinstance(dim, int) for dim in self.model.get_inputs()[0].shape[2:]
+        )
+        self.output_names = [output.name for output in self.model.get_outputs()]
+
+    @classmethod
+    def model_family(cls, model_name):
+        for prefix, family in cls.FAMILIES:
+            if model_name.startswith(prefix):
+                return family
+        raise ValueError(f"Unsupported model: {model_name}")
+
+    def _int8_path(self, video_fingerprints=None):
+        """Quantized model path, keyed by the fp32 model and the quantization settings"""
+        settings = dict(self.quantization)
+        if self.quantization["mode"] == "dynamic":
+            # No calibration involved
+            for name in ("calibration_frames", "calibration_method", "calibration_videos"):
+                settings.pop(name)
+        else:
+            # Videos actually read (configured, or the input video), by content
+            settings["calibration_videos"] = video_fingerprints
+        key = hashlib.sha1(json.dumps(settings, sort_keys=True).encode()).hexdigest()[:8]
+        return os.path.splitext(self.fp32_path)[0] + f"_int8_{key}.onnx"
+
+    def _weights_info(self):
+        """Size and mtime of the local weights (pretrained downloads: None)"""
+        if self.family == "yolo":
+            path = os.path.join(self.model_config.get("model_path", ""), f"{self.model_name}.pt")
+        elif self.family == "yolox":
+            path = os.path.join(self.model_config.get("ckpt_file", ""), f"{self.model_name}.pth")
+        else:
+            return None
+        if not os.path.exists(path):
+            return None
+        stat = os.stat(path)
+        return [stat.st_size, int(stat.st_mtime)]
+
+    def _network(self, torch_model):
+        """(network module, input (height, width), extra metadata) of a loaded model"""
+        if self.family == "yolo":
+            # YOLOHandler -> ultralytics YOLO -> DetectionModel
+            network = torch_model.model.model
+            network.fuse(verbose=False)
+            for module in network.modules():
+                if hasattr(module, "dynamic") and hasattr(module, "export"):
+                    # Detect head: anchors follow the input size
+                    module.dynamic = True
+            return network, (self.image_size, self.image_size), {}
+        if self.family == "yolox":
+            height, width = torch_model.test_size
+            return torch_model.model, (height, width), {"num_classes": torch_model.num_classes}
+        if self.family == "efficientdet":
+            # DetBenchPredict -> EfficientDet (anchors and NMS stay outside)
+            return torch_model.model, (self.image_size, self.image_size), {}
+        return torch_model, (self.image_size, self.image_size), {}
+
+    def export(self, torch_model, key_info):
+        """Export the network to ONNX and write its metadata"""
+        network, (height, width), meta = self._network(torch_model)
+        network = network.to("cpu").eval()
+        wrapper = ExportWrapper(network, self.family).eval()
+        sample = torch.zeros((1, 3, height, width))
+        with torch.no_grad():
+            outputs = wrapper(sample)
+        num_outputs = len(outputs) if isinstance(outputs, (tuple, list)) else 1
+        output_names = [f"output_{idx}" for idx in range(num_outputs)]
+
+        # Batch axis except for torchvision detection (one image per call),
+        # spatial axes for the models that take any (stride multiple) size
+        batched = self.family != "fasterrcnn"
+        input_axes = {0: "batch"} if batched else {}
+        if self.family in ("yolo", "fasterrcnn"):
+            input_axes.update({2: "height", 3: "width"})
+        output_axes = {0: "batch"} if batched else {0: "detections"}
+        if self.family == "yolo":
+            output_axes[2] = "anchors"
+
+        logging.info(f"Exporting {self.model_name} to ONNX: {self.fp32_path}")
+        os.makedirs(os.path.dirname(self.fp32_path) or ".", exist_ok=True)
+        export_kwargs = {}
+        if "dynamo" in inspect.signature(torch.onnx.export).parameters:
+            # TorchScript-based exporter (the dynamo one needs onnxscript)
+            export_kwargs["dynamo"] = False
+        with torch.no_grad():
+            torch.onnx.export(
+                wrapper,
+                sample,
+                self.fp32_path + ".tmp",
+                input_names=["images"],
+                output_names=output_names,
+                dynamic_axes={
+                    "images": input_axes,
+                    **{name: output_axes for name in output_names},
+                },
+                opset_version=self.opset,
+                do_constant_folding=True,
+                **export_kwargs,
+            )
+        os.replace(self.fp32_path + ".tmp", self.fp32_path)
+
+        meta.update({
+            "key": key_info,
+            "family": self.family,
+            "input_size": [height, width],
+            "batched": batched,
+            "parameters": sum(p.numel() for p in network.parameters()),
+        })
+        with open(self._meta_file + ".tmp", "w") as file:
+            json.dump(meta, file, indent=4)
+        os.replace(self._meta_file + ".tmp", self._meta_file)
+
+    def quantize_dynamic(self):
+        """int8 weights, activations quantized on the fly"""
+        logging.info(f"Quantizing {self.model_name} (dynamic int8): {self.path}")
+        quantization.quantize_dynamic(
+            self.fp32_path,
+            self.path + ".tmp",
+            op_types_to_quantize=self.quantization["op_types"],
+            per_channel=self.quantization["per_channel"],
+            weight_type=quantization.QuantType.QInt8,
+        )
+        os.replace(self.path + ".tmp", self.path)
+
+    def use_calibration(self, video_fingerprints):
+        """Static int8 model calibrated on these videos: loaded if cached"""
+        self.path = self._int8_path(video_fingerprints)
+        if os.path.exists(self.path):
+            self.needs_calibration = False
+            self.model = self._create_session()
+
+    def calibrate(self, batches):
+        """
+        Static int8 quantization, with activation ranges measured on `batches`
+        of model inputs (letterboxed frames), then reload the session.
+        """
+        logging.info(f"Quantizing {self.model_name} (static int8): {self.path}")
+        reader = CalibrationReader(self.input_name, batches)
+        # Constant folding and shape inference before inserting the Q/DQ nodes
+        prepared = self.path + ".prepared.onnx"
+        quantization.shape_inference.quant_pre_process(
+            self.fp32_path, prepared, skip_symbolic_shape=True
+        )
+        try:
+            quantization.quantize_static(
+                prepared,
+                self.path + ".tmp",
+                reader,
+                quant_format=quantization.QuantFormat.QDQ,
+                op_types_to_quantize=self.quantization["op_types"],
+                per_channel=self.quantization["per_channel"],
+                activation_type=quantization.QuantType.QUInt8,
+                weight_type=quantization.QuantType.QInt8,
+                calibrate_method=getattr(
+                    quantization.CalibrationMethod,
+                    self.CALIBRATION_METHODS[self.quantization["calibration_method"]],
+                ),
+            )
+        finally:
+            os.remove(prepared)
+        os.replace(self.path + ".tmp", self.path)
+
+        self.needs_calibration = False
+        self.model = self._create_session()
+
+    def _create_session(self):
+        intra_op_threads, inter_op_threads, graph_optimization_level = self.session_options
+        path = self.fp32_path if self.needs_calibration else self.path
+        options = onnxruntime.SessionOptions()
+        options.intra_op_num_threads = intra_op_threads
+        options.inter_op_num_threads = inter_op_threads
+        options.execution_mode = (
+            onnxruntime.ExecutionMode.ORT_PARALLEL
+            if inter_op_threads > 1
+            else onnxruntime.ExecutionMode.ORT_SEQUENTIAL
+        )
+        options.graph_optimization_level = getattr(
+            onnxruntime.GraphOptimizationLevel,
+            self.OPTIMIZATION_LEVELS[graph_optimization_level],
+        )
+        return onnxruntime.InferenceSession(
+            path, options, providers=["CPUExecutionProvider"]
+        )
+
+    def run(self, images):
+        """Network outputs (NumPy arrays) for a (B, 3, H, W) float input tensor"""
+        images = np.ascontiguousarray(images.detach().cpu().numpy(), dtype=np.float32)
+        return self.model.run(self.output_names, {self.input_name: images})
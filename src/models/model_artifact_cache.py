@@ -0,0 +1,93 @@
+import hashlib
+import importlib.metadata
+import json
+import logging
+import os
+import pickle
+
+import torch
+
+
+class ModelArtifactCache:
+    """
+    Prepared PyTorch model serialized once, loaded directly on later runs.
+
+    The artifact is the model object the detectors use, once every
+    preparation step is done (weights loaded, eval mode, Conv+BN fused):
+    the YOLO / YOLOX handlers, the torchvision and effdet modules. It is
+    pickled with torch.save, with its parameter counts. Loading it skips
+    the model construction, the weights loading (or download) and the
+    fusing.
+
+    A pickle only loads with the code that wrote it, so the key holds the
+    model name, device, input size, the model options, the weights file
+    (size and mtime) and the versions of torch and of the model libraries.
+    An artifact that fails to load is rebuilt; a model that cannot be
+    pickled is used as it is (nothing is stored).
+
+    Loading an artifact unpickles it, so the cache is off by default
+    (`artifacts.enabled`, --model-artifacts True).
+    """
+
+    LIBRARIES = ("torch", "torchvision", "ultralytics", "yolox", "effdet", "timm")
+
+    def __init__(self, cache_dir, model_name, device, image_size, options=None,
+                 weights_path=None):
+        self.device = device
+        key_info = {
+            "model": model_name,
+            "device": str(device),
+            "image_size": image_size,
+            "options": options or {},
+            "weights": self._file_info(weights_path),
+            "versions": self._versions(),
+        }
+        key = hashlib.sha1(json.dumps(key_info, sort_keys=True).encode()).hexdigest()[:16]
+        self.path = os.path.join(cache_dir, f"{model_name}_{device.type}_{key}.pt")
+        # "loaded", "stored" or "unavailable", once load() ran
+        self.status = None
+        self.parameters = None
+
+    @staticmethod
+    def _file_info(path):
+        if not path or not os.path.exists(path):
+            return None
+        stat = os.stat(path)
+        return [stat.st_size, int(stat.st_mtime)]
+
+    @classmethod
+    def _versions(cls):
+        versions = {}
+        for library in cls.LIBRARIES:
+            try:
+                versions[library] = importlib.metadata.version(library)
+            except importlib.metadata.PackageNotFoundError:
+                versions[library] = None
+        return versions
+
+    def load(self, build):
+        """
+        The cached model, or build it and store it.
+        build() -> (model, (total, trainable) parameter counts)
+        """
+        if os.path.exists(self.path):
+            try:
+                artifact = torch.load(self.path, map_location=self.device, weights_only=False)
+                self.parameters = tuple(artifact["parameters"])
+                self.status = "loaded"
+                return artifact["model"]
+            except Exception as error:
+                logging.warning(f"Rebuilding model artifact {self.path}: {error}")
+
+        model, self.parameters = build()
+        self.status = "stored"
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        try:
+            torch.save({"model": model, "parameters": self.parameters}, self.path + ".tmp")
+            os.replace(self.path + ".tmp", self.path)
+        except (pickle.PicklingError, TypeError, AttributeError) as error:
+            logging.warning(f"Model artifact not stored, {error}")
+            self.status = "unavailable"
+            if os.path.exists(self.path + ".tmp"):
+                os.remove(self.path + ".tmp")
+        return model
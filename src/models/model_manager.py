@@ -1,21 +1,94 @@
+import logging
+import time
+
 import torch
 
 from src.models.handlers.efficientdet_handler import EfficientdetHandler
 from src.models.handlers.faster_rcnn_handler import FasterRCNNHandler
-from src.models.handlers.yolox_handler import YOLOXHandler
+from src.models.handlers.onnx_handler import ONNXHandler
 from src.models.handlers.yolo_handler import YOLOHandler
+from src.models.model_artifact_cache import ModelArtifactCache
 
 
 class ModelManager:
-    def __init__(self, model_name, config=None):
+    def __init__(self, model_name, config=None, load_model=True):
+        # Start of the run, for the time to first frame
+        self.load_start = time.perf_counter()
         self.model_name = model_name
-        self.device = self.setup_device()
-        self.config = config
-        self.model = self._load_model()
+        self.config = config or {}
+        config_runtime = self.config.get("runtime", {})
+        self.backend, self.precision = self.runtime_settings(config_runtime)
+        if self.backend != config_runtime.get("backend", "torch"):
+            logging.info("int8 precision runs the quantized model with ONNX Runtime")
+        self.device = self.setup_device() if self.backend == "torch" else torch.device("cpu")
         self.image_size = self.get_image_size()
-        self.param = self.get_model_parameters(self.model)
+        # Prepared PyTorch model, serialized on the first run (see ModelArtifactCache)
+        self.artifact = None
+        # load_model=False is used when detections are replayed from the cache
+        self.model = self._load_model() if load_model else None
+        self.param = self.get_model_parameters(self.model) if load_model else (0, 0)
+        self.load_seconds = time.perf_counter() - self.load_start
+
+    @staticmethod
+    def runtime_settings(config_runtime):
+        """(backend, precision) of a runtime config, available without loading the model"""
+        # Inference backend: torch, or onnx (ONNX Runtime, CPU)
+        backend = config_runtime.get("backend", "torch")
+        # Weights/activations: fp32, or int8 (quantized ONNX model)
+        precision = config_runtime.get("precision", "fp32")
+        if precision == "int8":
+            # The quantized model runs with ONNX Runtime
+            backend = "onnx"
+        return backend, precision
 
     def _load_model(self):
+        if self.backend == "onnx":
+            # Exported from the PyTorch model on the first run, then cached
+            return ONNXHandler(
+                self.model_name,
+                self.image_size,
+                self._load_torch_model,
+                model_config=self.config.get("yolox" if "yolox" in self.model_name else "yolo", {}),
+                precision=self.precision,
+                quantization=self.config.get("quantization", {}),
+                **self.config.get("onnx", {}),
+            )
+        if self.backend != "torch":
+            raise ValueError(f"Unsupported backend: {self.backend}")
+        config_artifacts = self.config.get("artifacts", {})
+        if not config_artifacts.get("enabled", False):
+            return self._load_torch_model()
+
+        options, weights_path = {}, None
+        if self.model_name.startswith("yolo"):
+            family = "yolox" if "yolox" in self.model_name else "yolo"
+            options = self.config.get(family, {})
+            weights_dir = options.get("ckpt_file" if family == "yolox" else "model_path")
+            extension = ".pth" if family == "yolox" else ".pt"
+            weights_path = f"{weights_dir}/{self.model_name}{extension}"
+        self.artifact = ModelArtifactCache(
+            config_artifacts.get("cache_dir", "checkpoints/artifacts"),
+            self.model_name,
+            self.device,
+            self.image_size,
+            options=options,
+            weights_path=weights_path,
+        )
+        model = self.artifact.load(self._prepare_torch_model)
+        logging.info(f"Model artifact {self.artifact.status}: {self.artifact.path}")
+        return model
+
+    def _prepare_torch_model(self):
+        """(model with every preparation step done, parameter counts) of the artifact"""
+        model = self._load_torch_model()
+        # Counted before fusing, as without the artifact
+        parameters = self._count_parameters(model)
+        if isinstance(model, YOLOHandler):
+            # Conv+BN fusing, otherwise done by ultralytics at the first prediction
+            model.model.fuse()
+        return model, parameters
+
+    def _load_torch_model(self):
         if self.model_name.startswith("tf_efficientdet"):
             model = EfficientdetHandler(self.model_name, self.device).model
 
@@ -24,7 +97,10 @@ class ModelManager:
 
         elif self.model_name.startswith("yolo"):
             if "yolox" in self.model_name:
-                # If the model name is YOLOX, use YOLOXHandler
+                # If the model name is YOLOX, use YOLOXHandler (imported on use:
+                # only YOLOX models need the yolox package)
+                from src.models.handlers.yolox_handler import YOLOXHandler
+
                 yolox_config = self.config.get("yolox", {})
                 model = YOLOXHandler(self.model_name, self.device, **yolox_config)
             else:
@@ -40,20 +116,39 @@ class ModelManager:
     def get_model_parameters(self, model):
         """Verify and print model parameter information"""
 
-        try:
-            model_parameters = self.model.parameters()
-        except AttributeError:
-            model_parameters = self.model.model.parameters()
+        if self.backend == "onnx":
+            # Counted at export, the session has no parameters to inspect
+            print(f"Total parameters: {self.model.parameter_count:,}")
+            return self.model.parameter_count, 0
 
-        total_params = sum(p.numel() for p in model_parameters)
-        trained_params = sum(p.numel() for p in model_parameters if p.requires_grad)
+        if self.artifact is not None:
+            # Counted when the artifact was stored
+            total_params, trained_params = self.artifact.parameters
+        else:
+            total_params, trained_params = self._count_parameters(model)
 
         print(f"Total parameters: {total_params:,}")
         print(f"Trainable parameters: {trained_params:,}")
 
         return total_params, trained_params
 
+    @staticmethod
+    def _count_parameters(model):
+        try:
+            model_parameters = model.parameters()
+        except AttributeError:
+            model_parameters = model.model.parameters()
+
+        total_params = sum(p.numel() for p in model_parameters)
+        trained_params = sum(p.numel() for p in model_parameters if p.requires_grad)
+        return total_params, trained_params
+
     def get_image_size(self):
+        return self.model_image_size(self.model_name)
+
+    @staticmethod
+    def model_image_size(model_name):
+        """Model input size, available without loading the model"""
         size_map = {
             "tf_efficientdet_d0": 512,
             "tf_efficientdet_d1": 640,
@@ -67,11 +162,11 @@ class ModelManager:
         }
 
         # If model name starts with "yolo", return 640
-        if self.model_name.startswith("yolo"):
+        if model_name.startswith("yolo"):
             return 640
 
         # Return size from size_map or default to None
-        return size_map.get(self.model_name, None)
+        return size_map.get(model_name, None)
 
     def get_model(self):
         """Return the loaded model"""
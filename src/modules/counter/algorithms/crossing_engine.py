@@ -0,0 +1,130 @@
+import numpy as np
+
+from src.modules.utils.track_state_store import TrackStateStore
+
+class CrossingEngine:
+    """
+    Vectorised line crossing test for all tracks and lines of a frame.
+
+    Same rule as GeometryCalculator, for every (track, line) pair at once:
+    a track is near a line when its center projects onto the segment and
+    lies closer to it than 1.5 x the smaller box side. A near track is
+    counted once per line when its side of the line changes sign since the
+    last frame it was near.
+
+    The state per (track, line) is in arrays with one row per track slot:
+    the previous side (NaN = never near the line yet) and whether it was
+    counted. Track ids are mapped to slots by a TrackStateStore: a track not
+    seen for `ttl` updates (or the least recently seen one past `max_size`
+    tracks) releases its slot, which is reset and reused. The TTL must
+    exceed the time the tracker keeps lost tracks, or a track that comes
+    back would start over (and could be counted again).
+    """
+
+    def __init__(self, capacity=256, ttl=None, max_size=None):
+        self.capacity = capacity
+        self.ttl = ttl
+        self.max_size = max_size
+        self.frame = 0
+        self.line_key = None
+        self._reset(0)
+
+    def _reset(self, num_lines):
+        self.slots = TrackStateStore(self.ttl, self.max_size, on_evict=self._free_slot)
+        self.prev_side = np.full((self.capacity, num_lines), np.nan)
+        self.counted = np.zeros((self.capacity, num_lines), dtype=bool)
+        self.free_slots = list(range(self.capacity - 1, -1, -1))
+
+    def _free_slot(self, track_id, slot):
+        self.prev_side[slot] = np.nan
+        self.counted[slot] = False
+        self.free_slots.append(slot)
+
+    def _new_slot(self):
+        if not self.free_slots:
+            # Double the slot rows, keeping the existing state
+            size, num_lines = self.prev_side.shape
+            self.prev_side = np.concatenate([self.prev_side, np.full((size, num_lines), np.nan)])
+            self.counted = np.concatenate([self.counted, np.zeros((size, num_lines), dtype=bool)])
+            self.free_slots = list(range(2 * size - 1, size - 1, -1))
+        return self.free_slots.pop()
+
+    def _track_slots(self, track_ids):
+        """Slot of every track id (new ids get a free slot), expired tracks released"""
+        self.frame += 1
+        self.slots.expire(self.frame)
+        slots = np.empty(len(track_ids), dtype=np.int64)
+        for idx, track_id in enumerate(track_ids):
+            slot = self.slots.get(track_id)
+            if slot is None:
+                slot = self._new_slot()
+                self.slots.put(track_id, slot, self.frame)
+            else:
+                self.slots.touch(track_id, self.frame)
+            slots[idx] = slot
+        return slots
+
+    def _check_lines(self, lines):
+        """Reset the state when the set of lines changes"""
+        line_key = tuple(id(line) for line in lines)
+        if line_key != self.line_key:
+            self._reset(len(lines))
+            self.line_key = line_key
+
+    @staticmethod
+    def line_array(lines):
+        """(L, 4) x1, y1, x2, y2 of the line dicts"""
+        return np.array(
+            [[*line["start_point"], *line["end_point"]] for line in lines], dtype=np.float64
+        ).reshape(-1, 4)
+
+    @staticmethod
+    def sides(boxes, lines):
+        """
+        (N, L) signed distance of every center to every line and whether the
+        center is near the line. `boxes` is (N, 4) center x, center y, width,
+        height and `lines` is (L, 4) x1, y1, x2, y2.
+        """
+        x1, y1, x2, y2 = (lines[:, i][None, :] for i in range(4))
+        line_dx, line_dy = x2 - x1, y2 - y1
+        line_length = np.sqrt(line_dx ** 2 + line_dy ** 2)
+        point_dx = boxes[:, 0:1] - x1
+        point_dy = boxes[:, 1:2] - y1
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            unit_x, unit_y = line_dx / line_length, line_dy / line_length
+            projection = point_dx * unit_x + point_dy * unit_y
+            distance = np.abs(unit_x * point_dy - unit_y * point_dx)
+            side = (line_dx * point_dy - point_dx * line_dy) / line_length
+
+        threshold = np.minimum(boxes[:, 2], boxes[:, 3])[:, None] * 1.5
+        near = (
+            (line_length > 0)
+            & (projection >= 0) & (projection <= line_length)
+            & (distance < threshold)
+        )
+        return side, near
+
+    def update(self, track_ids, boxes, lines):
+        """
+        Crossings of this frame as (track index, line index, side) arrays,
+        ordered by line then track.
+        """
+        self._check_lines(lines)
+        slots = self._track_slots(track_ids)
+        empty = np.empty(0, dtype=np.int64)
+        if len(track_ids) == 0 or len(lines) == 0:
+            return empty, empty, np.empty(0)
+
+        side, near = self.sides(boxes, self.line_array(lines))
+
+        prev_side = self.prev_side[slots]
+        counted = self.counted[slots]
+        # NaN previous side (first time near) never compares as a crossing
+        crossed = near & ~counted & (prev_side * side <= 0)
+
+        self.counted[slots] = counted | crossed
+        self.prev_side[slots] = np.where(near, side, prev_side)
+
+        line_index, track_index = np.nonzero(crossed.T)
+        return track_index, line_index, side[track_index, line_index]
@@ -1,123 +1,49 @@
-from src.modules.counter.algorithms.geometry_calculator import GeometryCalculator
+import numpy as np
+
+from src.modules.counter.algorithms.crossing_engine import CrossingEngine
 
 class ObjectCounter:
     """
     Tracks objects crossing lines and maintains counts by direction and object class
     """
-    def __init__(self, allowed_classes=None, class_names=None):
+    def __init__(self, allowed_classes=None, class_names=None, state_ttl=None,
+                 state_max_size=None):
         self.allowed_classes = set(allowed_classes or [])
+        self.allowed_array = np.array(sorted(self.allowed_classes), dtype=np.int64)
         self.class_names = class_names or []
-        self.geometry = GeometryCalculator()
+        # Per-track crossing state, released after state_ttl updates unseen
+        self.engine = CrossingEngine(ttl=state_ttl, max_size=state_max_size)
 
     def update(self, tracks, lines):
         """
         Update object counts based on current tracked objects
         """
-        for line in lines:
-            self._process_line_crossings(line, tracks)
-
-    def _process_line_crossings(self, line, tracks):
-        """Process all tracks for a specific line"""
-        for track in tracks:
-            # Skip if not a valid track or not in allowed classes
-            if not self._is_valid_track(track):
-                continue
-
-            # Get the bounding box and center point
-            bbox = self._get_track_bbox(track)
-            if bbox is None:
-                continue
-
-            center = self.geometry.get_bbox_center(bbox)
-            threshold = self.geometry.get_adaptive_threshold(bbox)
-
-            # Skip if not near the line
-            if not self.geometry.is_point_near_line(
-                center, line["start_point"], line["end_point"], threshold
-            ):
-                continue
-
-            # Process the crossing
-            self._update_crossing_count(line, track, center)
-
-    def _is_valid_track(self, track):
-        """Check if track is valid and belongs to allowed classes"""
-        # Check if track is confirmed - different trackers use different methods
-        if hasattr(track, "is_confirmed") and callable(getattr(track, "is_confirmed")):
-            is_confirmed = track.is_confirmed()
-        elif hasattr(track, "is_activated"):
-            is_confirmed = track.is_activated
-        else:
-            return False
-
-        # Check class - different trackers use different attributes
-        if hasattr(track, "det_class"):
-            class_id = track.det_class
-        elif hasattr(track, "label"):
-            class_id = track.label
-        else:
-            return False
-
-        # Track must be confirmed and in allowed classes (if specified)
-        return is_confirmed and (
-            not self.allowed_classes or class_id in self.allowed_classes
+        tracks = self._countable(tracks)
+        track_index, line_index, sides = self.engine.update(
+            tracks.track_ids.tolist(), tracks.centers(), lines
         )
 
-    def _get_track_bbox(self, track):
-        """Get the bounding box from a track object, handling different formats"""
-        if hasattr(track, "to_ltrb") and callable(getattr(track, "to_ltrb")):
-            # DeepSORT format
-            return track.to_ltrb()
-        elif hasattr(track, "tlwh"):
-            # ByteTrack format
-            l, t, w, h = track.tlwh  # noqa: E741
-            return [l, t, l + w, t + h]
-        return None
-
-    def _update_crossing_count(self, line, track, center):
-        """Update crossing counts for a single track"""
-        track_id = track.track_id
-
-        # Get class ID according to tracker type
-        class_id = track.det_class if hasattr(track, "det_class") else track.label
-
-        # Get current side of the line
-        current_side = self.geometry.compute_line_side(
-            center, line["start_point"], line["end_point"]
-        )
-
-        # Initialize tracking state for new objects
-        if track_id not in line["tracked_objects"]:
-            line["tracked_objects"][track_id] = {
-                "prev_side": current_side,
-                "class": class_id,
-                "counted": False,
-            }
-            return
-
-        # Get the current state for this object
-        current_state = line["tracked_objects"][track_id]
-
-        # Check if the object has crossed the line
-        if (
-            not current_state["counted"]
-            and current_state["prev_side"] * current_side <= 0
+        # Crossings come ordered by line then track, as counted one by one
+        classes = tracks.class_ids.tolist()
+        for track_idx, line_idx, side in zip(
+            track_index.tolist(), line_index.tolist(), sides.tolist()
         ):
+            class_id = classes[track_idx]
             # Determine direction of crossing (based on sign of current side)
-            direction = "down" if current_side > 0 else "up"
-
-            # Initialize counter if needed
-            if class_id not in line["counts"][direction]:
-                line["counts"][direction][class_id] = 0
-
-            # Increment count
-            line["counts"][direction][class_id] += 1
-
-            # Mark as counted to prevent multiple counts for same crossing
-            current_state["counted"] = True
-
-        # Update previous side
-        current_state["prev_side"] = current_side
+            direction = "down" if side > 0 else "up"
+            counts = lines[line_idx]["counts"][direction]
+            counts[class_id] = counts.get(class_id, 0) + 1
+
+    def state_stats(self):
+        """Live and released per-track crossing states"""
+        return self.engine.slots.stats()
+
+    def _countable(self, tracks):
+        """Confirmed tracks of allowed classes"""
+        tracks = tracks.active()
+        if self.allowed_classes:
+            tracks = tracks.select(np.isin(tracks.class_ids, self.allowed_array))
+        return tracks
 
     def get_counts(self):
         """Get counts for all lines"""
@@ -3,12 +3,20 @@ from src.modules.counter.algorithms.object_counter import ObjectCounter
 from src.modules.counter.algorithms.counter_visualizer import CounterVisualizer
 from src.modules.drawer.line_drawer import LineDrawer
 
+LINES_GEOMETRY_PATH = "src/modules/counter/lines_geometry.json"
+
 class CounterManager:
     """Integrates object counting with the main video processing pipeline"""
 
     def __init__(self, class_names, allowed_classes, config_video, config_drawer, config_processor):
      
-        self.counter = ObjectCounter(allowed_classes, class_names)
+        self.lines_path = config_video.get("lines_path", LINES_GEOMETRY_PATH)
+        self.counter = ObjectCounter(
+            allowed_classes,
+            class_names,
+            state_ttl=config_processor.get("track_state_ttl"),
+            state_max_size=config_processor.get("track_state_max_size"),
+        )
         self.visualizer = CounterVisualizer(self.counter, class_names)
         self.drawer = (
             LineDrawer(config_video, config_drawer)
@@ -31,28 +39,61 @@ class CounterManager:
     def process_frame(self, frame, tracks):
         """Process tracks for a frame and draw visualization"""
         # Update counters with current tracks
-        self.counter.update(tracks, self.lines_geometry)
+        self.update(tracks)
         # Draw visualization on the frame
-        frame = self.visualizer.draw(frame, self.lines_geometry)
-        return frame
+        return self.draw(frame)
+
+    def update(self, tracks):
+        """Update counters with current tracks (no drawing)"""
+        self.counter.update(tracks, self.lines_geometry)
+
+    def draw(self, frame, lines=None):
+        """Draw lines and counts; `lines` can be a snapshot taken by update time"""
+        return self.visualizer.draw(
+            frame, self.lines_geometry if lines is None else lines
+        )
+
+    def snapshot_lines(self):
+        """Copy of the lines with their current counts, safe to draw from another thread"""
+        return [
+            {
+                "name": line["name"],
+                "start_point": line["start_point"],
+                "end_point": line["end_point"],
+                "color": line["color"],
+                "counts": {
+                    "up": dict(line["counts"]["up"]),
+                    "down": dict(line["counts"]["down"]),
+                },
+            }
+            for line in self.lines_geometry
+        ]
 
     def load_lines_geometry(self):
         """
         Load lines geometry from a JSON file.
         Returns a list of line configurations.
         """
+        return self.read_lines_geometry(self.lines_path)
+
+    @staticmethod
+    def read_lines_geometry(path=LINES_GEOMETRY_PATH):
+        """Read lines from a JSON file and initialize their counting state"""
         try:
             # Load lines from file
-            with open("src/modules/counter/lines_geometry.json", "r") as file:
+            with open(path, "r") as file:
                 lines = json.load(file)
-                # Initialize tracking state for each line
+                # Initialize counts for each line (crossing state is in ObjectCounter)
                 for line in lines:
                     line.setdefault("counts", {"up": {}, "down": {}})
-                    line.setdefault("tracked_objects", {})
                 return lines
         except FileNotFoundError:
             return []
 
+    def state_stats(self):
+        """Per-track state counters of the object counter"""
+        return self.counter.state_stats()
+
     def get_counts(self):
         """Get current counts for all lines"""
         return self.counter.get_counts()
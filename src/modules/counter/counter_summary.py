@@ -1,6 +1,8 @@
 import torch
 import datetime
 import csv
+import os
+import time
 
 class CounterSummary:
     def __init__(self, model_handler, class_names, config_processor, config_video):
@@ -8,13 +10,36 @@ class CounterSummary:
         self.class_names = class_names
         
         self.model_name = config_processor["model"]
+        # Inference backend and model precision (fp32 / int8)
+        self.backend = getattr(model_handler, "backend", "torch")
+        self.precision = getattr(model_handler, "precision", "fp32")
         self.summary_data = {}
-        self.output_file = f"Summary/counter_summary_{self.model_name}.txt"
+        # Directory of the summary files (benchmarks write to their own)
+        self.summary_dir = config_processor.get("summary_dir", "Summary")
+        # Other backends/precisions keep their own files, next to the torch fp32 ones
+        name_parts = [self.model_name]
+        if self.backend != "torch":
+            name_parts.append(self.backend)
+        if self.precision != "fp32":
+            name_parts.append(self.precision)
+        self.run_name = "_".join(name_parts)
+        self.file_prefix = os.path.join(self.summary_dir, f"counter_summary_{self.run_name}")
+        self.output_file = self.file_prefix + ".txt"
         self.start_time = None
         self.end_time = None
         self.frame_count = 0
         self.fps_measurements = []
         self.detection_counts = 0
+        # Motion gate: sampled frames checked / frames that skipped the detector
+        self.gate_frames = None
+        self.gated_frames = 0
+        # Per-stage latency (StageProfiler.stats())
+        self.stage_stats = {}
+        # Per-track state stores: {name: TrackStateStore.stats()}
+        self.state_stats = {}
+        # Startup: detector warm-up seconds, first frame out (perf_counter)
+        self.warmup_seconds = None
+        self.first_frame_time = None
         self.processing_stats = {
             "input_video": config_video["input_path"],
             "output_video": config_video["output_path"],
@@ -22,6 +47,8 @@ class CounterSummary:
             if config_processor["enable_tracking"]
             else "None",
             "frame_skip": config_processor["frame_skip"],
+            "backend": self.backend,
+            "precision": self.precision,
         }
 
     def start_processing(self):
@@ -34,11 +61,70 @@ class CounterSummary:
 
     def update_frame_stats(self, fps, detection_count=0):
         """Update per-frame statistics"""
+        if self.first_frame_time is None:
+            self.first_frame_time = time.perf_counter()
         self.frame_count += 1
         if fps > 0:  # Ignore zero FPS values
             self.fps_measurements.append(fps)
         self.detection_counts += detection_count
 
+    def update_warmup_stats(self, warmup_seconds):
+        """Record the detector warm-up time (None without warm-up)"""
+        self.warmup_seconds = warmup_seconds
+
+    def startup_stats(self):
+        """
+        Model load (artifact loaded / stored), warm-up and time to first
+        frame: from the start of the model load to the first processed frame.
+        """
+        stats = {}
+        load_seconds = getattr(self.model_handler, "load_seconds", None)
+        if load_seconds is not None:
+            stats["model_load_seconds"] = load_seconds
+        artifact = getattr(self.model_handler, "artifact", None)
+        if artifact is not None:
+            stats["model_artifact"] = artifact.status
+        if self.warmup_seconds is not None:
+            stats["warmup_seconds"] = self.warmup_seconds
+        load_start = getattr(self.model_handler, "load_start", None)
+        if load_start is not None and self.first_frame_time is not None:
+            stats["time_to_first_frame"] = self.first_frame_time - load_start
+        return stats
+
+    def startup_lines(self, stats):
+        """Startup table, one line per step"""
+        lines = []
+        if "model_load_seconds" in stats:
+            artifact = f" (artifact {stats['model_artifact']})" if "model_artifact" in stats else ""
+            lines.append(f"  Model Load: {stats['model_load_seconds']:.2f} s{artifact}")
+        if "warmup_seconds" in stats:
+            lines.append(f"  Warm-up: {stats['warmup_seconds']:.2f} s")
+        if "time_to_first_frame" in stats:
+            lines.append(f"  Time to First Frame: {stats['time_to_first_frame']:.2f} s")
+        return lines
+
+    def update_gate_stats(self, gate_frames, gated_frames):
+        """Record how many sampled frames skipped the detector (motion gate)"""
+        self.gate_frames = gate_frames
+        self.gated_frames = gated_frames
+
+    def update_stage_stats(self, stage_stats):
+        """Record the per-stage latency breakdown"""
+        self.stage_stats = stage_stats
+
+    def update_state_stats(self, state_stats):
+        """Record the live/released entries of the per-track state stores"""
+        self.state_stats = {name: stats for name, stats in state_stats.items() if stats}
+
+    def state_lines(self):
+        """Per-track state table, one line per store"""
+        return [
+            f"  {name}: live {stats['live']}, peak {stats['peak']}, "
+            f"expired {stats['expired']}, evicted {stats['evicted']}, "
+            f"removed {stats['removed']}"
+            for name, stats in self.state_stats.items()
+        ]
+
     def update_from_lines(self, lines_geometry):
         """Update summary data from the lines geometry data"""
         if self.model_name not in self.summary_data:
@@ -70,6 +156,8 @@ class CounterSummary:
             stats["processing_end"] = self.end_time.strftime("%Y-%m-%d %H:%M:%S")
             stats["processing_duration"] = str(processing_duration)
             stats["processing_seconds"] = processing_duration.total_seconds()
+            if stats["processing_seconds"] > 0:
+                stats["fps_effective"] = self.frame_count / stats["processing_seconds"]
 
         # Calculate FPS statistics
         if self.fps_measurements:
@@ -80,11 +168,18 @@ class CounterSummary:
                 len(self.fps_measurements) // 2
             ]
 
+        stats.update(self.startup_stats())
+
         # Other statistics
         stats["frames_processed"] = self.frame_count
         stats["detections_total"] = self.detection_counts
         if self.frame_count > 0:
             stats["detections_per_frame_avg"] = self.detection_counts / self.frame_count
+        if self.gate_frames is not None:
+            stats["gated_frames"] = self.gated_frames
+            stats["gated_ratio"] = (
+                self.gated_frames / self.gate_frames if self.gate_frames else 0.0
+            )
 
         # Calculate total counts across all lines
         total_up = 0
@@ -128,6 +223,7 @@ class CounterSummary:
         print(f"  Input Video: {stats['input_video']}")
         print(f"  Output Video: {stats['output_video']}")
         print(f"  Model: {self.model_name}")
+        print(f"  Backend: {stats['backend']} ({stats['precision']})")
         print(f"  Tracking Algorithm: {stats['tracking_algorithm']}")
         print(f"  Device: {stats['device']}")
         if "cuda_memory_allocated_peak" in stats:
@@ -140,18 +236,41 @@ class CounterSummary:
             print(f"  Duration: {stats['processing_duration']}")
             print(f"  Total Seconds: {stats['processing_seconds']:.2f}")
 
+        startup_lines = self.startup_lines(stats)
+        if startup_lines:
+            print("\nSTARTUP:")
+            for line in startup_lines:
+                print(line)
+
         print("\nPERFORMANCE:")
         if "fps_mean" in stats:
             print(f"  Average FPS: {stats['fps_mean']:.2f}")
             print(f"  Median FPS: {stats['fps_median']:.2f}")
             print(f"  Min FPS: {stats['fps_min']:.2f}")
             print(f"  Max FPS: {stats['fps_max']:.2f}")
+        if "fps_effective" in stats:
+            print(f"  Effective FPS (frames / duration): {stats['fps_effective']:.2f}")
         print(f"  Frames Processed: {stats['frames_processed']}")
         print(f"  Frame Skip Rate: {stats['frame_skip']}")
         if "detections_per_frame_avg" in stats:
             print(
                 f"  Average Detections per Frame: {stats['detections_per_frame_avg']:.2f}"
             )
+        if "gated_ratio" in stats:
+            print(
+                f"  Gated Frames (detector skipped): {stats['gated_frames']} "
+                f"({stats['gated_ratio']:.1%})"
+            )
+
+        if self.stage_stats:
+            print("\nSTAGE LATENCY (ms):")
+            for line in self.stage_lines():
+                print(line)
+
+        if self.state_stats:
+            print("\nTRACK STATE:")
+            for line in self.state_lines():
+                print(line)
 
         print("\nCOUNTING STATISTICS:")
         print(f"  Total Up: {stats['total_up']}")
@@ -184,6 +303,22 @@ class CounterSummary:
                 print(f"  Total Down: {counts['total_down']}")
                 print(f"  Overall Total: {counts['total_up'] + counts['total_down']}")
 
+    def stage_lines(self):
+        """Per-stage latency table, one line per stage"""
+        total = sum(stage["total_ms"] for stage in self.stage_stats.values())
+        lines = [
+            f"  {'Stage':<12}{'Count':>8}{'Mean':>10}{'P50':>10}{'P95':>10}"
+            f"{'P99':>10}{'Max':>10}{'Share':>8}"
+        ]
+        for name, stage in self.stage_stats.items():
+            share = stage["total_ms"] / total if total else 0.0
+            lines.append(
+                f"  {name:<12}{stage['count']:>8}{stage['mean_ms']:>10.2f}"
+                f"{stage['p50_ms']:>10.2f}{stage['p95_ms']:>10.2f}"
+                f"{stage['p99_ms']:>10.2f}{stage['max_ms']:>10.2f}{share:>8.1%}"
+            )
+        return lines
+
     def export_to_file(self):
         """Export the summary to a text file"""
         stats = self.get_processing_stats()
@@ -200,6 +335,7 @@ class CounterSummary:
             f.write(f"  Input Video: {stats['input_video']}\n")
             f.write(f"  Output Video: {stats['output_video']}\n")
             f.write(f"  Model: {self.model_name}\n")
+            f.write(f"  Backend: {stats['backend']} ({stats['precision']})\n")
             f.write(f"  Tracking Algorithm: {stats['tracking_algorithm']}\n")
             f.write(f"  Device: {stats['device']}\n")
             if "cuda_memory_allocated_peak" in stats:
@@ -212,18 +348,43 @@ class CounterSummary:
                 f.write(f"  Duration: {stats['processing_duration']}\n")
                 f.write(f"  Total Seconds: {stats['processing_seconds']:.2f}\n")
 
+            startup_lines = self.startup_lines(stats)
+            if startup_lines:
+                f.write("\nSTARTUP:\n")
+                for line in startup_lines:
+                    f.write(line + "\n")
+
             f.write("\nPERFORMANCE:\n")
             if "fps_mean" in stats:
                 f.write(f"  Average FPS: {stats['fps_mean']:.2f}\n")
                 f.write(f"  Median FPS: {stats['fps_median']:.2f}\n")
                 f.write(f"  Min FPS: {stats['fps_min']:.2f}\n")
                 f.write(f"  Max FPS: {stats['fps_max']:.2f}\n")
+            if "fps_effective" in stats:
+                f.write(
+                    f"  Effective FPS (frames / duration): {stats['fps_effective']:.2f}\n"
+                )
             f.write(f"  Frames Processed: {stats['frames_processed']}\n")
             f.write(f"  Frame Skip Rate: {stats['frame_skip']}\n")
             if "detections_per_frame_avg" in stats:
                 f.write(
                     f"  Average Detections per Frame: {stats['detections_per_frame_avg']:.2f}\n"
                 )
+            if "gated_ratio" in stats:
+                f.write(
+                    f"  Gated Frames (detector skipped): {stats['gated_frames']} "
+                    f"({stats['gated_ratio']:.1%})\n"
+                )
+
+            if self.stage_stats:
+                f.write("\nSTAGE LATENCY (ms):\n")
+                for line in self.stage_lines():
+                    f.write(line + "\n")
+
+            if self.state_stats:
+                f.write("\nTRACK STATE:\n")
+                for line in self.state_lines():
+                    f.write(line + "\n")
 
             f.write("\nCOUNTING STATISTICS:\n")
             f.write(f"  Total Up: {stats['total_up']}\n")
@@ -262,13 +423,16 @@ class CounterSummary:
 
     def export_to_csv(self):
         """Export summary data to CSV for further analysis"""
-        csv_file = f"Summary/counter_summary_{self.model_name}.csv"
+        csv_file = self.file_prefix + ".csv"
 
         # Create data for CSV
         rows = []
 
         # Add header row
-        header = ["Model", "Line", "Direction", "Class_ID", "Class_Name", "Count"]
+        header = [
+            "Model", "Backend", "Precision", "Line", "Direction", "Class_ID",
+            "Class_Name", "Count",
+        ]
         rows.append(header)
 
         # Add data rows
@@ -281,7 +445,10 @@ class CounterSummary:
                             if int(class_id) < len(self.class_names)
                             else f"Class {int(class_id)}"
                         )
-                        row = [model, line_name, direction, class_id, class_name, count]
+                        row = [
+                            model, self.backend, self.precision, line_name,
+                            direction, class_id, class_name, count,
+                        ]
                         rows.append(row)
 
         # Write to CSV
@@ -289,5 +456,24 @@ class CounterSummary:
             writer = csv.writer(f)
             writer.writerows(rows)
 
+        # Per-stage latency breakdown
+        if self.stage_stats:
+            total = sum(stage["total_ms"] for stage in self.stage_stats.values())
+            stage_rows = [[
+                "Stage", "Count", "Total_ms", "Mean_ms", "P50_ms", "P95_ms",
+                "P99_ms", "Max_ms", "Share",
+            ]]
+            for name, stage in self.stage_stats.items():
+                stage_rows.append([
+                    name, stage["count"],
+                    *(round(stage[key], 3) for key in (
+                        "total_ms", "mean_ms", "p50_ms", "p95_ms", "p99_ms", "max_ms"
+                    )),
+                    round(stage["total_ms"] / total, 4) if total else 0.0,
+                ])
+            stages_file = self.file_prefix + "_stages.csv"
+            with open(stages_file, "w", newline="") as f:
+                csv.writer(f).writerows(stage_rows)
+
         #print(f"CSV data exported to {csv_file}")
 
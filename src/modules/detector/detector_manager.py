@@ -1,14 +1,27 @@
+from src.models.model_manager import ModelManager
 from src.modules.detector.detectors.efficientdet_detector import EfficientDetDetector
 from src.modules.detector.detectors.fasterrcnn_detector import FasterRCNNDetector
 from src.modules.detector.detectors.yolo_detector import YOLODetector
-from src.modules.detector.detectors.yolox_detector import YOLOXDetector
+from src.modules.detector.detectors.cached_detector import CachedDetector
+from src.modules.detector.detectors.onnx_detector import ONNXDetector
+from src.modules.detector.detectors.roi_detector import ROIDetector
+from src.modules.detector.detectors.tiled_detector import TiledDetector
+from src.modules.detector.utils.detection_cache import DetectionCache
+from src.modules.detector.utils.nms_filter import NMSFilter
+from src.modules.videoIO.video_io import VideoReader
+from src.modules.counter.counter_manager import LINES_GEOMETRY_PATH
 
 
 class DetectorManager:
-    def __init__(self, model_handler, detector_config, allowed_classes):
+    def __init__(self, model_handler, detector_config, allowed_classes, config_video=None):
         self.detector_config = detector_config
         self.model_handler = model_handler
         self.allowed_classes = allowed_classes
+        self.config_video = config_video
+        self.lines_path = (config_video or {}).get("lines_path", LINES_GEOMETRY_PATH)
+        self.detection_cache = None
+        # Model detector, before the tiling/ROI/cache wrappers (warm-up)
+        self.model_detector = None
 
         try:
             # yolo
@@ -22,20 +35,147 @@ class DetectorManager:
             self.device         = model_handler.get_device()
 
     def get_detector(self):
+        # No model loaded: every frame must come from the detection cache
+        detector = self._create_detector() if self.model is not None else None
+        self.model_detector = detector
+
+        if self.detector_config.get("roi_enabled", False) and self.detector_config.get(
+            "tiling_enabled", False
+        ):
+            raise ValueError("roi_enabled and tiling_enabled cannot be used together")
+
+        # Overlapping native-resolution tiles (small objects in large frames)
+        if detector is not None and self.detector_config.get("tiling_enabled", False):
+            detector = TiledDetector(
+                detector,
+                NMSFilter.from_config(self.detector_config),
+                tile_size=self.detector_config.get("tile_size", 640),
+                overlap=self.detector_config.get("tile_overlap", 0.2),
+                full_frame=self.detector_config.get("tile_full_frame", True),
+            )
+
+        # Only run the model on windows around the counting lines
+        if detector is not None and self.detector_config.get("roi_enabled", False):
+            detector = ROIDetector(
+                detector,
+                self.lines_path,
+                margin=self.detector_config.get("roi_margin", 160),
+                refresh_interval=self.detector_config.get("roi_refresh_interval", 0),
+            )
+
+        if self.detector_config.get("cache_enabled", False):
+            self.detection_cache = self.create_detection_cache(
+                self.detector_config,
+                self.config_video["input_path"],
+                self.model_name,
+                self.model_handler.image_size,
+                self.allowed_classes,
+                self.lines_path,
+                getattr(self.model_handler, "precision", "fp32"),
+                getattr(self.model_handler, "backend", "torch"),
+                self.config_video.get("reduced_decode", False),
+            )
+            return CachedDetector(detector, self.detection_cache)
+
+        if detector is None:
+            raise ValueError(f"Model {self.model_name} is not loaded")
+        return detector
+
+    def _create_detector(self):
         detector_map = {
             "tf_efficientdet": EfficientDetDetector,
             "fasterrcnn": FasterRCNNDetector,
-            "yolox": YOLOXDetector,
             "yolov5": YOLODetector,
             "yolov8": YOLODetector,
             "yolo11": YOLODetector,
             "yolo12": YOLODetector,
         }
+        if self.model_name.startswith("yolox"):
+            # Imported on use: only YOLOX models need the yolox package
+            from src.modules.detector.detectors.yolox_detector import YOLOXDetector
+
+            detector_map["yolox"] = YOLOXDetector
 
         for key, detector_ in detector_map.items():
             if self.model_name.startswith(key):
                 args = (self.model_handler, self.device, self.detector_config, self.allowed_classes)
-                return detector_(*args)
+                detector = detector_(*args)
+                if getattr(self.model_handler, "backend", "torch") == "onnx":
+                    # Same pre/postprocessing, network run by ONNX Runtime
+                    detector = ONNXDetector(
+                        detector,
+                        self.model_handler.model,
+                        self.detector_config,
+                        calibration_videos=self._calibration_videos(),
+                    )
+                return detector
 
         raise ValueError(f"Unsupported model: {self.model_name}")
 
+    def _calibration_videos(self):
+        """int8 calibration videos: the configured ones, or the input video"""
+        videos = self.model_handler.model.quantization["calibration_videos"]
+        if not videos and self.config_video:
+            videos = [self.config_video["input_path"]]
+        return videos
+
+    @staticmethod
+    def create_detection_cache(detector_config, video_path, model_name, image_size,
+                               allowed_classes, lines_path=LINES_GEOMETRY_PATH,
+                               precision="fp32", backend="torch", reduced_decode=False):
+        """Open the detection cache for this video, model and detector settings"""
+        extra_key = None
+        if detector_config.get("roi_enabled", False):
+            # ROI detections depend on the windows, hence on the lines
+            extra_key = {
+                "roi_margin": detector_config.get("roi_margin", 160),
+                "roi_refresh_interval": detector_config.get("roi_refresh_interval", 0),
+                "roi_lines": [
+                    [line["start_point"], line["end_point"]]
+                    for line in ROIDetector.read_lines_file(lines_path)
+                ],
+            }
+        if detector_config.get("tiling_enabled", False):
+            extra_key = {
+                "tile_size": detector_config.get("tile_size", 640),
+                "tile_overlap": detector_config.get("tile_overlap", 0.2),
+                "tile_full_frame": detector_config.get("tile_full_frame", True),
+            }
+        if precision != "fp32":
+            # Quantized models do not give the same detections
+            extra_key = {**(extra_key or {}), "precision": precision}
+        return DetectionCache(
+            detector_config.get("cache_dir", "cache/detections"),
+            video_path,
+            model_name,
+            image_size,
+            detector_config,
+            allowed_classes,
+            extra_key,
+            backend,
+            reduced_decode,
+        )
+
+    @staticmethod
+    def cached_run_available(config, model_name, image_size, allowed_classes, max_frame):
+        """Check if a whole run can be replayed from the cache (no model needed)"""
+        config_detector = config.sub_configs.get("detector")["detector"]
+        config_processor = config.sub_configs.get("processor")["processor"]
+        config_video = config.sub_configs.get("video")["video"]
+        backend, precision = ModelManager.runtime_settings(
+            config.sub_configs.get("model", {}).get("runtime", {})
+        )
+
+        if not config_detector.get("cache_enabled", False):
+            return False
+
+        video_reader = VideoReader(config_video["input_path"])
+        _, _, _, total_frames = video_reader.video_parameters()
+        video_reader.release()
+
+        cache = DetectorManager.create_detection_cache(
+            config_detector, config_video["input_path"], model_name, image_size,
+            allowed_classes, config_video.get("lines_path", LINES_GEOMETRY_PATH),
+            precision, backend, config_video.get("reduced_decode", False),
+        )
+        return cache.covers_run(total_frames, config_processor["frame_skip"], max_frame)
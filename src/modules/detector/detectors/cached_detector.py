@@ -0,0 +1,52 @@
+class CachedDetector:
+    """
+    Detector wrapper backed by a DetectionCache.
+    Cached frames are replayed from disk; the wrapped detector only runs for
+    frames that are missing and its results are stored for the next run.
+    When every frame is cached the wrapped detector can be None (no model loaded).
+    """
+
+    # The engine passes frame numbers to this detector
+    frame_indexed = True
+
+    def __init__(self, detector, cache):
+        self.detector = detector
+        self.cache = cache
+
+    def detection_pipeline(self, frame, padding_info, frame_index):
+        return self.detection_pipeline_batch([frame], padding_info, [frame_index])[0]
+
+    def detection_pipeline_batch(self, frames, padding_info, frame_indices):
+        # Preprocess missing frames only
+        inputs = self.prepare_batch(frames, padding_info, frame_indices)
+        # Replay cached frames, run inference for the others
+        return self.predict_batch(inputs, padding_info)
+
+    def prepare_batch(self, frames, padding_info, frame_indices):
+        """Preprocessing stage: only frames missing from the cache are prepared"""
+        missing = [
+            (frame, idx) for frame, idx in zip(frames, frame_indices)
+            if not self.cache.has(idx)
+        ]
+        model_inputs = None
+        if missing:
+            if self.detector is None:
+                raise RuntimeError(
+                    f"Frame {missing[0][1]} is not in the detection cache "
+                    f"({self.cache.path}) and no model is loaded"
+                )
+            model_inputs = self.detector.prepare_batch(
+                [frame for frame, _ in missing], padding_info
+            )
+        return list(frame_indices), [idx for _, idx in missing], model_inputs
+
+    def predict_batch(self, inputs, padding_info):
+        """Inference stage: list of Detections in frame order"""
+        frame_indices, missing_indices, model_inputs = inputs
+
+        if missing_indices:
+            detections = self.detector.predict_batch(model_inputs, padding_info)
+            for idx, frame_detections in zip(missing_indices, detections):
+                self.cache.put(idx, frame_detections)
+
+        return [self.cache.get(idx) for idx in frame_indices]
@@ -1,13 +1,14 @@
 import torch
-import torchvision.transforms.functional as F
 from box import Box
 
 from src.modules.detector.utils.detection_filter import DetectionFilter
+from src.modules.detector.utils.letterbox_mixin import LetterboxMixin
 from src.modules.detector.utils.nms_filter import NMSFilter
-from src.modules.engine.utils.image_square import ImageSquare
+from src.modules.engine.utils.stage_profiler import StageProfiler
+from src.modules.utils.detections import Detections
 
 
-class FasterRCNNDetector:
+class FasterRCNNDetector(LetterboxMixin):
     def __init__(self, model_handler, device, detector_config, allowed_classes):
         self.model = model_handler.get_model()
         self.device = device
@@ -16,33 +17,59 @@ class FasterRCNNDetector:
         self.detection_filter = DetectionFilter(
             score_threshold=self.detector_config.threshold,
             allowed_classes=allowed_classes,
+            class_thresholds=self.detector_config.get("class_thresholds"),
+            min_area=self.detector_config.get("min_box_area", 0),
         )
-        self.nms_filter = NMSFilter(
-            self.detector_config.iou_threshold, self.detector_config.nms_type
-        )
+        self.nms_filter = NMSFilter.from_config(self.detector_config)
+        self.image_size = model_handler.image_size
+        self.letterboxes = {}
+        self.profiler = StageProfiler.instance()
 
     def detection_pipeline(self, frame, padding_info):
         # Preprocess image
-        img_tensor, resized_image = self.preprocess(frame, padding_info)
-        # Inference
-        predictions = self.inference(img_tensor)
-        # Parse detections
-        boxes, scores, labels = self.parse_detections(predictions)
-        # Filter detections
-        boxes, scores, labels = self.filter_detections(boxes, scores, labels)
-        # Adjust boxes coordinates
-        boxes = self.adjust_boxes(boxes, padding_info)
+        img_tensor = self.prepare(frame, padding_info)
+        # Inference, parsing, filtering and boxes adjustment
+        return self.predict(img_tensor, padding_info)
 
-        return boxes, scores, labels
+    def predict(self, img_tensor, padding_info):
+        """Inference stage: model input -> Detections"""
+        return self.predict_batch(img_tensor, padding_info)[0]
+
+    def detection_pipeline_batch(self, frames, padding_info):
+        """Run a single forward pass over frames sharing the same padding_info"""
+        # Preprocess images
+        img_tensor = self.prepare_batch(frames, padding_info)
+        # Inference, parsing, filtering and boxes adjustment
+        return self.predict_batch(img_tensor, padding_info)
 
-    def preprocess(self, frame, padding_info):
-        # Resize and pad image
-        resized_image, padded_image = ImageSquare.pad_to_square(frame, padding_info)
+    def predict_batch(self, img_tensor, padding_info):
+        """Inference stage: batched model input -> list of Detections"""
+        # Inference
+        with self.profiler.span("inference"):
+            predictions = self.inference(img_tensor)
+
+        with self.profiler.span("postprocess"):
+            results = []
+            for index in range(img_tensor.shape[0]):
+                # Parse detections
+                boxes, scores, labels = self.parse_detections(predictions, index)
+                # Filter detections
+                boxes, scores, labels = self.filter_detections(boxes, scores, labels)
+                # Adjust boxes coordinates
+                boxes = self.adjust_boxes(boxes, padding_info)
+                results.append(Detections(boxes, scores, labels))
 
-        # Convert to tensor
-        img_tensor = F.to_tensor(padded_image).unsqueeze(0)
+        return results
 
-        return img_tensor, resized_image
+    def letterbox_contract(self):
+        """Model input format: size, padding, channel order and normalization"""
+        return {
+            "target_size": self.image_size,
+            "pad_value": 0,
+            "stride": 32,
+            "channel_order": "rgb",
+            "scale": 1 / 255.0,
+        }
 
     def inference(self, img_tensor):
         # Ensure input tensor is on correct device
@@ -56,10 +83,10 @@ class FasterRCNNDetector:
             predictions = self.model(img_tensor)
         return predictions
 
-    def parse_detections(self, predictions):
-        boxes = predictions[0]["boxes"]
-        scores = predictions[0]["scores"]
-        labels = predictions[0]["labels"]
+    def parse_detections(self, predictions, index=0):
+        boxes = predictions[index]["boxes"]
+        scores = predictions[index]["scores"]
+        labels = predictions[index]["labels"]
         return boxes, scores, labels
 
     def filter_detections(self, boxes, scores, labels):
@@ -67,11 +94,5 @@ class FasterRCNNDetector:
         boxes, scores, labels = self.detection_filter.filter_detections(
             boxes, scores, labels)
         # Apply NMS
-        boxes, scores = self.nms_filter.apply(boxes, scores)
+        boxes, scores, labels = self.nms_filter.apply(boxes, scores, labels)
         return boxes, scores, labels
-
-    def adjust_boxes(self, boxes, padding_info):
-        # Adjust boxes coordinates
-        boxes = ImageSquare.unpad_coordinates(boxes, padding_info)
-        return boxes
-
@@ -0,0 +1,205 @@
+from itertools import islice
+
+import torch
+import torchvision
+
+from src.modules.detector.utils.detection_cache import DetectionCache
+from src.modules.detector.utils.letterbox_mixin import LetterboxMixin
+from src.modules.engine.utils.image_square import ImageSquare
+from src.modules.engine.utils.stage_profiler import StageProfiler
+from src.modules.utils.detections import Detections
+from src.modules.videoIO.video_io import VideoReader
+
+
+class ONNXDetector(LetterboxMixin):
+    """
+    Detector running its network with ONNX Runtime (ONNXHandler).
+
+    Wraps the PyTorch detector of the same model family and only replaces
+    the model call. The letterbox, score and class filtering, NMS and the
+    mapping back to the frame are the family detector's own, so the two
+    backends differ only by the network outputs. The outputs are decoded
+    into the per-image (boxes, scores, labels) of the PyTorch path, in
+    model input coordinates:
+    - yolo: ultralytics NMS (class-aware, `threshold` / `iou_threshold`,
+      at most 300 boxes per image);
+    - yolox: yolox postprocess, as YOLOXDetector;
+    - fasterrcnn: the graph outputs (one image per session run);
+    - efficientdet: effdet top-k and NMS, as DetBenchPredict.
+
+    The letterbox is the family's contract, except that a graph exported
+    with a fixed input size (yolox, efficientdet) takes no other size: ROI
+    crops are then padded to the full input size.
+
+    A static int8 model is calibrated here on first use, because the
+    calibration frames must go through the family's letterbox. They are
+    spread evenly over `calibration_videos`.
+    """
+
+    # Ultralytics NMS limits
+    MAX_DETECTIONS = 300
+    MAX_NMS = 30000
+
+    def __init__(self, detector, onnx_model, detector_config, calibration_videos=None):
+        self.detector = detector
+        self.onnx_model = onnx_model
+        self.detector_config = detector_config
+        self.device = onnx_model.device
+        self.letterboxes = {}
+        self.profiler = StageProfiler.instance()
+
+        self.decode = getattr(self, f"decode_{onnx_model.family}")
+        if onnx_model.family == "efficientdet":
+            self._init_efficientdet(onnx_model.model_name)
+
+        if onnx_model.needs_calibration:
+            if not calibration_videos:
+                raise ValueError("int8 calibration needs at least one video")
+            onnx_model.use_calibration(
+                [DetectionCache.video_fingerprint(path) for path in calibration_videos]
+            )
+            if onnx_model.needs_calibration:
+                onnx_model.calibrate(self.calibration_batches(calibration_videos))
+
+    def _init_efficientdet(self, model_name):
+        # Anchors and limits of DetBenchPredict (effdet is only needed here)
+        from effdet import get_efficientdet_config
+        from effdet.anchors import Anchors
+
+        self.effdet_config = get_efficientdet_config(model_name)
+        self.anchors = Anchors.from_config(self.effdet_config)
+
+    def calibration_batches(self, video_paths):
+        """Model inputs of frames spread over the calibration videos"""
+        per_video = max(1, self.onnx_model.quantization["calibration_frames"] // len(video_paths))
+        for video_path in video_paths:
+            video_reader = VideoReader(video_path)
+            _, width, height, total_frames = video_reader.video_parameters()
+            padding_info = ImageSquare.calculate_dimensions(
+                width, height, self.onnx_model.image_size
+            )
+            step = max(1, total_frames // per_video)
+            for _, frame in islice(video_reader.read_frames(step), per_video):
+                # Letterbox buffers are reused: copy every input
+                yield self.prepare(frame, padding_info).clone()
+            video_reader.release()
+
+    def detection_pipeline(self, frame, padding_info):
+        # Preprocess image
+        image = self.prepare(frame, padding_info)
+        # Inference, decoding, filtering and boxes adjustment
+        return self.predict(image, padding_info)
+
+    def detection_pipeline_batch(self, frames, padding_info):
+        """Run a single inference over frames sharing the same padding_info"""
+        images = self.prepare_batch(frames, padding_info)
+        return self.predict_batch(images, padding_info)
+
+    def letterbox_contract(self):
+        """Model input format of the family detector, at the graph input size"""
+        contract = dict(self.detector.letterbox_contract())
+        if self.onnx_model.fixed_input_size:
+            contract["stride"] = contract["target_size"]
+        return contract
+
+    def predict(self, images, padding_info):
+        """Inference stage: model input -> Detections"""
+        return self.predict_batch(images, padding_info)[0]
+
+    def predict_batch(self, images, padding_info):
+        """Inference stage: batched model input -> list of Detections"""
+        with self.profiler.span("inference"):
+            outputs = self.inference(images)
+
+        with self.profiler.span("postprocess"):
+            results = []
+            for boxes, scores, labels in self.decode(outputs, images):
+                # Filter detections
+                boxes, scores, labels = self.detector.filter_detections(boxes, scores, labels)
+                # Adjust boxes coordinates
+                boxes = self.adjust_boxes(boxes, padding_info)
+                results.append(Detections(boxes, scores, labels))
+
+        return results
+
+    def inference(self, images):
+        """Network outputs of the batch (per image for unbatched graphs)"""
+        if self.onnx_model.batched:
+            return self.onnx_model.run(images)
+        return [self.onnx_model.run(images[idx:idx + 1]) for idx in range(len(images))]
+
+    def decode_yolo(self, outputs, images):
+        # (B, 4 + classes, anchors) -> (B, anchors, 4 + classes)
+        predictions = torch.from_numpy(outputs[0]).transpose(1, 2)
+        height, width = images.shape[2:]
+        results = []
+        for prediction in predictions:
+            scores, labels = prediction[:, 4:].max(dim=1)
+            keep = scores > self.detector_config["threshold"]
+            boxes = self.xywh_to_xyxy(prediction[keep, :4])
+            scores, labels = scores[keep], labels[keep]
+
+            # Best boxes first, class-aware NMS
+            order = scores.argsort(descending=True)[: self.MAX_NMS]
+            boxes, scores, labels = boxes[order], scores[order], labels[order]
+            keep = torchvision.ops.batched_nms(
+                boxes, scores, labels, self.detector_config["iou_threshold"]
+            )[: self.MAX_DETECTIONS]
+            # Clipped to the model input, as ultralytics does
+            boxes = boxes[keep]
+            boxes[:, 0::2] = boxes[:, 0::2].clamp(0, width)
+            boxes[:, 1::2] = boxes[:, 1::2].clamp(0, height)
+            results.append((boxes, scores[keep], labels[keep]))
+        return results
+
+    @staticmethod
+    def xywh_to_xyxy(boxes):
+        xy, wh = boxes[:, :2], boxes[:, 2:] / 2
+        return torch.cat([xy - wh, xy + wh], dim=1)
+
+    def decode_yolox(self, outputs, images):
+        return self.detector.parse_outputs(torch.from_numpy(outputs[0]))
+
+    def decode_fasterrcnn(self, outputs, images):
+        predictions = [
+            {
+                "boxes": torch.from_numpy(boxes),
+                "labels": torch.from_numpy(labels),
+                "scores": torch.from_numpy(scores),
+            }
+            for boxes, labels, scores in outputs
+        ]
+        return [
+            self.detector.parse_detections(predictions, index)
+            for index in range(len(predictions))
+        ]
+
+    def decode_efficientdet(self, outputs, images):
+        from effdet.bench import _batch_detection, _post_process
+
+        config = self.effdet_config
+        outputs = [torch.from_numpy(output) for output in outputs]
+        class_out, box_out, indices, classes = _post_process(
+            outputs[: config.num_levels],
+            outputs[config.num_levels:],
+            num_levels=config.num_levels,
+            num_classes=config.num_classes,
+            max_detection_points=config.max_detection_points,
+        )
+        batch_size = outputs[0].shape[0]
+        predictions = _batch_detection(
+            batch_size,
+            class_out,
+            box_out,
+            self.anchors.boxes,
+            indices,
+            classes,
+            None,
+            None,
+            max_det_per_image=config.max_det_per_image,
+            soft_nms=config.soft_nms,
+        )
+        return [
+            self.detector.parse_detections(predictions, index)
+            for index in range(batch_size)
+        ]
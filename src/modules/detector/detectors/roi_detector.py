@@ -0,0 +1,211 @@
+import json
+import logging
+import math
+
+import torch
+
+from src.modules.engine.utils.image_square import ImageSquare
+from src.modules.utils.detections import Detections
+
+
+class ROIDetector:
+    """
+    Detector wrapper that only runs the model on windows around the counting lines.
+
+    Each line's bounding box is grown by `margin` pixels and clipped to the
+    frame. Overlapping windows are then merged. Every window is scaled like
+    the full frame would be, so objects keep the same size in pixels, and
+    padded up to the model stride. Smaller windows mean smaller model
+    inputs. Boxes are mapped back through the crop letterbox and then
+    shifted by the window origin.
+
+    With `refresh_interval` set, every N-th sampled frame is still
+    detected on the full frame.
+    """
+
+    # Windows covering more than this share of the frame fall back to the full frame
+    MAX_WINDOW_AREA = 0.8
+
+    def __init__(self, detector, lines_path, margin=160, refresh_interval=0):
+        self.detector = detector
+        self.lines_path = lines_path
+        self.margin = margin
+        self.refresh_interval = refresh_interval
+
+        contract = detector.letterbox_contract()
+        self.target_size = contract["target_size"]
+        stride = contract.get("stride", 32)
+        # (width, height) for fixed-input models, whose stride is the input size
+        self.stride = tuple(stride) if isinstance(stride, (tuple, list)) else (stride, stride)
+
+        self._windows = {}
+        self._frames = 0
+
+    def detection_pipeline(self, frame, padding_info):
+        return self.predict(self.prepare(frame, padding_info), padding_info)
+
+    def detection_pipeline_batch(self, frames, padding_info):
+        return self.predict_batch(self.prepare_batch(frames, padding_info), padding_info)
+
+    def prepare(self, frame, padding_info):
+        return self.prepare_batch([frame], padding_info)
+
+    def predict(self, inputs, padding_info):
+        return self.predict_batch(inputs, padding_info)[0]
+
+    def prepare_batch(self, frames, padding_info):
+        """Preprocessing stage: one batched model input per window"""
+        windows = self.windows(padding_info)
+        if not windows or self._refresh_due(len(frames)):
+            return [(None, padding_info, self.detector.prepare_batch(frames, padding_info))]
+
+        return [
+            (
+                (x1, y1),
+                crop_padding_info,
+                self.detector.prepare_batch(
+                    [frame[y1:y2, x1:x2] for frame in frames], crop_padding_info
+                ),
+            )
+            for (x1, y1, x2, y2), crop_padding_info in windows
+        ]
+
+    def predict_batch(self, inputs, padding_info):
+        """Inference stage: per frame Detections merged over the windows"""
+        per_window = []
+        for origin, window_padding_info, model_inputs in inputs:
+            detections = self.detector.predict_batch(model_inputs, window_padding_info)
+            if origin is not None:
+                detections = [
+                    Detections(self._shift(d.boxes, origin), d.scores, d.class_ids)
+                    for d in detections
+                ]
+            per_window.append(detections)
+
+        results = []
+        for frame_detections in zip(*per_window):
+            if len(frame_detections) == 1:
+                results.append(frame_detections[0])
+                continue
+            results.append(Detections.cat(frame_detections))
+        return results
+
+    def windows(self, padding_info):
+        """Crop windows (x1, y1, x2, y2) and their padding_info for this frame size"""
+        frame_size = tuple(padding_info["original_size"])
+        if frame_size not in self._windows:
+            boxes = self.line_windows(self.read_lines(), frame_size, self.margin)
+            width, height = frame_size
+            area = sum((x2 - x1) * (y2 - y1) for x1, y1, x2, y2 in boxes)
+            if area > self.MAX_WINDOW_AREA * width * height:
+                boxes = []
+            self._windows[frame_size] = [
+                (box, self.crop_padding_info(box, frame_size)) for box in boxes
+            ]
+            if boxes:
+                full = ImageSquare.calculate_dimensions(*frame_size, self.target_size)
+                roi_pixels = sum(
+                    info["padded_size"][0] * info["padded_size"][1]
+                    for _, info in self._windows[frame_size]
+                )
+                logging.info(
+                    f"ROI inference on {len(boxes)} window(s): "
+                    f"{roi_pixels / (full['padded_size'][0] * full['padded_size'][1]):.1%} "
+                    f"of the full-frame input pixels"
+                )
+        return self._windows[frame_size]
+
+    def read_lines(self):
+        """Lines from the geometry file (read at the first frame, after the drawer)"""
+        return self.read_lines_file(self.lines_path)
+
+    @staticmethod
+    def read_lines_file(path):
+        try:
+            with open(path, "r") as file:
+                return json.load(file)
+        except FileNotFoundError:
+            return []
+
+    @staticmethod
+    def line_windows(lines, frame_size, margin):
+        """Bounding boxes of the lines grown by margin, clipped and merged"""
+        width, height = frame_size
+        boxes = []
+        for line in lines:
+            xs = (line["start_point"][0], line["end_point"][0])
+            ys = (line["start_point"][1], line["end_point"][1])
+            box = (
+                max(0, int(min(xs) - margin)),
+                max(0, int(min(ys) - margin)),
+                min(width, int(math.ceil(max(xs) + margin))),
+                min(height, int(math.ceil(max(ys) + margin))),
+            )
+            if box[2] > box[0] and box[3] > box[1]:
+                boxes.append(box)
+
+        # Merge overlapping windows until they are disjoint
+        merged = True
+        while merged:
+            merged = False
+            for i in range(len(boxes)):
+                for j in range(i + 1, len(boxes)):
+                    a, b = boxes[i], boxes[j]
+                    if a[0] < b[2] and b[0] < a[2] and a[1] < b[3] and b[1] < a[3]:
+                        boxes[i] = (
+                            min(a[0], b[0]), min(a[1], b[1]),
+                            max(a[2], b[2]), max(a[3], b[3]),
+                        )
+                        del boxes[j]
+                        merged = True
+                        break
+                if merged:
+                    break
+        return boxes
+
+    def crop_padding_info(self, box, frame_size):
+        """Crop geometry at the full-frame scale, padded to the model stride"""
+        x1, y1, x2, y2 = box
+        crop_width, crop_height = x2 - x1, y2 - y1
+
+        # Same scale as the full-frame letterbox
+        full = ImageSquare.calculate_dimensions(*frame_size, self.target_size)
+        scale = full["resized_size"][0] / frame_size[0]
+        new_width = max(1, round(crop_width * scale))
+        new_height = max(1, round(crop_height * scale))
+        stride_x, stride_y = self.stride
+        padded_width = int(math.ceil(new_width / stride_x) * stride_x)
+        padded_height = int(math.ceil(new_height / stride_y) * stride_y)
+
+        left_pad = (padded_width - new_width) // 2
+        top_pad = (padded_height - new_height) // 2
+        return {
+            "top_pad": top_pad,
+            "bottom_pad": padded_height - new_height - top_pad,
+            "left_pad": left_pad,
+            "right_pad": padded_width - new_width - left_pad,
+            "original_size": (crop_width, crop_height),
+            "resized_size": (new_width, new_height),
+            "padded_size": (padded_width, padded_height),
+            # The crop model input size is not the detector target size
+            "fixed_input": True,
+            # Each window keeps its own preprocessing buffers
+            "origin": (x1, y1),
+        }
+
+    def _refresh_due(self, num_frames):
+        """Check if the frames of this batch include a full-frame refresh"""
+        start = self._frames
+        self._frames += num_frames
+        if not self.refresh_interval:
+            return False
+        interval = self.refresh_interval
+        return (start + num_frames - 1) // interval > (start - 1) // interval
+
+    @staticmethod
+    def _shift(boxes, origin):
+        """Crop -> frame coordinates"""
+        if len(boxes) == 0:
+            return boxes
+        x, y = origin
+        return boxes + torch.tensor([x, y, x, y], dtype=boxes.dtype, device=boxes.device)
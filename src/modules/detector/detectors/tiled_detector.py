@@ -0,0 +1,194 @@
+import math
+
+import torch
+
+from src.modules.engine.utils.image_square import ImageSquare
+from src.modules.utils.detections import Detections
+
+
+class TiledDetector:
+    """
+    Detector wrapper that runs the model on overlapping tiles of the frame.
+
+    The frame is cut into tile_size x tile_size tiles overlapping by
+    `overlap`. Tiles on the right and bottom edges are shifted back inside
+    the frame, so every tile has the same geometry. The tiles of every frame
+    in a batch go through one forward pass at native resolution, which keeps
+    small objects visible. Tile boxes are shifted to frame coordinates in one
+    gather + add. Duplicates across tile seams are then merged with the
+    detector's NMS settings (class-aware by default). Fragments cut by a
+    tile border are also dropped when a box of the same class mostly
+    contains them: a box that is not a fragment, or a higher-scoring
+    fragment. IoU alone keeps such fragments, because they only cover part
+    of the whole box.
+
+    With `full_frame` set, the letterboxed full frame is detected as well.
+    Large objects that span several tiles are then still found whole.
+    """
+
+    # Pixels from an inner tile border within which a box counts as cut by the seam
+    SEAM_TOLERANCE = 2
+    # Share of a seam fragment covered by another box of its class to drop it
+    CONTAINMENT_THRESHOLD = 0.8
+
+    def __init__(self, detector, nms_filter, tile_size=640, overlap=0.2, full_frame=True):
+        self.detector = detector
+        self.tile_size = tile_size
+        self.overlap = overlap
+        self.full_frame = full_frame
+        self.nms_filter = nms_filter
+
+        contract = detector.letterbox_contract()
+        self.target_size = contract["target_size"]
+
+        self._tiles = {}
+
+    def detection_pipeline(self, frame, padding_info):
+        return self.predict(self.prepare(frame, padding_info), padding_info)
+
+    def detection_pipeline_batch(self, frames, padding_info):
+        return self.predict_batch(self.prepare_batch(frames, padding_info), padding_info)
+
+    def prepare(self, frame, padding_info):
+        return self.prepare_batch([frame], padding_info)
+
+    def predict(self, inputs, padding_info):
+        return self.predict_batch(inputs, padding_info)[0]
+
+    def prepare_batch(self, frames, padding_info):
+        """Preprocessing stage: all tiles of all frames as one batched model input"""
+        origins, tile_padding_info = self.tiles(padding_info)
+        crops = [
+            frame[y : y + tile_padding_info["original_size"][1],
+                  x : x + tile_padding_info["original_size"][0]]
+            for frame in frames
+            for x, y in origins.int().tolist()
+        ]
+        tile_inputs = self.detector.prepare_batch(crops, tile_padding_info)
+        # A single tile already covers the whole frame
+        full_inputs = (
+            self.detector.prepare_batch(frames, padding_info)
+            if self.full_frame and len(origins) > 1
+            else None
+        )
+        return len(frames), tile_inputs, full_inputs
+
+    def predict_batch(self, inputs, padding_info):
+        """Inference stage: per frame Detections merged over the tiles"""
+        num_frames, tile_inputs, full_inputs = inputs
+        origins, tile_padding_info = self.tiles(padding_info)
+        num_tiles = len(origins)
+
+        tile_detections = self.detector.predict_batch(tile_inputs, tile_padding_info)
+        full_detections = (
+            self.detector.predict_batch(full_inputs, padding_info)
+            if full_inputs is not None
+            else [None] * num_frames
+        )
+
+        results = []
+        for index in range(num_frames):
+            detections = tile_detections[index * num_tiles : (index + 1) * num_tiles]
+            results.append(self._merge(
+                detections, origins, full_detections[index], padding_info, tile_padding_info
+            ))
+        return results
+
+    def tiles(self, padding_info):
+        """Tile origins (N, 2) and the padding_info shared by every tile"""
+        frame_size = tuple(padding_info["original_size"])
+        if frame_size not in self._tiles:
+            width, height = frame_size
+            tile_width, tile_height = min(self.tile_size, width), min(self.tile_size, height)
+            xs = self.tile_starts(width, tile_width, self.overlap)
+            ys = self.tile_starts(height, tile_height, self.overlap)
+            origins = torch.tensor([(x, y) for y in ys for x in xs], dtype=torch.float32)
+            tile_padding_info = ImageSquare.calculate_dimensions(
+                tile_width, tile_height, self.target_size
+            )
+            self._tiles[frame_size] = (origins, tile_padding_info)
+        return self._tiles[frame_size]
+
+    @staticmethod
+    def tile_starts(length, tile, overlap):
+        """Tile start positions along one axis, the last tile ends on the edge"""
+        if length <= tile:
+            return [0]
+        step = max(1, int(tile * (1 - overlap)))
+        count = math.ceil((length - tile) / step) + 1
+        return [min(i * step, length - tile) for i in range(count)]
+
+    def _merge(self, detections, origins, full_detections, padding_info, tile_padding_info):
+        """Shift tile boxes to the frame, add full-frame boxes, NMS"""
+        counts = torch.tensor([len(d) for d in detections])
+        merged = Detections.cat(detections)
+        boxes, scores, labels = merged.boxes, merged.scores, merged.class_ids
+
+        # Vectorised tile -> frame offset
+        tile_index = torch.repeat_interleave(torch.arange(len(counts)), counts)
+        offsets = origins.to(boxes.device, boxes.dtype)[tile_index.to(boxes.device)]
+        at_seam = self._at_seam(boxes, offsets, padding_info, tile_padding_info)
+        boxes = boxes + offsets.repeat(1, 2)
+
+        if full_detections is not None:
+            full_detections = full_detections.to(boxes.device)
+            boxes = torch.cat([boxes, full_detections.boxes])
+            scores = torch.cat([scores, full_detections.scores])
+            labels = torch.cat([labels, full_detections.class_ids])
+            at_seam = torch.cat([at_seam, at_seam.new_zeros(len(full_detections))])
+
+        if len(boxes) == 0:
+            return Detections(boxes, scores, labels)
+
+        # Duplicates across tile seams (and with the full frame)
+        keep, scores = self.nms_filter.select(boxes, scores, labels)
+        boxes, labels, at_seam = boxes[keep], labels[keep], at_seam[keep]
+
+        keep = ~self._contained_fragments(boxes, scores, labels, at_seam)
+        return Detections(boxes[keep], scores[keep], labels[keep])
+
+    def _at_seam(self, boxes, offsets, padding_info, tile_padding_info):
+        """Boxes (tile coordinates) touching a tile border inside the frame"""
+        tile_width, tile_height = tile_padding_info["original_size"]
+        width, height = padding_info["original_size"]
+        tol = self.SEAM_TOLERANCE
+        x, y = offsets[:, 0], offsets[:, 1]
+        return (
+            ((boxes[:, 0] <= tol) & (x > 0))
+            | ((boxes[:, 1] <= tol) & (y > 0))
+            | ((boxes[:, 2] >= tile_width - tol) & (x + tile_width < width))
+            | ((boxes[:, 3] >= tile_height - tol) & (y + tile_height < height))
+        )
+
+    def _contained_fragments(self, boxes, scores, labels, at_seam):
+        """
+        Seam boxes mostly covered by another box of the same class. Only whole
+        boxes and higher-scoring fragments suppress, so of two fragments
+        covering each other the best one stays.
+        """
+        if not at_seam.any():
+            return at_seam
+        fragments = boxes[at_seam]
+        # Intersection of every fragment with every box
+        top_left = torch.max(fragments[:, None, :2], boxes[None, :, :2])
+        bottom_right = torch.min(fragments[:, None, 2:], boxes[None, :, 2:])
+        intersection = (bottom_right - top_left).clamp(min=0).prod(dim=2)
+        area = (fragments[:, 2:] - fragments[:, :2]).clamp(min=0).prod(dim=1)
+        covered = intersection / area.clamp(min=1e-6)[:, None]
+
+        same_class = labels[at_seam][:, None] == labels[None, :]
+        # Score rank of every box, ties broken by position
+        rank = torch.empty(len(scores), dtype=torch.long, device=scores.device)
+        rank[torch.argsort(-scores, stable=True)] = torch.arange(
+            len(scores), device=scores.device
+        )
+        # Whole boxes are always kept, a fragment only suppresses lower-ranked
+        # fragments (never itself)
+        suppressor = ~at_seam[None, :] | (rank[None, :] < rank[at_seam][:, None])
+        dropped = (
+            (covered >= self.CONTAINMENT_THRESHOLD) & same_class & suppressor
+        ).any(dim=1)
+
+        result = torch.zeros_like(at_seam)
+        result[at_seam] = dropped
+        return result
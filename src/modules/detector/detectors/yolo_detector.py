@@ -1,9 +1,11 @@
 from src.modules.detector.utils.detection_filter import DetectionFilter
+from src.modules.detector.utils.letterbox_mixin import LetterboxMixin
 from src.modules.detector.utils.nms_filter import NMSFilter
-from src.modules.engine.utils.image_square import ImageSquare
+from src.modules.engine.utils.stage_profiler import StageProfiler
+from src.modules.utils.detections import Detections
 from box import Box
 
-class YOLODetector:
+class YOLODetector(LetterboxMixin):
     def __init__(self, model_handler, device, detector_config, allowed_classes):
         self.model_handler = model_handler
         self.model = model_handler.model.model
@@ -14,39 +16,74 @@ class YOLODetector:
         self.detection_filter = DetectionFilter(
             score_threshold=self.detector_config.threshold,
             allowed_classes=allowed_classes,
+            class_thresholds=self.detector_config.get("class_thresholds"),
+            min_area=self.detector_config.get("min_box_area", 0),
         )
-        self.nms_filter = NMSFilter(
-            self.detector_config.iou_threshold, self.detector_config.nms_type
-        )
+        self.nms_filter = NMSFilter.from_config(self.detector_config)
+        self.image_size = model_handler.image_size
+        self.letterboxes = {}
+        self.profiler = StageProfiler.instance()
 
     def detection_pipeline(self, frame, padding_info):
         # Preprocess image
-        image, resized_image = self.preprocess_pad(frame, padding_info)
-         # Inference
-        predictions = self.inference(image)
-        # Parse detections
-        boxes, scores, labels = self.parse_detections(predictions)
-        # Filter detections
-        boxes, scores, labels = self.filter_detections(boxes, scores, labels)
-        # Adjust boxes coordinates
-        boxes = self.adjust_boxes(boxes, padding_info)
+        image = self.prepare(frame, padding_info)
+        # Inference, parsing, filtering and boxes adjustment
+        return self.predict(image, padding_info)
 
-        return boxes, scores, labels
+    def predict(self, image, padding_info):
+        """Inference stage: model input -> Detections"""
+        return self.predict_batch(image, padding_info)[0]
+
+    def detection_pipeline_batch(self, frames, padding_info):
+        """Run a single forward pass over frames sharing the same padding_info"""
+        # Preprocess images
+        images = self.prepare_batch(frames, padding_info)
+        # Inference, parsing, filtering and boxes adjustment
+        return self.predict_batch(images, padding_info)
+
+    def predict_batch(self, images, padding_info):
+        """Inference stage: batched model input -> list of Detections"""
+        # Inference
+        with self.profiler.span("inference"):
+            predictions = self.inference_batch(images)
+
+        with self.profiler.span("postprocess"):
+            results = []
+            for prediction in predictions:
+                # Parse detections
+                boxes, scores, labels = self.parse_detections(prediction)
+                # Filter detections
+                boxes, scores, labels = self.filter_detections(boxes, scores, labels)
+                # Adjust boxes coordinates
+                boxes = self.adjust_boxes(boxes, padding_info)
+                results.append(Detections(boxes, scores, labels))
 
-    def preprocess_pad(self, frame, padding_info):
-        # Resize and pad image
-        resized_image, padded_image = ImageSquare.pad_to_square(frame, padding_info)
-        return padded_image, resized_image
+        return results
+
+    def letterbox_contract(self):
+        """Model input format: size, padding, channel order and normalization"""
+        return {
+            "target_size": self.image_size,
+            "pad_value": 0,
+            "stride": 32,
+            "channel_order": "rgb",
+            "scale": 1 / 255.0,
+        }
 
     def inference(self, img):
         # Run YOLO11 inference
+        return self.inference_batch(img)[0]
+
+    def inference_batch(self, images):
+        # Run YOLO11 inference, a (N, 3, H, W) tensor is processed as one batch
+        # (tensor inputs skip the ultralytics letterbox/normalization)
         results = self.model(
-            img,
+            images,
             conf=self.detector_config["threshold"],
             iou=self.detector_config["iou_threshold"],
             verbose=False,
         )
-        return results[0]
+        return results
 
     def parse_detections(self, results):
         # Extract boxes, confidence scores, and class IDs from YOLO11 results
@@ -62,11 +99,5 @@ class YOLODetector:
             boxes, scores, labels
         )
         # Apply NMS
-        # boxes, scores = self.nms_filter.apply(boxes, scores)
+        # boxes, scores, labels = self.nms_filter.apply(boxes, scores, labels)
         return boxes, scores, labels
-
-    def adjust_boxes(self, boxes, padding_info):
-        # Adjust boxes coordinates
-        boxes = ImageSquare.unpad_coordinates(boxes, padding_info)
-        return boxes
-
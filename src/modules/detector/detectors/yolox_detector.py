@@ -1,77 +1,103 @@
 import torch
 from box import Box
-from yolox.data.data_augment import ValTransform
 from yolox.utils import postprocess
 
 from src.modules.detector.utils.detection_filter import DetectionFilter
+from src.modules.detector.utils.letterbox_mixin import LetterboxMixin
 from src.modules.detector.utils.nms_filter import NMSFilter
-from src.modules.engine.utils.image_square import ImageSquare
+from src.modules.engine.utils.stage_profiler import StageProfiler
+from src.modules.utils.detections import Detections
 
 
-class YOLOXDetector:
+class YOLOXDetector(LetterboxMixin):
     def __init__(self, model_handler, device, detector_config, allowed_classes):
         self.model_handler = model_handler
         self.model = model_handler.model.model
         self.device = device
         self.detector_config = Box(detector_config)
 
-        self.val_preproc = ValTransform(False)
+        self.letterboxes = {}
+        self.profiler = StageProfiler.instance()
 
         self.detection_filter = DetectionFilter(
             score_threshold=self.detector_config.threshold,
             allowed_classes=allowed_classes,
+            class_thresholds=self.detector_config.get("class_thresholds"),
+            min_area=self.detector_config.get("min_box_area", 0),
         )
-        self.nms_filter = NMSFilter(
-            self.detector_config.iou_threshold, self.detector_config.nms_type
-        )
+        self.nms_filter = NMSFilter.from_config(self.detector_config)
 
     def detection_pipeline(self, frame, padding_info):
         # Preprocess image
-        image, resized_image = self.preprocess_pad(frame, padding_info)
-        # Preprocess image
-        img, img_info = self.preprocess(image)
+        img_tensor = self.prepare(frame, padding_info)
+        # Inference, filtering and boxes adjustment
+        return self.predict(img_tensor, padding_info)
+
+    def predict(self, img_tensor, padding_info):
+        """Inference stage: model input -> Detections"""
+        return self.predict_batch(img_tensor, padding_info)[0]
+
+    def detection_pipeline_batch(self, frames, padding_info):
+        """Run a single forward pass over frames sharing the same padding_info"""
+        # Preprocess images
+        img_tensor = self.prepare_batch(frames, padding_info)
+        # Inference, filtering and boxes adjustment
+        return self.predict_batch(img_tensor, padding_info)
+
+    def predict_batch(self, img_tensor, padding_info):
+        """Inference stage: batched model input -> list of Detections"""
         # Inference
-        boxes, scores, labels = self.inference(img, img_info)
-        # Filter detections
-        boxes, scores, labels = self.filter_detections(boxes, scores, labels)
-        # Adjust boxes coordinates
-        boxes = self.adjust_boxes(boxes, padding_info)
-
-        return boxes, scores, labels
-
-    def preprocess_pad(self, frame, padding_info):
-        # Resize and pad image
-        resized_image, padded_image = ImageSquare.pad_to_square(frame, padding_info)
-
-        # Convert to tensor
-        #img_tensor = F.to_tensor(padded_image).unsqueeze(0)
-
-        return padded_image, resized_image
-
-    def preprocess(self, img):
-        """Preprocess image for inference"""
-        img_info = {"id": 0}
-        height, width = img.shape[:2]
-        img_info["height"] = height
-        img_info["width"] = width
-        img_info["raw_img"] = img
-
-        test_size = self.model_handler.model.test_size
-
-        ratio = min(test_size[0] / height, test_size[1] / width)
-        img_info["ratio"] = ratio
-
-        img, _ = self.val_preproc(img, None, test_size)
-        img = torch.from_numpy(img).unsqueeze(0)
-        img = img.float().to(self.device)
-
-        return img, img_info
-
-    def inference(self, img_tensor, img_info):
+        with self.profiler.span("inference"):
+            detections = self.inference_batch(img_tensor)
+
+        with self.profiler.span("postprocess"):
+            results = []
+            for boxes, scores, labels in detections:
+                # Filter detections
+                boxes, scores, labels = self.filter_detections(boxes, scores, labels)
+                # Adjust boxes coordinates
+                boxes = self.adjust_boxes(boxes, padding_info)
+                results.append(Detections(boxes, scores, labels))
+
+        return results
+
+    def letterbox_contract(self):
+        """Model input format: size, padding, channel order and normalization"""
+        height, width = self.model_handler.model.test_size
+        if getattr(self.model_handler.model, "legacy", False):
+            # Legacy checkpoints: RGB, [0, 1] and ImageNet normalization
+            return {
+                "target_size": (width, height),
+                "pad_value": 114,
+                "stride": 32,
+                "channel_order": "rgb",
+                "scale": 1 / 255.0,
+                "mean": (0.485, 0.456, 0.406),
+                "std": (0.229, 0.224, 0.225),
+            }
+        # Same input as ValTransform: BGR, 0-255, padded with 114
+        return {
+            "target_size": (width, height),
+            "pad_value": 114,
+            "stride": 32,
+            "channel_order": "bgr",
+            "scale": 1.0,
+        }
+
+    def inference(self, img_tensor):
         """Run inference with YOLOX model"""
+        return self.inference_batch(img_tensor)[0]
+
+    def inference_batch(self, img_tensor):
+        """Run inference with YOLOX model over a batch of images"""
+        img_tensor = img_tensor.to(self.device)
         with torch.no_grad():
             outputs = self.model(img_tensor)
+            return self.parse_outputs(outputs)
 
+    def parse_outputs(self, outputs):
+        """Decoded (B, anchors, 5 + classes) outputs -> per image (boxes, scores, labels)"""
+        with torch.no_grad():
             outputs = postprocess(
                 outputs,
                 self.model_handler.model.num_classes,
@@ -80,22 +106,22 @@ class YOLOXDetector:
                 class_agnostic=True
             )
 
-        # #print(f"Min confidence: {outputs[0][:, 4].min().item()}")
-        # #print(f"Max confidence: {outputs[0][:, 4].max().item()}")
-
         # Process output format to match the expected format in the system
-        if outputs[0] is not None:
-            output = outputs[0].cpu()
-            bboxes = output[:, 0:4]
-            # Scale back to original image dimensions
-            bboxes /= img_info["ratio"]
-            scores = output[:, 4] * output[:, 5]
-            cls_ids = output[:, 6]
-
-            # Format for the tracking system
-            return bboxes, scores, cls_ids
-        else:
-            return torch.empty((0, 4)), torch.empty(0), torch.empty(0)
+        # (boxes stay in model input coordinates, adjust_boxes maps them back)
+        results = []
+        for output in outputs:
+            if output is not None:
+                output = output.cpu()
+                bboxes = output[:, 0:4]
+                scores = output[:, 4] * output[:, 5]
+                cls_ids = output[:, 6]
+
+                # Format for the tracking system
+                results.append((bboxes, scores, cls_ids))
+            else:
+                results.append((torch.empty((0, 4)), torch.empty(0), torch.empty(0)))
+
+        return results
 
     def filter_detections(self, boxes, scores, labels):
         # filter threshold and classes
@@ -103,10 +129,5 @@ class YOLOXDetector:
             boxes, scores, labels
         )
         # Apply NMS
-        #boxes, scores = self.nms_filter.apply(boxes, scores)
+        #boxes, scores, labels = self.nms_filter.apply(boxes, scores, labels)
         return boxes, scores, labels
-
-    def adjust_boxes(self, boxes, padding_info):
-        # Adjust boxes coordinates
-        boxes = ImageSquare.unpad_coordinates(boxes, padding_info)
-        return boxes
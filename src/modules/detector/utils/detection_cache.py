@@ -0,0 +1,184 @@
+import hashlib
+import json
+import os
+import threading
+
+import numpy as np
+import torch
+
+from src.modules.utils.detections import Detections
+
+
+class DetectionCache:
+    """
+    On-disk store of per-frame detections.
+
+    Detections are appended to a flat float32 file (x1, y1, x2, y2, score, label
+    per row) that is read back through a memory map; an index array maps each
+    frame number to its (offset, count) rows. The cache directory is keyed by
+    the video content, model name, input size, inference backend, decode
+    size and detector thresholds, so a change in any of them starts a new
+    cache. VERSION is part of the key: bump it when the preprocessing or
+    decoding of a model changes, so older detections are not replayed.
+    """
+
+    # 2: shared letterbox (YOLOX in BGR), backend and reduced decode in the key
+    VERSION = 2
+    ROW_SIZE = 6
+    CHUNK_SIZE = 1 << 20  # bytes hashed per sampled chunk of the video
+    FLUSH_EVERY = 1000  # frames kept in memory before appending to disk
+
+    def __init__(self, cache_dir, video_path, model_name, image_size, detector_config,
+                 allowed_classes=None, extra_key=None, backend="torch",
+                 reduced_decode=False):
+        self.video_path = video_path
+        self.key_info = {
+            "version": self.VERSION,
+            "video": self.video_fingerprint(video_path),
+            "model": model_name,
+            "image_size": image_size,
+            "backend": backend,
+            # Frames decoded at the model input size (see VideoReader.output_size)
+            "reduced_decode": bool(reduced_decode),
+            "threshold": detector_config.get("threshold"),
+            "iou_threshold": detector_config.get("iou_threshold"),
+            "nms_type": detector_config.get("nms_type"),
+            "nms_class_aware": detector_config.get("nms_class_aware", True),
+            "allowed_classes": sorted(allowed_classes or []),
+        }
+        # Only part of the key when set, existing caches stay valid
+        if detector_config.get("class_thresholds"):
+            self.key_info["class_thresholds"] = {
+                str(class_id): threshold
+                for class_id, threshold in detector_config["class_thresholds"].items()
+            }
+        if detector_config.get("nms_type") == "soft":
+            self.key_info["soft_nms_sigma"] = detector_config.get("soft_nms_sigma", 0.5)
+        if detector_config.get("min_box_area"):
+            self.key_info["min_box_area"] = detector_config["min_box_area"]
+        # Other settings the detections depend on (e.g. ROI windows)
+        if extra_key:
+            self.key_info.update(extra_key)
+        key = hashlib.sha1(
+            json.dumps(self.key_info, sort_keys=True).encode()
+        ).hexdigest()[:16]
+        self.path = os.path.join(cache_dir, f"{model_name}_{key}")
+
+        self._data_file = os.path.join(self.path, "detections.bin")
+        self._index_file = os.path.join(self.path, "index.npy")
+        self._meta_file = os.path.join(self.path, "meta.json")
+
+        self.meta = {"key": self.key_info, "end_frame": None}
+        self._index = np.empty((0, 2), dtype=np.int64)
+        self._data = np.empty((0, self.ROW_SIZE), dtype=np.float32)
+        self._new = {}
+        # has/get/put may run on different pipeline stages
+        self._lock = threading.RLock()
+        self._load()
+
+    @classmethod
+    def video_fingerprint(cls, video_path, num_chunks=4):
+        """Hash of the file size plus evenly spaced chunks of its content"""
+        size = os.path.getsize(video_path)
+        digest = hashlib.sha1(str(size).encode())
+        with open(video_path, "rb") as file:
+            for idx in range(num_chunks):
+                file.seek(max(0, (size - cls.CHUNK_SIZE) * idx // max(1, num_chunks - 1)))
+                digest.update(file.read(cls.CHUNK_SIZE))
+        return digest.hexdigest()
+
+    def _load(self):
+        """Open an existing cache (index in memory, detections memory-mapped)"""
+        if not os.path.exists(self._meta_file):
+            return
+        with open(self._meta_file, "r") as file:
+            self.meta = json.load(file)
+        self._index = np.load(self._index_file)
+        if os.path.getsize(self._data_file) > 0:
+            self._data = np.memmap(
+                self._data_file, dtype=np.float32, mode="r"
+            ).reshape(-1, self.ROW_SIZE)
+
+    def has(self, frame_index):
+        """Check if a frame is stored in the cache"""
+        with self._lock:
+            if frame_index in self._new:
+                return True
+            return frame_index < len(self._index) and self._index[frame_index, 0] >= 0
+
+    def covers(self, frame_indices):
+        """Check if every frame (before the recorded end of the video) is cached"""
+        end_frame = self.meta.get("end_frame")
+        return all(
+            self.has(idx)
+            for idx in frame_indices
+            if end_frame is None or idx < end_frame
+        )
+
+    def covers_run(self, total_frames, frame_skip, max_frame):
+        """Check if a full run over the video can be replayed from the cache"""
+        last_frame = min(total_frames, max_frame + 1)
+        return self.covers(range(0, last_frame, frame_skip))
+
+    def get(self, frame_index):
+        """Return the Detections of a cached frame"""
+        with self._lock:
+            if frame_index in self._new:
+                rows = self._new[frame_index]
+            else:
+                offset, count = self._index[frame_index]
+                rows = self._data[offset : offset + count]
+
+        # Copy out of the memory map / pending buffer
+        rows = torch.from_numpy(np.array(rows, dtype=np.float32))
+        return Detections(rows[:, :4], rows[:, 4], rows[:, 5])
+
+    def put(self, frame_index, detections):
+        """Store the Detections of a frame (written to disk on flush)"""
+        rows = np.empty((len(detections), self.ROW_SIZE), dtype=np.float32)
+        if len(detections):
+            boxes, scores, labels = detections.numpy()
+            rows[:, :4] = boxes
+            rows[:, 4] = scores
+            rows[:, 5] = labels
+        with self._lock:
+            self._new[frame_index] = rows
+            if len(self._new) >= self.FLUSH_EVERY:
+                self.close()
+
+    def close(self, end_frame=None):
+        """Append new detections to disk, rewrite the index and metadata"""
+        with self._lock:
+            self._flush(end_frame)
+
+    def _flush(self, end_frame):
+        if end_frame is not None:
+            self.meta["end_frame"] = end_frame
+        if not self._new and os.path.exists(self._meta_file) and end_frame is None:
+            return
+
+        os.makedirs(self.path, exist_ok=True)
+        num_frames = max([len(self._index)] + [idx + 1 for idx in self._new])
+        index = np.full((num_frames, 2), -1, dtype=np.int64)
+        index[: len(self._index)] = self._index
+
+        with open(self._data_file, "ab") as file:
+            # Rows left by an interrupted run are never referenced by the index
+            offset = file.tell() // (self.ROW_SIZE * 4)
+            for frame_index in sorted(self._new):
+                rows = self._new[frame_index]
+                file.write(rows.tobytes())
+                index[frame_index] = (offset, len(rows))
+                offset += len(rows)
+
+        # Index and metadata are replaced atomically, after the data is written
+        np.save(self._index_file + ".tmp.npy", index)
+        os.replace(self._index_file + ".tmp.npy", self._index_file)
+        with open(self._meta_file + ".tmp", "w") as file:
+            json.dump(self.meta, file, indent=4)
+        os.replace(self._meta_file + ".tmp", self._meta_file)
+
+        self._new = {}
+        self._index = np.empty((0, 2), dtype=np.int64)
+        self._data = np.empty((0, self.ROW_SIZE), dtype=np.float32)
+        self._load()
@@ -1,30 +1,62 @@
 import torch
 
 class DetectionFilter:
-    """Handles filtering of detections based on scores and classes"""
+    """
+    Handles filtering of detections based on scores, classes and box area.
 
-    def __init__(self, score_threshold, allowed_classes):
+    Allowed classes and per-class score thresholds are folded into one
+    lookup tensor indexed by class id: its entry is the score a detection
+    of that class must exceed, and +inf for classes that are not allowed.
+    Class ids beyond the table fall on its last entry, the threshold of
+    classes without their own. A frame is then filtered with one gather,
+    one fused mask and one boolean index per output. There is no Python
+    loop and no device sync, whatever the number of detections.
+    """
+
+    def __init__(self, score_threshold, allowed_classes, class_thresholds=None,
+                 min_area=0):
         self.score_threshold = score_threshold
         self.allowed_classes = allowed_classes
+        self.class_thresholds = {
+            int(class_id): float(threshold)
+            for class_id, threshold in (class_thresholds or {}).items()
+        }
+        self.min_area = min_area
 
-    def filter_detections(self, boxes, scores, labels):
-        """Filter detections based on score threshold and allowed classes"""
-        # Score threshold filtering
-        keep = scores > self.score_threshold
-        boxes = boxes[keep]
-        scores = scores[keep]
-        labels = labels[keep]
-
-        # Class filtering if specified
+        self._thresholds = self._build_thresholds()
+        # Lookup table per device, moved once
+        self._device_thresholds = {}
+
+    def _build_thresholds(self):
+        """Score threshold per class id (+inf = class not allowed)"""
+        class_ids = list(self.allowed_classes or []) + list(self.class_thresholds)
+        size = max(class_ids, default=-1) + 2
+        # Last entry: classes past the table (allowed only without a class list)
+        default = float("inf") if self.allowed_classes else self.score_threshold
+        thresholds = torch.full((size,), default, dtype=torch.float32)
         if self.allowed_classes:
-            class_mask = torch.tensor(
-                [label.item() in self.allowed_classes for label in labels],
-                dtype=torch.bool,
-                device=labels.device,
-            )
+            thresholds[list(self.allowed_classes)] = self.score_threshold
+        else:
+            thresholds[:] = self.score_threshold
+        for class_id, threshold in self.class_thresholds.items():
+            if not self.allowed_classes or class_id in self.allowed_classes:
+                thresholds[class_id] = threshold
+        return thresholds
+
+    def _lookup(self, device):
+        if device not in self._device_thresholds:
+            self._device_thresholds[device] = self._thresholds.to(device)
+        return self._device_thresholds[device]
+
+    def filter_detections(self, boxes, scores, labels):
+        """Filter detections based on score thresholds, allowed classes and area"""
+        thresholds = self._lookup(scores.device)
+        class_index = labels.long().clamp(0, len(thresholds) - 1)
+        # Fused score + class mask
+        keep = scores > thresholds[class_index]
 
-            boxes = boxes[class_mask]
-            scores = scores[class_mask]
-            labels = labels[class_mask]
+        if self.min_area > 0:
+            area = (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
+            keep &= area >= self.min_area
 
-        return boxes, scores, labels
+        return boxes[keep], scores[keep], labels[keep]
@@ -0,0 +1,39 @@
+from src.modules.engine.utils.letterbox import Letterbox
+
+
+class LetterboxMixin:
+    """
+    Letterbox preprocessing and box unmapping shared by the detectors.
+
+    A detector declares its model input format with letterbox_contract() and
+    sets `letterboxes` (empty dict), `detector_config` and `device`. One
+    Letterbox engine, with its buffers, is kept per frame geometry, so every
+    frame (or ROI window) of the same size reuses it.
+    """
+
+    def prepare(self, frame, padding_info):
+        """Preprocessing stage: frame -> model input"""
+        return self.get_letterbox(padding_info).to_tensor(frame)
+
+    def prepare_batch(self, frames, padding_info):
+        """Preprocessing stage: frames -> batched model input"""
+        return self.get_letterbox(padding_info).to_tensor_batch(frames)
+
+    def get_letterbox(self, padding_info):
+        key = (
+            tuple(padding_info["original_size"]),
+            tuple(padding_info["padded_size"]),
+            padding_info.get("origin"),
+        )
+        if key not in self.letterboxes:
+            self.letterboxes[key] = Letterbox.from_contract(
+                padding_info,
+                self.letterbox_contract(),
+                num_buffers=self.detector_config.get("preprocess_buffers", 2),
+                pin_memory=str(self.device).startswith("cuda"),
+            )
+        return self.letterboxes[key]
+
+    def adjust_boxes(self, boxes, padding_info):
+        # Model input -> original frame coordinates (one affine transform)
+        return self.get_letterbox(padding_info).unmap_boxes(boxes)
@@ -1,37 +1,158 @@
-import torchvision
-import numpy as np
 import cv2
+import numpy as np
+import torch
+import torchvision
 
 
 class NMSFilter:
-    def __init__(self, iou_threshold, nms_type="torchvision"):
+    """
+    Non-maximum suppression with selectable backends.
+
+    Contract: boxes (N, 4) xyxy, scores (N,) and labels (N,) are torch
+    tensors. apply() returns the kept boxes, scores and labels as tensors on
+    the input device, aligned and ordered by decreasing score. Labels may be
+    None, and NMS is then class-agnostic.
+
+    Backends (nms_type):
+    - "torchvision": torchvision.ops.batched_nms (C++/CUDA kernel).
+    - "opencv": cv2.dnn.NMSBoxes on the CPU (scores must be > 0).
+    - "numpy": vectorised greedy NMS in NumPy (no compiled NMS kernel).
+    - "soft": Gaussian Soft-NMS. Overlapping boxes get lower scores instead
+      of being removed, and boxes that fall below `score_threshold` are
+      dropped. The returned scores are the decayed ones.
+
+    The other backends are made class-aware with the offset trick, which is
+    what batched_nms does too: each class is shifted to its own disjoint
+    region of the plane, so one NMS pass never suppresses boxes of
+    different classes.
+    """
+
+    BACKENDS = ("torchvision", "opencv", "numpy", "soft")
+
+    def __init__(self, iou_threshold, nms_type="torchvision", class_aware=True,
+                 soft_sigma=0.5, score_threshold=0.001):
+        if nms_type not in self.BACKENDS:
+            raise ValueError(f"Unsupported nms_type: {nms_type} (one of {self.BACKENDS})")
         self.iou_threshold = iou_threshold
         self.nms_type = nms_type
+        self.class_aware = class_aware
+        self.soft_sigma = soft_sigma
+        self.score_threshold = score_threshold
+
+    @classmethod
+    def from_config(cls, detector_config):
+        """NMS settings of the detector config"""
+        return cls(
+            detector_config["iou_threshold"],
+            detector_config.get("nms_type", "torchvision"),
+            class_aware=detector_config.get("nms_class_aware", True),
+            soft_sigma=detector_config.get("soft_nms_sigma", 0.5),
+            score_threshold=cls.soft_nms_floor(detector_config),
+        )
+
+    @staticmethod
+    def soft_nms_floor(detector_config):
+        """
+        Soft-NMS drops boxes decayed below the lowest detection threshold:
+        the global one or a per-class one (class_thresholds), whichever is
+        smaller, so no class loses the boxes its own threshold accepts.
+        """
+        thresholds = [float(detector_config.get("threshold", 0.001))]
+        thresholds += [
+            float(threshold)
+            for threshold in (detector_config.get("class_thresholds") or {}).values()
+        ]
+        return min(thresholds)
+
+    def apply(self, boxes, scores, labels=None):
+        """Kept (boxes, scores, labels), labels stay aligned with their boxes"""
+        keep, kept_scores = self.select(boxes, scores, labels)
+        return boxes[keep], kept_scores, labels[keep] if labels is not None else None
 
-    def apply(self, boxes, scores):
+    def select(self, boxes, scores, labels=None):
+        """Indices of the kept boxes (by decreasing score) and their scores"""
+        if len(boxes) == 0:
+            return torch.zeros(0, dtype=torch.long, device=boxes.device), scores[:0]
+
+        boxes = boxes.reshape(-1, 4).float()
+        class_aware = self.class_aware and labels is not None
         if self.nms_type == "torchvision":
-            return self._nms_torchvision(boxes, scores)
+            keep = (
+                torchvision.ops.batched_nms(boxes, scores.float(), labels, self.iou_threshold)
+                if class_aware
+                else torchvision.ops.nms(boxes, scores.float(), self.iou_threshold)
+            )
+            return keep, scores[keep]
+
+        if class_aware:
+            boxes = self._offset_boxes(boxes, labels)
+        if self.nms_type == "soft":
+            return self._soft_nms(boxes, scores)
         if self.nms_type == "opencv":
-            return self._nms_opencv(boxes, scores)
+            keep = self._nms_opencv(boxes, scores)
+        else:
+            keep = self._nms_numpy(boxes, scores)
+        return keep, scores[keep]
 
-    def _nms_torchvision(self, boxes, scores):
-        keep = torchvision.ops.nms(boxes, scores, self.iou_threshold)
-        return boxes[keep], scores[keep]
+    @staticmethod
+    def _offset_boxes(boxes, labels):
+        """Shift every class by a multiple of the coordinate range (offset trick)"""
+        offsets = labels.to(boxes) * (boxes.max() - boxes.min() + 1)
+        return boxes + offsets[:, None]
 
     def _nms_opencv(self, boxes, scores):
-        boxes = boxes.cpu().numpy()
-        scores = scores.cpu().numpy()
-
+        boxes_np = boxes.detach().cpu().numpy()
+        # NMSBoxes takes (x, y, w, h) rectangles
+        rects = np.concatenate([boxes_np[:, :2], boxes_np[:, 2:] - boxes_np[:, :2]], axis=1)
         indices = cv2.dnn.NMSBoxes(
-            boxes.tolist(),
-            scores.tolist(),
-            score_threshold=0.3,
+            rects.tolist(),
+            scores.detach().cpu().float().numpy().tolist(),
+            # Scores were already thresholded by the DetectionFilter
+            score_threshold=0.0,
             nms_threshold=self.iou_threshold,
         )
+        keep = np.asarray(indices, dtype=np.int64).reshape(-1)
+        return torch.from_numpy(keep).to(boxes.device)
+
+    def _nms_numpy(self, boxes, scores):
+        """Greedy NMS, one vectorised IoU row per kept box"""
+        boxes_np = boxes.detach().cpu().numpy().astype(np.float64)
+        order = np.argsort(-scores.detach().cpu().float().numpy(), kind="stable")
+        x1, y1, x2, y2 = boxes_np.T
+        areas = (x2 - x1).clip(min=0) * (y2 - y1).clip(min=0)
+
+        keep = []
+        while order.size:
+            i = order[0]
+            keep.append(i)
+            rest = order[1:]
+            width = (np.minimum(x2[i], x2[rest]) - np.maximum(x1[i], x1[rest])).clip(min=0)
+            height = (np.minimum(y2[i], y2[rest]) - np.maximum(y1[i], y1[rest])).clip(min=0)
+            intersection = width * height
+            iou = intersection / (areas[i] + areas[rest] - intersection + 1e-12)
+            order = rest[iou <= self.iou_threshold]
+        return torch.as_tensor(np.asarray(keep, dtype=np.int64), device=boxes.device)
+
+    def _soft_nms(self, boxes, scores):
+        """Gaussian Soft-NMS: decay the scores of boxes overlapping a kept box"""
+        # Pairwise IoU once, then one masked update per kept box
+        iou = torchvision.ops.box_iou(boxes, boxes)
+        current = scores.detach().float().clone()
+        alive = current > self.score_threshold
+
+        keep, kept_scores = [], []
+        while bool(alive.any()):
+            i = int(torch.argmax(torch.where(alive, current, current.new_tensor(-1.0))))
+            keep.append(i)
+            kept_scores.append(current[i])
+            alive[i] = False
+            current = torch.where(
+                alive, current * torch.exp(-(iou[i] ** 2) / self.soft_sigma), current
+            )
+            alive &= current > self.score_threshold
 
-        if len(indices) > 0:
-            indices = indices.flatten()
-            filtered_boxes = boxes[indices]
-            filtered_scores = scores[indices]
-            return filtered_boxes, filtered_scores
-        return np.array([]), np.array([])
+        keep = torch.tensor(keep, dtype=torch.long, device=boxes.device)
+        if not kept_scores:
+            # Every box was below the score threshold
+            return keep, scores[:0]
+        return keep, torch.stack(kept_scores).to(scores.dtype)
@@ -15,19 +15,22 @@ class DisplayAction(DisplayBase):
 
         return cv2.waitKey(1) & 0xFF
 
-    def draw_detections(self, frame, boxes, scores, labels, fps):
+    def draw_detections(self, frame, detections, fps):
         """Draw detection boxes and labels"""
 
         frame_out = frame.copy()
 
+        # One device -> host copy for the whole frame
+        boxes, scores, labels = detections.numpy()
+
         # Draw boxes and labels
-        for box, score, label in zip(boxes, scores, labels):
+        for box, score, label in zip(boxes.tolist(), scores.tolist(), labels.tolist()):
             # Draw box
             x1, y1, _, _ = self._draw_box(frame_out, box)
 
             # Draw label
             if self.config_display.show_labels:
-                label_text = f"{self.class_names[int(label.item())]} {score:.2f}"
+                label_text = f"{self.class_names[label]} {score:.2f}"
 
                 self._draw_label(
                     frame_out, label_text, (x1, y1 - self.config_display.text_padding)
@@ -43,40 +46,21 @@ class DisplayAction(DisplayBase):
 
         frame_out = frame.copy()
 
-        # Draw tracks
-        for track in tracks:
-            # Get track info
-
-            track_id = track.track_id
-
-            if hasattr(track, "to_ltrb") and callable(track.to_ltrb):
-                # for DeepSORT
-                if not track.is_confirmed():
-                    continue
-                ltrb = track.to_ltrb()
-                class_id = track.det_class
-
-            elif hasattr(track, "tlwh"):
-                # for ByteTrack (STrack), convert tlwh to ltrb
-                if not track.is_activated:
-                    continue
-                l, t, w, h = track.tlwh  # noqa: E741
-                ltrb = [l, t, l + w, t + h]
-                class_id = track.label
-
-            else:
-                raise AttributeError(
-                    "Track object does not have 'to_ltrb()' or 'tlwh' attributes."
-                )
+        # Confirmed tracks only
+        tracks = tracks.select(tracks.confirmed)
 
+        # Draw tracks
+        for track_id, ltrb, class_id in zip(
+            tracks.track_ids.tolist(), tracks.boxes.tolist(), tracks.class_ids.tolist()
+        ):
             # Draw box
             x1, y1, _, _ = self._draw_box(frame_out, ltrb)
 
             # Draw label
             if self.config_display.show_labels:
                 label_text = (
-                    f"{self.class_names[int(class_id)]}-{track_id}"
-                    if class_id < len(self.class_names)
+                    f"{self.class_names[class_id]}-{track_id}"
+                    if 0 <= class_id < len(self.class_names)
                     else f"ID-{track_id}"
                 )
                 self._draw_label(
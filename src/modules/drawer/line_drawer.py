@@ -8,6 +8,9 @@ class LineDrawer:
         self.config_drawer = config_drawer
 
         self.video_path = config_video["input_path"]
+        self.lines_path = config_video.get(
+            "lines_path", "src/modules/counter/lines_geometry.json"
+        )
         self.color_palette = config_drawer["color_palette"]
 
         self.lines_config = []
@@ -92,7 +95,7 @@ class LineDrawer:
 
         cv2.destroyAllWindows()
         # Save to JSON file
-        with open("src/modules/counter/lines_geometry.json", "w") as file:
+        with open(self.lines_path, "w") as file:
             json.dump(self.lines_config, file, indent=4)
 
         return self.lines_config
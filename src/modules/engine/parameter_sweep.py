@@ -0,0 +1,205 @@
+"""
+ParameterSweep runs TrackerManager + ObjectCounter for a grid of tracker
+configurations and frame_skip values over detections stored by the detection
+cache (run src.main once with --detection-cache True and frame_skip 1).
+Each configuration runs in its own worker process; results are written to a
+single CSV table in the CounterSummary style.
+"""
+
+import csv
+import itertools
+import json
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import torch
+
+from src.models.model_manager import ModelManager
+from src.modules.counter.algorithms.object_counter import ObjectCounter
+from src.modules.counter.counter_manager import CounterManager, LINES_GEOMETRY_PATH
+from src.modules.detector.detector_manager import DetectorManager
+from src.modules.tracker.tracker_manager import TrackerManager
+from src.modules.videoIO.video_io import VideoReader
+
+
+def _run_job(job):
+    """Worker: replay cached detections through one tracker/counter configuration"""
+    # One BLAS/OpenMP thread per worker, the parallelism comes from the processes
+    torch.set_num_threads(1)
+
+    cache = DetectorManager.create_detection_cache(
+        job["detector_config"], job["video_path"], job["model_name"],
+        job["image_size"], job["allowed_classes"], job["lines_path"],
+        job["precision"], job["backend"], job["reduced_decode"],
+    )
+    frame_indices = range(0, job["last_frame"], job["frame_skip"])
+    if not cache.covers(frame_indices):
+        raise RuntimeError(
+            f"Detection cache {cache.path} does not cover frame_skip={job['frame_skip']}"
+        )
+
+    tracker = TrackerManager(
+        {
+            "tracker": job["tracker"],
+            "frame_skip": job["frame_skip"],
+            "track_state_ttl": job["track_state_ttl"],
+            "track_state_max_size": job["track_state_max_size"],
+        },
+        job["tracker_config"],
+    )
+    counter = ObjectCounter(
+        job["allowed_classes"],
+        job["class_names"],
+        state_ttl=job["track_state_ttl"],
+        state_max_size=job["track_state_max_size"],
+    )
+    lines = CounterManager.read_lines_geometry(job["lines_path"])
+
+    # Appearance-based trackers need the decoded frames, others only the frame size
+    video_reader = None
+    if job["needs_frames"]:
+        video_reader = VideoReader(job["video_path"])
+        frames = video_reader.read_frames(job["frame_skip"], max_frame=job["last_frame"] - 1)
+    else:
+        width, height = job["frame_size"]
+        frame = np.broadcast_to(np.zeros((1, 1, 3), dtype=np.uint8), (height, width, 3))
+        frames = ((frame_index, frame) for frame_index in frame_indices)
+
+    start_time = time.perf_counter()
+    for frame_index, frame in frames:
+        if not cache.has(frame_index):
+            break  # end of the video
+
+        tracks = tracker.update(frame, cache.get(frame_index))
+        counter.update(tracks, lines)
+    runtime = time.perf_counter() - start_time
+
+    if video_reader:
+        video_reader.release()
+
+    return {
+        "tracker": job["tracker"],
+        "params": job["params"],
+        "frame_skip": job["frame_skip"],
+        "runtime": runtime,
+        "lines": [
+            {"name": line["name"], "counts": line["counts"]} for line in lines
+        ],
+    }
+
+
+class ParameterSweep:
+    def __init__(self, config, class_names, allowed_classes, max_frame):
+        self.config = config
+        self.class_names = class_names
+        self.allowed_classes = allowed_classes
+        self.max_frame = max_frame
+
+        self.config_sweep = config.sub_configs.get("sweep")["sweep"]
+        self.config_processor = config.sub_configs.get("processor")["processor"]
+        self.config_detector = config.sub_configs.get("detector")["detector"]
+        self.config_video = config.sub_configs.get("video")["video"]
+        self.config_tracker = config.sub_configs.get("tracker")
+
+        self.model_name = self.config_processor["model"]
+        self.output_file = self.config_sweep.get(
+            "output_file", f"Summary/sweep_summary_{self.model_name}.csv"
+        )
+
+    def build_jobs(self):
+        """Cartesian product of tracker parameter grids and frame_skip values"""
+        video_reader = VideoReader(self.config_video["input_path"])
+        _, width, height, total_frames = video_reader.video_parameters()
+        video_reader.release()
+
+        backend, precision = ModelManager.runtime_settings(
+            self.config.sub_configs.get("model", {}).get("runtime", {})
+        )
+        base_job = {
+            "model_name": self.model_name,
+            "image_size": ModelManager.model_image_size(self.model_name),
+            # Detection cache key of the recording run
+            "backend": backend,
+            "precision": precision,
+            "reduced_decode": self.config_video.get("reduced_decode", False),
+            "detector_config": self.config_detector,
+            "video_path": self.config_video["input_path"],
+            "lines_path": self.config_sweep.get(
+                "lines_path", self.config_video.get("lines_path", LINES_GEOMETRY_PATH)
+            ),
+            "class_names": self.class_names,
+            "allowed_classes": self.allowed_classes,
+            "frame_size": (width, height),
+            "last_frame": min(total_frames, self.max_frame + 1),
+            # Per-track state bounds, as in the processing run
+            "track_state_ttl": self.config_processor.get("track_state_ttl"),
+            "track_state_max_size": self.config_processor.get("track_state_max_size"),
+        }
+
+        jobs = []
+        for tracker_name, grid in self.config_sweep["trackers"].items():
+            grid = grid or {}
+            keys = sorted(grid)
+            values = [v if isinstance(v, list) else [v] for v in (grid[k] for k in keys)]
+            for combination in itertools.product(*values):
+                params = dict(zip(keys, combination))
+                tracker_config = dict(self.config_tracker.get(tracker_name, {}))
+                tracker_config.update(params)
+                for frame_skip in self.config_sweep["frame_skip"]:
+                    jobs.append(
+                        dict(
+                            base_job,
+                            tracker=tracker_name,
+                            tracker_config=tracker_config,
+                            params=params,
+                            frame_skip=frame_skip,
+                            needs_frames="deepsort" in tracker_name,
+                        )
+                    )
+        return jobs
+
+    def run(self):
+        """Run every job in a process pool and export the comparison table"""
+        jobs = self.build_jobs()
+        logging.info(f"Running {len(jobs)} tracker/counter configurations")
+
+        with ProcessPoolExecutor(max_workers=self.config_sweep.get("max_workers")) as pool:
+            results = list(pool.map(_run_job, jobs))
+
+        self.export_to_csv(results)
+        return results
+
+    def export_to_csv(self, results):
+        """Export counts and runtime of every configuration to one CSV"""
+        rows = [[
+            "Model", "Tracker", "Params", "Frame_Skip", "Line", "Direction",
+            "Class_ID", "Class_Name", "Count", "Runtime_s",
+        ]]
+
+        for result in results:
+            params = json.dumps(result["params"], sort_keys=True)
+            prefix = [self.model_name, result["tracker"], params, result["frame_skip"]]
+            runtime = f"{result['runtime']:.3f}"
+            for line in result["lines"]:
+                counted = False
+                for direction in ["up", "down"]:
+                    for class_id, count in line["counts"][direction].items():
+                        class_name = (
+                            self.class_names[int(class_id)]
+                            if int(class_id) < len(self.class_names)
+                            else f"Class {int(class_id)}"
+                        )
+                        rows.append(prefix + [
+                            line["name"], direction, class_id, class_name, count, runtime
+                        ])
+                        counted = True
+                if not counted:
+                    rows.append(prefix + [line["name"], "", "", "", 0, runtime])
+
+        os.makedirs(os.path.dirname(self.output_file) or ".", exist_ok=True)
+        with open(self.output_file, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerows(rows)
@@ -11,6 +11,8 @@ ComponentManager is responsible for creating and initialize the components
 of the video processing pipeline. 
 The components include: 
 - Detector: Handles object detection in video frames.
+- Detection cache: Stores/replays per-frame detections (None if disabled).
+- Model detector: The detector running the model, unwrapped (None if no model).
 - Tracker: Manages object tracking across frames.
 - Counter: Counts objects based on detection and tracking.
 - Display: Visualizes the results on the video frames. 
@@ -28,11 +30,26 @@ class ComponentManager:
         config_drawer = config.sub_configs.get("drawer")["drawer"]
                
         class_names, allowed_classes = AllowedClasses(config).get_allowed_classes()
+
+        # Pipelined stages keep up to queue_size + 2 preprocessed inputs alive,
+        # the detector input buffers must not be reused before they are consumed
+        if config_processor.get("pipeline", False):
+            config_detector = dict(
+                config_detector,
+                preprocess_buffers=max(
+                    config_detector.get("preprocess_buffers", 2),
+                    config_processor.get("queue_size", 4) + 2,
+                ),
+            )
+
+        detector_manager = DetectorManager(
+            model_handler, config_detector, allowed_classes, config_video
+        )
  
         return {
-            "detector": DetectorManager(
-                model_handler, config_detector, allowed_classes
-            ).get_detector(),
+            "detector": detector_manager.get_detector(),
+            "detection_cache": detector_manager.detection_cache,
+            "model_detector": detector_manager.model_detector,
             "tracker": TrackerManager(
                 config_processor,
                 config.sub_configs.get("tracker")[config_processor["tracker"]],
@@ -0,0 +1,153 @@
+import cv2
+import numpy as np
+import torch
+
+from src.modules.engine.utils.image_square import ImageSquare
+
+
+class Letterbox:
+    """
+    Preallocated letterbox preprocessing for one padding_info.
+
+    The resize writes straight into a persistent uint8 buffer. Each channel is
+    then copied once into the resized region of a persistent input tensor,
+    which swaps BGR->RGB, transposes HWC->CHW and casts to float in the same
+    pass. The padding of that tensor is written only when it is allocated.
+    Scaling and normalization run in place, so preprocessing a frame does not
+    allocate any array or tensor.
+
+    The input tensors form a ring of `num_buffers` slots. Pipelined stages can
+    hold earlier inputs while the next ones are prepared.
+
+    Each detector declares a letterbox contract (target_size, pad_value,
+    channel_order, scale, mean, std). Frames are mapped to the model input
+    once, and boxes are mapped back with the inverse affine transform.
+    """
+
+    def __init__(self, padding_info, target_size=None, channel_order="rgb", scale=1 / 255.0,
+                 mean=None, std=None, pad_value=0, stride=32, num_buffers=2, pin_memory=False):
+        """
+        :param padding_info: Frame geometry from ImageSquare.calculate_dimensions
+        :param target_size: Model input size (side or (width, height)); when it
+                            differs from padding_info the geometry is recomputed,
+                            unless padding_info is marked "fixed_input" (crops)
+        :param stride: Size granularity of the model input (crop input sizes)
+        """
+        self.stride = stride
+        if target_size is not None and not padding_info.get("fixed_input", False):
+            target = (
+                tuple(target_size) if isinstance(target_size, (tuple, list))
+                else (target_size, target_size)
+            )
+            if tuple(padding_info["padded_size"]) != target:
+                padding_info = ImageSquare.calculate_dimensions(
+                    *padding_info["original_size"], target
+                )
+        self.padding_info = padding_info
+        self.channel_order = channel_order
+        self.pad_value = pad_value
+        self.num_buffers = max(1, num_buffers)
+        self.pin_memory = pin_memory and torch.cuda.is_available()
+
+        self.width, self.height = padding_info["resized_size"]
+        padded_width, padded_height = padding_info["padded_size"]
+        top, left = padding_info["top_pad"], padding_info["left_pad"]
+        self._rows = slice(top, top + self.height)
+        self._cols = slice(left, left + self.width)
+
+        # Source channel (in the BGR frame) of every output channel
+        self._channels = (2, 1, 0) if channel_order == "rgb" else (0, 1, 2)
+
+        # Per channel x * scale / std - mean / std, as in to_tensor + normalize
+        mean = mean or (0.0, 0.0, 0.0)
+        std = std or (1.0, 1.0, 1.0)
+        self._mul = [scale / s for s in std]
+        self._add = [-m / s for m, s in zip(mean, std)]
+        self._pad = [pad_value * k + b for k, b in zip(self._mul, self._add)]
+
+        # Resize target
+        self._resized = np.empty((self.height, self.width, 3), dtype=np.uint8)
+        self._resized_tensor = torch.from_numpy(self._resized)
+        self._padded_shape = (padded_height, padded_width)
+
+        # Model input -> frame coordinates: x * scale - pad * scale (x1, y1, x2, y2)
+        scale_x = padding_info["original_size"][0] / self.width
+        scale_y = padding_info["original_size"][1] / self.height
+        self._box_scale = torch.tensor([scale_x, scale_y, scale_x, scale_y])
+        self._box_offset = torch.tensor(
+            [-left * scale_x, -top * scale_y, -left * scale_x, -top * scale_y]
+        )
+
+        self._tensors = []
+        self._capacity = 0
+        self._slot = 0
+
+    @classmethod
+    def from_contract(cls, padding_info, contract, **kwargs):
+        """Build the engine from a detector letterbox contract"""
+        return cls(padding_info, **contract, **kwargs)
+
+    def unmap_boxes(self, boxes):
+        """Map (N, 4) xyxy boxes from the model input back to the original frame"""
+        if len(boxes) == 0:
+            return boxes
+        if isinstance(boxes, np.ndarray):
+            boxes = torch.from_numpy(boxes)
+        if self._box_scale.device != boxes.device or self._box_scale.dtype != boxes.dtype:
+            self._box_scale = self._box_scale.to(boxes.device, boxes.dtype)
+            self._box_offset = self._box_offset.to(boxes.device, boxes.dtype)
+        return torch.addcmul(self._box_offset, boxes[:, :4], self._box_scale)
+
+    def resize(self, frame, out=None):
+        """Resize a BGR frame to the resized size (frames already at that size are kept)"""
+        if frame.shape[1::-1] == (self.width, self.height):
+            if out is None:
+                return frame
+            np.copyto(out, frame)
+            return out
+        return cv2.resize(frame, (self.width, self.height),
+                          dst=self._resized if out is None else out)
+
+    def to_tensor(self, frame):
+        """(1, 3, H, W) float model input, a view of the next ring slot"""
+        return self.to_tensor_batch([frame])
+
+    def to_tensor_batch(self, frames):
+        """(N, 3, H, W) float model input, a view of the next ring slot"""
+        batch = self._next_slot(len(frames))[: len(frames)]
+        for image, frame in zip(batch, frames):
+            source = self._resized_tensor
+            resized = self.resize(frame)
+            if resized is not self._resized:
+                source = torch.from_numpy(np.ascontiguousarray(resized))
+            roi = image[:, self._rows, self._cols]
+            for out_channel, in_channel in enumerate(self._channels):
+                # Cast + transpose + channel swap in one strided copy
+                channel = roi[out_channel].copy_(source[:, :, in_channel])
+                if self._mul[out_channel] != 1.0:
+                    channel.mul_(self._mul[out_channel])
+                if self._add[out_channel] != 0.0:
+                    channel.add_(self._add[out_channel])
+        return batch
+
+    def _next_slot(self, batch_size):
+        if batch_size > self._capacity:
+            self._allocate(batch_size)
+        tensor = self._tensors[self._slot]
+        self._slot = (self._slot + 1) % self.num_buffers
+        return tensor
+
+    def _allocate(self, capacity):
+        """(Re)allocate the ring of input tensors and write their padding"""
+        height, width = self._padded_shape
+        self._tensors = []
+        for _ in range(self.num_buffers):
+            tensor = torch.empty(
+                (capacity, 3, height, width), dtype=torch.float32,
+                pin_memory=self.pin_memory,
+            )
+            for channel, value in enumerate(self._pad):
+                tensor[:, channel].fill_(value)
+            self._tensors.append(tensor)
+        self._capacity = capacity
+        self._slot = 0
@@ -0,0 +1,81 @@
+import cv2
+import numpy as np
+
+
+class MotionGate:
+    """
+    Cheap motion check that decides if the detector must run on a frame.
+
+    Frames are downscaled to a small grayscale image and compared with the
+    last frame the detector ran on. The score is the fraction of pixels
+    whose difference exceeds `pixel_threshold`. Below `threshold` the frame is
+    gated, and the tracker only predicts it forward. A detection is forced at
+    least every `max_interval` sampled frames.
+    """
+
+    def __init__(self, threshold=0.002, max_interval=10, width=160, pixel_threshold=25):
+        self.threshold = threshold
+        self.max_interval = max(1, max_interval)
+        self.width = width
+        self.pixel_threshold = pixel_threshold
+
+        self._size = None
+        self._small = None
+        self._gray = None
+        self._reference = None
+        self._diff = None
+        self._since_detection = 0
+
+        self.frames = 0
+        self.gated_frames = 0
+        self.last_score = None
+
+    def should_detect(self, frame):
+        """Return True if the detector must run on this frame"""
+        self.frames += 1
+        gray = self._downscale(frame)
+
+        if self._reference is None or self._since_detection + 1 >= self.max_interval:
+            return self._detect(gray)
+
+        # Share of changed pixels since the last detected frame
+        cv2.absdiff(gray, self._reference, dst=self._diff)
+        self.last_score = (
+            np.count_nonzero(self._diff > self.pixel_threshold) / self._diff.size
+        )
+        if self.last_score >= self.threshold:
+            return self._detect(gray)
+
+        self._since_detection += 1
+        self.gated_frames += 1
+        return False
+
+    def gated_ratio(self):
+        """Share of frames on which the detector was skipped"""
+        return self.gated_frames / self.frames if self.frames else 0.0
+
+    def _detect(self, gray):
+        # The detected frame becomes the new reference
+        self._reference, self._gray = gray, self._reference
+        self._since_detection = 0
+        return True
+
+    def _downscale(self, frame):
+        """Small grayscale copy of the frame in a preallocated buffer"""
+        height, width = frame.shape[:2]
+        if self._size is None or self._size[2:] != (width, height):
+            small_height = max(1, round(self.width * height / width))
+            self._size = (self.width, small_height, width, height)
+            self._small = np.empty((small_height, self.width, 3), dtype=np.uint8)
+            self._gray = np.empty((small_height, self.width), dtype=np.uint8)
+            self._diff = np.empty((small_height, self.width), dtype=np.uint8)
+            self._reference = None
+
+        cv2.resize(frame, self._size[:2], dst=self._small, interpolation=cv2.INTER_AREA)
+        if self._gray is None:
+            self._gray = np.empty_like(self._diff)
+        gray = self._gray
+        cv2.cvtColor(self._small, cv2.COLOR_BGR2GRAY, dst=gray)
+        # Smooth sensor noise so it does not count as motion
+        cv2.GaussianBlur(gray, (5, 5), 0, dst=gray)
+        return gray
@@ -0,0 +1,143 @@
+import queue
+import threading
+
+
+class _StageError:
+    """Carries an exception raised inside a worker down to the consumer"""
+
+    def __init__(self, stage_name, exception):
+        self.stage_name = stage_name
+        self.exception = exception
+
+
+class StagePipeline:
+    """
+    Runs a source and a chain of stages in worker threads joined by bounded queues.
+    Every stage has exactly one worker, so items leave the pipeline in the same
+    order they were produced. The last stage output is consumed by iterating the
+    pipeline in the calling thread (needed for cv2.imshow).
+    """
+
+    _SENTINEL = object()
+
+    def __init__(self, source, stages, queue_size=4):
+        """
+        :param source: Iterable producing the input items (e.g. decoded frames).
+        :param stages: List of (name, callable) pairs. Each callable receives an
+                       item and returns the item for the next stage.
+        :param queue_size: Maximum number of items waiting between two stages.
+        """
+        self.source = source
+        self.stages = stages
+        self.queue_size = max(1, int(queue_size))
+        self._stop_event = threading.Event()
+        self._queues = [queue.Queue(maxsize=self.queue_size) for _ in range(len(stages) + 1)]
+        self._threads = []
+
+    def start(self):
+        """Start the source and stage workers"""
+        self._threads.append(
+            threading.Thread(
+                target=self._run_source, args=(self._queues[0],), name="source", daemon=True
+            )
+        )
+        for idx, (name, stage_fn) in enumerate(self.stages):
+            self._threads.append(
+                threading.Thread(
+                    target=self._run_stage,
+                    args=(name, stage_fn, self._queues[idx], self._queues[idx + 1]),
+                    name=name,
+                    daemon=True,
+                )
+            )
+        for thread in self._threads:
+            thread.start()
+        return self
+
+    def stop(self):
+        """Ask every worker to finish as soon as possible"""
+        self._stop_event.set()
+
+    def join(self):
+        """Stop the workers and wait for them to exit"""
+        self.stop()
+        for q in self._queues:
+            self._drain(q)
+        for thread in self._threads:
+            thread.join(timeout=5.0)
+
+    def __iter__(self):
+        if not self._threads:
+            self.start()
+        output_queue = self._queues[-1]
+        while True:
+            item = output_queue.get()
+            if item is self._SENTINEL:
+                return
+            if isinstance(item, _StageError):
+                self.stop()
+                raise RuntimeError(
+                    f"Pipeline stage '{item.stage_name}' failed"
+                ) from item.exception
+            yield item
+
+    def _put(self, q, item):
+        """Blocking put that gives up when the pipeline is stopped"""
+        while not self._stop_event.is_set():
+            try:
+                q.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _put_final(self, q, item):
+        """Put a sentinel/error even if the pipeline is stopping"""
+        if not self._put(q, item):
+            self._drain(q)
+            try:
+                q.put_nowait(item)
+            except queue.Full:
+                pass
+
+    def _run_source(self, output_queue):
+        try:
+            for item in self.source:
+                if not self._put(output_queue, item):
+                    break
+        except Exception as e:  # propagated to the consumer
+            self._put_final(output_queue, _StageError("source", e))
+            return
+        self._put_final(output_queue, self._SENTINEL)
+
+    def _run_stage(self, name, stage_fn, input_queue, output_queue):
+        while True:
+            try:
+                item = input_queue.get(timeout=0.1)
+            except queue.Empty:
+                if self._stop_event.is_set():
+                    self._put_final(output_queue, self._SENTINEL)
+                    return
+                continue
+
+            if item is self._SENTINEL or isinstance(item, _StageError):
+                self._put_final(output_queue, item)
+                return
+
+            try:
+                result = stage_fn(item)
+            except Exception as e:  # propagated to the consumer
+                self._put_final(output_queue, _StageError(name, e))
+                return
+
+            if not self._put(output_queue, result):
+                self._put_final(output_queue, self._SENTINEL)
+                return
+
+    @staticmethod
+    def _drain(q):
+        while True:
+            try:
+                q.get_nowait()
+            except queue.Empty:
+                return
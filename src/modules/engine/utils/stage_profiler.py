@@ -0,0 +1,126 @@
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+import numpy as np
+
+
+class StageProfiler:
+    """
+    Process-wide per-stage latency recorder (use StageProfiler.instance()).
+
+    Each span stores its duration from time.perf_counter_ns under its stage
+    name, so stages can report p50/p95/p99 latencies. With tracing enabled,
+    every span is also kept as a Chrome trace "complete" event, one track per
+    thread. The resulting JSON file opens in chrome://tracing or Perfetto.
+    GPU work is asynchronous, so its time is charged to the span that waits
+    for the result.
+    """
+
+    STAGES = [
+        "decode", "motion_gate", "preprocess", "inference", "postprocess",
+        "track", "count", "render", "display", "encode",
+    ]
+
+    _instance = None
+    _instance_lock = threading.Lock()
+
+    def __init__(self):
+        self.enabled = True
+        self.trace = False
+        self._durations = defaultdict(list)
+        self._events = []
+        self._lock = threading.Lock()
+
+    @classmethod
+    def instance(cls):
+        """The shared profiler"""
+        if cls._instance is None:
+            with cls._instance_lock:
+                if cls._instance is None:
+                    cls._instance = cls()
+        return cls._instance
+
+    def configure(self, enabled=True, trace=False):
+        self.enabled = enabled
+        self.trace = trace
+
+    def reset(self):
+        """Drop every recorded span"""
+        with self._lock:
+            self._durations = defaultdict(list)
+            self._events = []
+
+    @contextmanager
+    def span(self, stage):
+        """Time the enclosed block as one span of `stage`"""
+        if not self.enabled:
+            yield
+            return
+        start_ns = time.perf_counter_ns()
+        try:
+            yield
+        finally:
+            self.record(stage, start_ns, time.perf_counter_ns())
+
+    def record(self, stage, start_ns, end_ns):
+        """Record a span measured by the caller"""
+        with self._lock:
+            self._durations[stage].append(end_ns - start_ns)
+            if self.trace:
+                self._events.append({
+                    "name": stage,
+                    "ph": "X",
+                    "ts": start_ns / 1000.0,
+                    "dur": (end_ns - start_ns) / 1000.0,
+                    "pid": os.getpid(),
+                    "tid": threading.get_ident(),
+                })
+
+    def stats(self):
+        """Per stage: count, total/mean/p50/p95/p99/max in milliseconds"""
+        with self._lock:
+            durations = {stage: list(values) for stage, values in self._durations.items()}
+
+        order = {stage: idx for idx, stage in enumerate(self.STAGES)}
+        stats = {}
+        for stage in sorted(durations, key=lambda s: (order.get(s, len(order)), s)):
+            values = np.asarray(durations[stage], dtype=np.float64) / 1e6
+            p50, p95, p99 = np.percentile(values, [50, 95, 99])
+            stats[stage] = {
+                "count": len(values),
+                "total_ms": float(values.sum()),
+                "mean_ms": float(values.mean()),
+                "p50_ms": float(p50),
+                "p95_ms": float(p95),
+                "p99_ms": float(p99),
+                "max_ms": float(values.max()),
+            }
+        return stats
+
+    def export_chrome_trace(self, path):
+        """Write the recorded spans as a Chrome trace / Perfetto JSON file"""
+        with self._lock:
+            events = list(self._events)
+
+        # Name the thread tracks after the first stage they ran
+        thread_names = {}
+        for event in events:
+            thread_names.setdefault(event["tid"], event["name"])
+        metadata = [
+            {
+                "name": "thread_name",
+                "ph": "M",
+                "pid": os.getpid(),
+                "tid": tid,
+                "args": {"name": f"{name} thread"},
+            }
+            for tid, name in thread_names.items()
+        ]
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "w") as file:
+            json.dump({"traceEvents": metadata + events, "displayTimeUnit": "ms"}, file)
@@ -1,37 +1,69 @@
 import os
 import time
 import cv2
+import numpy as np
+import torch
 from tqdm import tqdm
 from src.modules.videoIO.video_io import VideoReader, VideoWriter
 from src.modules.engine.utils.component_manager import ComponentManager
 from src.modules.engine.utils.image_square import ImageSquare
+from src.modules.engine.utils.motion_gate import MotionGate
+from src.modules.engine.utils.stage_pipeline import StagePipeline
+from src.modules.engine.utils.stage_profiler import StageProfiler
+from src.modules.utils.detections import Detections
 
 class VideoProcessor:
     def __init__(self, model_handler, config, max_frame):
         os.makedirs("Output", exist_ok=True)
-        os.makedirs("Summary", exist_ok=True)
 
         self.model_handler = model_handler
         self.device = model_handler.device
         self.config = config
         self.max_frame = max_frame
+        self.video_end_frame = None
 
         try:
             self.model_name = self.model_handler.model.model_name
         except AttributeError:
             self.model_name = self.model_handler.get_model_name()
 
+        # Gated frames are never detected, a cache recorded with the gate on
+        # could never cover a run (replay, parameter sweep)
+        if config.sub_configs.get("processor")["processor"].get(
+            "motion_gate", False
+        ) and config.sub_configs.get("detector")["detector"].get("cache_enabled", False):
+            raise ValueError("motion_gate and cache_enabled cannot be used together")
+
         # Initialize components
         self.components = ComponentManager.create(model_handler, config)
         self.detector = self.components["detector"]
+        self.detection_cache = self.components["detection_cache"]
+        self.model_detector = self.components["model_detector"]
         self.tracker = self.components["tracker"]
         self.counter = self.components["counter"]
         self.display = self.components["display"]
         self.memory = self.components["memory"]
         self.summary = self.components["summary"]
+        os.makedirs(self.summary.summary_dir, exist_ok=True)
+
+        # Optional motion gate: static frames skip the detector (needs a tracker)
+        config_processor = config.sub_configs.get("processor")["processor"]
+        self.motion_gate = (
+            MotionGate(
+                threshold=config_processor.get("motion_threshold", 0.002),
+                max_interval=config_processor.get("motion_max_interval", 10),
+            )
+            if config_processor.get("motion_gate", False) and self.tracker
+            else None
+        )
+
+        # Per-stage latency spans (and optional Chrome trace)
+        self.profiler = StageProfiler.instance()
+        self.profiler.configure(trace=config_processor.get("trace_export", False))
+        self.profiler.reset()
 
     def process_video(self, config):
-        
+
         config_processor = config.sub_configs.get("processor")["processor"]
         config_video = config.sub_configs.get("video")["video"]
 
@@ -53,6 +85,17 @@ class VideoProcessor:
             width_orig, height_orig, target_size
         )
 
+        # Decode directly at the model size when full frames are not needed
+        if self._use_reduced_decode(config_processor, config_video):
+            video_reader.output_size = padding_info["resized_size"]
+
+        # Lazy model initialisation before the first frame, not on it
+        self.summary.update_warmup_stats(self._warm_up(
+            padding_info,
+            video_reader.output_size or padding_info["original_size"],
+            config_processor,
+        ))
+
         # Initialize video writer if needed
         writer = (
             VideoWriter(
@@ -62,71 +105,38 @@ class VideoProcessor:
             else None
         )
 
-        frame_count = 0
-        with tqdm(total=total_frames) as pbar:
-            while True and frame_count <= self.max_frame:  # stop process by frame count
-                ret, frame = video_reader.read_frame()
-                if not ret:
-                    break
-
-                if frame_count % frame_skip == 0:
-                    # Process frame
-                    start_time = time.time()
-
-                    # Detect objects
-                    if self.detector:
-                        boxes, scores, labels = (
-                            self.detector.detection_pipeline(frame, padding_info)
-                        )
-                        # Update detection count for summary
-                        self.summary.update_frame_stats(0, len(boxes))
-                       
-                    # Track objects
-                    if self.tracker:
-                        tracks = self.tracker.update(frame, boxes, scores, labels)
-                    
-                    # Draw results
-                    if self.tracker:
-                        frame_processed = self.display.draw_tracks(
-                            frame, tracks, 1.0 / (time.time() - start_time)
-                        )
-                    else:
-                        frame_processed = self.display.draw_detections(
-                            frame,
-                            boxes,
-                            scores,
-                            labels,
-                            1.0 / (time.time() - start_time),
-                        )
-
-                    # Calculate FPS and update summary
-                    current_fps = 1.0 / (time.time() - start_time)
-                    self.summary.update_frame_stats(current_fps)
-
-                    # Counter:
-                    if self.counter and self.tracker:
-                        frame_processed = self.counter.process_frame(
-                            frame_processed, tracks
-                        )
-
-                    # Display/save results
-                    if config_processor["enable_display"]:
-                        key = self.display.display_frame(frame_processed)
-                        if key == ord("q"):  # Quit if 'q' is pressed
-                            break
-
-                    if writer and config_processor["enable_save"]:
-                        writer.write(frame_processed)
+        if config_processor.get("pipeline", False):
+            self._process_pipelined(
+                video_reader, writer, padding_info, total_frames, config_processor
+            )
+        else:
+            self._process_sequential(
+                video_reader, writer, padding_info, total_frames, config_processor
+            )
 
-                frame_count += 1
+        # End summary timing
+        self.summary.end_processing()
+        if self.motion_gate:
+            self.summary.update_gate_stats(
+                self.motion_gate.frames, self.motion_gate.gated_frames
+            )
 
-                # Call memory cleanup
-                self.memory.cleanup(frame_count)
+        # Persist new detections (end_frame is known if the whole video was read)
+        if self.detection_cache:
+            self.detection_cache.close(end_frame=self.video_end_frame)
 
-                pbar.update(1)
+        # Per-stage latency breakdown
+        self.summary.update_stage_stats(self.profiler.stats())
+        if self.profiler.trace:
+            self.profiler.export_chrome_trace(
+                os.path.join(self.summary.summary_dir, f"trace_{self.summary.run_name}.json")
+            )
 
-        # End summary timing
-        self.summary.end_processing()
+        # Bounded per-track state (live / released entries)
+        self.summary.update_state_stats({
+            "tracker": self.tracker.state_stats() if self.tracker else None,
+            "counter": self.counter.state_stats() if self.counter else None,
+        })
 
         # Generate and export summary
         if self.counter:
@@ -140,3 +150,299 @@ class VideoProcessor:
         if writer:
             writer.release()
         cv2.destroyAllWindows()
+
+    def _warm_up(self, padding_info, frame_size, config_processor):
+        """
+        Run the model detector on blank frames of the video size and batch
+        size (ultralytics predictor setup, cudnn algorithms, ONNX Runtime
+        allocations). Returns the seconds spent, None without warm-up.
+        """
+        iterations = config_processor.get("warmup_iterations", 1)
+        if self.model_detector is None or iterations <= 0:
+            return None
+
+        start_time = time.perf_counter()
+        width, height = frame_size
+        batch_size = max(1, config_processor.get("batch_size", 1))
+        frames = [np.zeros((height, width, 3), dtype=np.uint8)] * batch_size
+        for _ in range(iterations):
+            if batch_size == 1:
+                self.model_detector.detection_pipeline(frames[0], padding_info)
+            else:
+                self.model_detector.detection_pipeline_batch(frames, padding_info)
+        if self.device.type == "cuda":
+            torch.cuda.synchronize()
+        # Warm-up spans are not part of the video stages
+        self.profiler.reset()
+        return time.perf_counter() - start_time
+
+    def _process_sequential(
+        self, video_reader, writer, padding_info, total_frames, config_processor
+    ):
+        """Run every stage one after another on the calling thread"""
+        last_index = 0
+        current_fps = 0.0
+        last_time = time.perf_counter()
+        with tqdm(total=total_frames) as pbar:
+            for batch in self._read_batches(video_reader, config_processor):
+                # Detect objects (one forward pass per batch)
+                detections = self._detect_batch(batch, padding_info)
+
+                for item, frame_detections in zip(batch, detections):
+                    frame = item["frame"]
+
+                    # Track objects (prediction only on gated frames)
+                    tracks = self._track(frame, frame_detections, item.get("gated", False))
+
+                    # Counter:
+                    lines = None
+                    if self.counter and self.tracker:
+                        with self.profiler.span("count"):
+                            self.counter.update(tracks)
+                        lines = self.counter.lines_geometry
+
+                    # Draw results and lines (FPS measured on the previous frame)
+                    frame_processed = self._draw(
+                        frame, tracks, frame_detections, current_fps, lines
+                    )
+
+                    pbar.update(item["index"] + 1 - last_index)
+                    last_index = item["index"] + 1
+
+                    # Display/save results
+                    if not self._output(frame_processed, writer, config_processor):
+                        return
+
+                    # FPS: time between two frames leaving the loop, so decode,
+                    # the batch detection, counting, render and encode are included
+                    current_fps, last_time = self._frame_fps(last_time)
+                    self.summary.update_frame_stats(current_fps, len(frame_detections))
+
+    def _process_pipelined(
+        self, video_reader, writer, padding_info, total_frames, config_processor
+    ):
+        """
+        Run decode, preprocess, inference and track/count in worker threads joined
+        by bounded queues; render/encode runs on the calling thread.
+        Each stage has a single worker, so frame order and tracker state updates
+        are the same as in the sequential mode.
+        """
+        queue_size = config_processor.get("queue_size", 4)
+
+        def preprocess(batch):
+            return batch, self._prepare_batch(batch, padding_info)
+
+        def inference(prepared):
+            batch, inputs = prepared
+            detections = self._predict_batch(inputs, batch, padding_info)
+            for item, item_detections in zip(batch, detections):
+                item["detections"] = item_detections
+            return batch
+
+        def track_count(batch):
+            for item in batch:
+                tracks = self._track(item["frame"], item["detections"], item.get("gated", False))
+                # Tracks arrays are not updated afterwards: safe to draw later
+                item["tracks"] = tracks
+                if self.counter and self.tracker:
+                    with self.profiler.span("count"):
+                        self.counter.update(tracks)
+                        item["lines"] = self.counter.snapshot_lines()
+            return batch
+
+        pipeline = StagePipeline(
+            self._read_batches(video_reader, config_processor),
+            [
+                ("preprocess", preprocess),
+                ("inference", inference),
+                ("track", track_count),
+            ],
+            queue_size=queue_size,
+        )
+
+        current_fps = 0.0
+        last_time = time.perf_counter()
+        last_index = 0
+        with tqdm(total=total_frames) as pbar:
+            try:
+                for batch in pipeline.start():
+                    for item in batch:
+                        # Draw results and lines (FPS measured on the previous frame)
+                        frame_processed = self._draw(
+                            item["frame"], item.get("tracks"), item["detections"],
+                            current_fps, item.get("lines"),
+                        )
+
+                        pbar.update(item["index"] + 1 - last_index)
+                        last_index = item["index"] + 1
+
+                        if not self._output(frame_processed, writer, config_processor):
+                            return
+
+                        # Sustained FPS: time between two frames leaving the pipeline
+                        current_fps, last_time = self._frame_fps(last_time)
+                        self.summary.update_frame_stats(current_fps, len(item["detections"]))
+            finally:
+                pipeline.join()
+
+    def _read_batches(self, video_reader, config_processor):
+        """
+        Read the video and yield lists of sampled frames ({"index", "frame"}).
+        A batch is flushed when it holds `batch_size` frames or when its first
+        frame has waited more than `batch_timeout_ms`. The deadline is checked
+        before a new frame joins the batch, so a slow decode never holds the
+        pending frames back for one more frame.
+        """
+        config_video = self.config.sub_configs.get("video")["video"]
+        frame_skip = config_processor["frame_skip"]
+        batch_size = max(1, config_processor.get("batch_size", 1))
+        batch_timeout = config_processor.get("batch_timeout_ms", 100) / 1000.0
+
+        batch = []
+        batch_start = None
+        self.video_end_frame = None
+        frames = video_reader.read_frames(
+            frame_skip,
+            max_frame=self.max_frame,  # stop process by frame count
+            mode=config_video.get("read_mode", "grab"),
+            seek_threshold=config_video.get("seek_threshold", 30),
+        )
+        while True:
+            with self.profiler.span("decode"):
+                frame_index, frame = next(frames, (None, None))
+            if frame is None:
+                break
+
+            # Pending batch past its deadline: flushed without the new frame
+            if batch and time.time() - batch_start >= batch_timeout:
+                yield batch
+                batch = []
+
+            if not batch:
+                batch_start = time.time()
+            item = {"index": frame_index, "frame": frame}
+            # Static frames are only propagated by the tracker
+            if self.motion_gate:
+                with self.profiler.span("motion_gate"):
+                    if not self.motion_gate.should_detect(frame):
+                        item["gated"] = True
+            batch.append(item)
+
+            # Call memory cleanup
+            self.memory.cleanup(frame_index + 1)
+
+            if len(batch) >= batch_size or time.time() - batch_start >= batch_timeout:
+                yield batch
+                batch = []
+
+        if batch:
+            yield batch
+        self.video_end_frame = video_reader.end_frame
+
+    def _detect_batch(self, batch, padding_info):
+        """Run the detector over a batch of frames, one forward pass"""
+        inputs = self._prepare_batch(batch, padding_info)
+        return self._predict_batch(inputs, batch, padding_info)
+
+    def _prepare_batch(self, batch, padding_info):
+        """Preprocessing stage for a batch of frames"""
+        detected = self._detected_items(batch)
+        frames = [item["frame"] for item in detected]
+        if not frames:
+            return None
+        with self.profiler.span("preprocess"):
+            if self.detection_cache:
+                return self.detector.prepare_batch(
+                    frames, padding_info, [item["index"] for item in detected]
+                )
+            if len(frames) == 1:
+                return self.detector.prepare(frames[0], padding_info)
+            return self.detector.prepare_batch(frames, padding_info)
+
+    def _predict_batch(self, inputs, batch, padding_info):
+        """Inference stage for inputs built by _prepare_batch"""
+        num_detected = len(self._detected_items(batch))
+        if num_detected == 0:
+            detections = []
+        elif self.detection_cache:
+            detections = self.detector.predict_batch(inputs, padding_info)
+        elif num_detected == 1:
+            detections = [self.detector.predict(inputs, padding_info)]
+        else:
+            detections = self.detector.predict_batch(inputs, padding_info)
+        return self._with_gated(batch, detections)
+
+    @staticmethod
+    def _detected_items(batch):
+        """Items of a batch the detector runs on (not gated by the motion check)"""
+        return [item for item in batch if not item.get("gated", False)]
+
+    @staticmethod
+    def _with_gated(batch, detections):
+        """Detections in batch order, gated frames get empty detections"""
+        detections = iter(detections)
+        return [
+            Detections.empty() if item.get("gated", False) else next(detections)
+            for item in batch
+        ]
+
+    def _use_reduced_decode(self, config_processor, config_video):
+        """
+        Model-sized frames are enough when nothing is rendered or saved and the
+        tracker does not crop appearance features from the frame (DeepSORT).
+        """
+        if not config_video.get("reduced_decode", False):
+            return False
+        if config_processor["enable_display"] or config_processor["enable_save"]:
+            return False
+        # ROI windows and tiles are cut from the full-resolution frame
+        config_detector = self.config.sub_configs.get("detector")["detector"]
+        if config_detector.get("roi_enabled", False) or config_detector.get(
+            "tiling_enabled", False
+        ):
+            return False
+        return not (
+            config_processor["enable_tracking"] and "deepsort" in config_processor["tracker"]
+        )
+
+    def _track(self, frame, detections, gated=False):
+        """Update the tracker if enabled (Kalman prediction only on gated frames)"""
+        if self.tracker:
+            with self.profiler.span("track"):
+                if gated:
+                    return self.tracker.predict(frame)
+                return self.tracker.update(frame, detections)
+        return None
+
+    def _draw(self, frame, tracks, detections, fps, lines=None):
+        """
+        Draw tracks (or raw detections when tracking is disabled), then the
+        counting lines and counts when given. One render span per frame.
+        """
+        with self.profiler.span("render"):
+            if self.tracker:
+                frame = self.display.draw_tracks(frame, tracks, fps)
+            else:
+                frame = self.display.draw_detections(frame, detections, fps)
+            if lines is not None:
+                frame = self.counter.draw(frame, lines)
+            return frame
+
+    def _output(self, frame_processed, writer, config_processor):
+        """Display/save a processed frame. Returns False when the user quits."""
+        if config_processor["enable_display"]:
+            with self.profiler.span("display"):
+                key = self.display.display_frame(frame_processed)
+            if key == ord("q"):  # Quit if 'q' is pressed
+                return False
+
+        if writer and config_processor["enable_save"]:
+            with self.profiler.span("encode"):
+                writer.write(frame_processed)
+        return True
+
+    @staticmethod
+    def _frame_fps(last_time):
+        """FPS from the time since the previous frame, and the new reference time"""
+        now = time.perf_counter()
+        return 1.0 / max(now - last_time, 1e-9), now
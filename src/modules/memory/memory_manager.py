@@ -4,15 +4,22 @@ import torch
 class MemoryManager:
     def __init__(self, cleanup_frequency=100):
         self.cleanup_frequency = cleanup_frequency
+        self.last_frame_count = 0
 
     def cleanup(self, frame_count):
-        if frame_count % self.cleanup_frequency == 0:
+        # A multiple of cleanup_frequency was reached or passed (skipped frames
+        # are not always reported one by one)
+        if (
+            frame_count // self.cleanup_frequency
+            > self.last_frame_count // self.cleanup_frequency
+        ):
             if torch.cuda.is_available():
                 # Clear CUDA cache
                 torch.cuda.empty_cache()
                 # Force garbage collection
                 import gc
                 gc.collect()
+        self.last_frame_count = frame_count
 
     @staticmethod
     def print_memory_stats():
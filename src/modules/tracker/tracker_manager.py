@@ -1,6 +1,4 @@
 # -*- coding: utf-8 -*-
-from src.modules.tracker.trackers.tracker_deepsort import Tracker_DeepSort
-from src.modules.tracker.trackers.tracker_bytetrack import Tracker_ByteTrack
 
 class TrackerManager:
     def __init__(self, config_processor, config_tracker):
@@ -9,13 +7,40 @@ class TrackerManager:
         self.config_tracker = config_tracker
         self.tracker_name = config_processor["tracker"]
 
+        # Trackers are imported on use: bytetrack_native needs neither yolox nor deep_sort
         if "deepsort" in self.tracker_name:
+            from src.modules.tracker.trackers.tracker_deepsort import Tracker_DeepSort
+
             self.tracker_processor = Tracker_DeepSort(self.config_tracker)
+        elif "bytetrack_native" in self.tracker_name:
+            from src.modules.tracker.trackers.tracker_bytetrack_native import (
+                Tracker_ByteTrackNative,
+            )
+
+            self.frame_skip = config_processor["frame_skip"]
+            self.tracker_processor = Tracker_ByteTrackNative(self.frame_skip, self.config_tracker)
         elif "bytetrack" in self.tracker_name:
+            from src.modules.tracker.trackers.tracker_bytetrack import Tracker_ByteTrack
+
             self.frame_skip = config_processor["frame_skip"]
-            self.tracker_processor = Tracker_ByteTrack(self.frame_skip, self.config_tracker)
+            self.tracker_processor = Tracker_ByteTrack(
+                self.frame_skip,
+                self.config_tracker,
+                state_ttl=config_processor.get("track_state_ttl"),
+                state_max_size=config_processor.get("track_state_max_size"),
+            )
         else:
             raise ValueError(f"Unsupported tracking algorithm: {self.tracker_name}")
 
-    def update(self, frame, boxes, scores, labels):
-        return self.tracker_processor.update(frame, boxes, scores, labels)
+    def update(self, frame, detections):
+        """Detections of a frame -> Tracks"""
+        return self.tracker_processor.update(frame, detections)
+
+    def predict(self, frame):
+        """Propagate the tracks on a frame where detection was skipped"""
+        return self.tracker_processor.predict(frame)
+
+    def state_stats(self):
+        """Per-track state counters of the tracker wrapper (None if it keeps none)"""
+        state_stats = getattr(self.tracker_processor, "state_stats", None)
+        return state_stats() if state_stats else None
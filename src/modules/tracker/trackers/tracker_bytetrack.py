@@ -1,56 +1,108 @@
 import numpy as np
-from yolox.tracker.byte_tracker import BYTETracker
+from yolox.tracker.byte_tracker import BYTETracker, STrack, joint_stracks
 from box import Box
 
+from src.modules.utils.detections import Tracks
+from src.modules.utils.track_state_store import TrackStateStore
+
 class Tracker_ByteTrack:
-    def __init__(self, frame_skip, config):
+    def __init__(self, frame_skip, config, state_ttl=None, state_max_size=None):
         """Handles object tracking using BYTETrack algorithm"""
         frame_rate = 30/frame_skip  # Assuming 30 FPS original for the video
         self.tracker = BYTETracker(Box(config), frame_rate)  
-        self.track_labels = {}
+        # track_id -> [label, score], dropped when the tracker removes the track
+        self.track_labels = TrackStateStore(state_ttl, state_max_size)
 
-    def update(self, frame, boxes, scores, labels):
-        if len(boxes) == 0:
-            return []
+    def update(self, frame, detections):
+        if len(detections) == 0:
+            return Tracks.empty()
 
         height, width = frame.shape[:2]
         img_info = [height, width]
         img_size = [height, width]
 
-        detections = []
-        temp_labels = []
-        for box, score, label in zip(boxes, scores, labels):
-            x1, y1, x2, y2 = box.tolist()
-            detections.append([x1, y1, x2, y2, score.item()])
-            temp_labels.append(label.item())
+        # (N, 5) x1, y1, x2, y2, score rows, as BYTETracker takes them
+        boxes, scores, detection_labels = detections.numpy()
+        detections = np.concatenate([boxes, scores[:, None]], axis=1).astype(np.float64)
 
-        detections = np.array(detections)
+        # Tracks only keep the score of their detection: make scores unique
+        # so that the score identifies the detection index
+        score_index = self.unique_scores(detections[:, 4])
 
         tracks = self.tracker.update(detections, img_info, img_size)
+        self.assign_labels(tracks, score_index, detection_labels)
+        self.release_removed()
+        return self.to_tracks(tracks)
+
+    @staticmethod
+    def to_tracks(stracks):
+        """STrack list -> Tracks (tracks without a label yet get class -1)"""
+        return Tracks(
+            [track.track_id for track in stracks],
+            [track.tlbr for track in stracks],
+            [track.score for track in stracks],
+            [getattr(track, "label", -1) for track in stracks],
+            [track.is_activated for track in stracks],
+        )
+
+    def release_removed(self):
+        """Forget the tracks that left the tracker"""
+        live = {
+            track.track_id
+            for track in self.tracker.tracked_stracks + self.tracker.lost_stracks
+        }
+        for track in self.tracker.removed_stracks:
+            if track.track_id not in live:
+                self.track_labels.remove(track.track_id)
+        # BYTETracker never empties removed_stracks. Only ids still tracked or
+        # lost can be matched against it again (ids are never reused).
+        self.tracker.removed_stracks = [
+            track for track in self.tracker.removed_stracks if track.track_id in live
+        ]
+        self.track_labels.expire(self.tracker.frame_id)
 
-        # Get matching indices using scores by JRE
-        temp_labels_matched = []
+    def state_stats(self):
+        """Live and released per-track label entries"""
+        return self.track_labels.stats()
 
-        scores_cpu = []
-        for score in scores:
-            score = score.cpu().item()
-            scores_cpu.append(score)
+    @staticmethod
+    def unique_scores(scores):
+        """Nudge repeated scores down by one ulp (in place), return {score: index}"""
+        score_index = dict(zip(scores.tolist(), range(len(scores))))
+        if len(score_index) < len(scores):
+            score_index = {}
+            for idx, score in enumerate(scores.tolist()):
+                while score in score_index:
+                    score = float(np.nextafter(score, -np.inf))
+                scores[idx] = score
+                score_index[score] = idx
+        return score_index
 
+    def assign_labels(self, tracks, score_index, labels):
+        """Give each track the label of the detection it was updated with"""
+        now = self.tracker.frame_id
         for track in tracks:
-            track_score = track.score  # Get track score
-            matched_idx = np.where(np.equal(track_score, scores_cpu))[0]
-
-            if len(matched_idx) > 0:
-                idx = matched_idx[0]
-                temp_labels_matched.append(temp_labels[idx])
-
-        for track, label in zip(tracks, temp_labels_matched):
-            if track.track_id in self.track_labels:
-                if track.score > self.track_labels[track.track_id][1]:
-                    self.track_labels[track.track_id] = [label, track.score]
-                    track.label = label
-            else:
-                self.track_labels[track.track_id] = [label, track.score]
+            # A track output by update() holds the score of this frame's detection
+            idx = score_index.get(float(track.score))
+            if idx is None:
+                continue
+            label = labels[idx].item()
+
+            # Keep the label of the most confident detection of the track
+            stored = self.track_labels.get(track.track_id)
+            if stored is None or track.score > stored[1]:
+                self.track_labels.put(track.track_id, [label, track.score], now)
                 track.label = label
+            else:
+                self.track_labels.touch(track.track_id, now)
 
-        return tracks
\ No newline at end of file
+    def predict(self, frame):
+        """Advance the tracks one frame with the Kalman prediction only (no detections)"""
+        self.tracker.frame_id += 1
+        # Same prediction step BYTETracker.update runs on tracked + lost tracks
+        STrack.multi_predict(
+            joint_stracks(self.tracker.tracked_stracks, self.tracker.lost_stracks)
+        )
+        return self.to_tracks(
+            [track for track in self.tracker.tracked_stracks if track.is_activated]
+        )
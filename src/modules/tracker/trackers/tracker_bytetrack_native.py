@@ -0,0 +1,264 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+
+from src.modules.tracker.utils.kalman_filter import BatchKalmanFilter
+from src.modules.tracker.utils.assignment import Assigner
+from src.modules.utils.detections import Tracks
+
+TRACKED, LOST, REMOVED = 1, 2, 3
+
+
+class Tracker_ByteTrackNative:
+    """
+    ByteTrack on contiguous NumPy arrays, without yolox.
+
+    Every track lives in a slot of the state arrays (Kalman mean and
+    covariance, id, state, score, label, frames). The tracked and lost
+    lists are arrays of slot indices, in the order yolox keeps its STrack
+    lists, so matching ties and output order are the same. A frame runs one
+    batched Kalman predict/update and one IoU assignment per association
+    step. The output Tracks arrays are gathered from the slot arrays, no
+    per-track Python object is built.
+    The assignment method ("assignment" in the config: lapjv, sparse or
+    greedy, see Assigner) picks dense LAPJV or grid-gated matching, which
+    never builds the N x M matrix in crowds.
+
+    Same association as yolox.tracker.byte_tracker.BYTETracker, quirks
+    included (new tracks need a second match except on the first frame,
+    removed lost tracks stay matchable for one more frame). Labels follow
+    Tracker_ByteTrack: a track keeps the label of its most confident
+    detection since it was first output. Track ids start at 1 per tracker
+    instance (yolox shares one counter across the process).
+    """
+
+    def __init__(self, frame_skip, config, capacity=64):
+        frame_rate = 30/frame_skip  # Assuming 30 FPS original for the video
+        self.track_thresh = config["track_thresh"]
+        self.match_thresh = config["match_thresh"]
+        self.mot20 = config["mot20"]
+        self.det_thresh = self.track_thresh + 0.1
+        self.max_time_lost = int(frame_rate / 30.0 * config["track_buffer"])
+        self.kalman_filter = BatchKalmanFilter()
+        self.assigner = Assigner(config.get("assignment", "lapjv"))
+
+        self.frame_id = 0
+        self.next_id = 1
+        self._allocate(capacity)
+        # Slot indices, in list order
+        self.tracked = np.empty(0, dtype=np.int64)
+        self.lost = np.empty(0, dtype=np.int64)
+
+    def _allocate(self, capacity):
+        """(Re)size the slot arrays, keeping the existing tracks"""
+        old = getattr(self, "mean", None)
+        size = 0 if old is None else len(old)
+        fields = {
+            "mean": np.zeros((capacity, 8)),
+            "covariance": np.zeros((capacity, 8, 8)),
+            "track_id": np.zeros(capacity, dtype=np.int64),
+            "state": np.zeros(capacity, dtype=np.int8),
+            "activated": np.zeros(capacity, dtype=bool),
+            "score": np.zeros(capacity),
+            "label": np.full(capacity, -1, dtype=np.int64),
+            "label_score": np.full(capacity, np.nan),
+            "last_frame": np.zeros(capacity, dtype=np.int64),
+            "start_frame": np.zeros(capacity, dtype=np.int64),
+            # Was marked removed (yolox keeps such ids in removed_stracks)
+            "removed": np.zeros(capacity, dtype=bool),
+            # Detection the track was updated with this frame (-1 = none)
+            "det_index": np.full(capacity, -1, dtype=np.int64),
+            "in_use": np.zeros(capacity, dtype=bool),
+        }
+        for name, array in fields.items():
+            if size:
+                array[:size] = getattr(self, name)
+            setattr(self, name, array)
+
+    def _new_slots(self, count):
+        free = np.flatnonzero(~self.in_use)
+        if len(free) < count:
+            capacity = len(self.in_use)
+            self._allocate(max(2 * capacity, capacity + count))
+            free = np.flatnonzero(~self.in_use)
+        slots = free[:count]
+        self.in_use[slots] = True
+        return slots
+
+    def tlbr(self, slots):
+        """(N, 4) x1, y1, x2, y2 boxes of the tracks"""
+        tlwh = self.tlwh(slots)
+        tlwh[:, 2:] += tlwh[:, :2]
+        return tlwh
+
+    def tlwh(self, slots):
+        """(N, 4) top-left, width, height boxes of the tracks"""
+        center_x, center_y, aspect, height = self.mean[slots, :4].T
+        width = aspect * height
+        return np.stack([center_x - width / 2, center_y - height / 2, width, height], axis=1)
+
+    @staticmethod
+    def _xyah(boxes):
+        """tlbr detection boxes -> center x, center y, aspect, height"""
+        width = boxes[:, 2] - boxes[:, 0]
+        height = boxes[:, 3] - boxes[:, 1]
+        return np.stack(
+            [boxes[:, 0] + width / 2, boxes[:, 1] + height / 2, width / height, height], axis=1
+        )
+
+    def _predict(self, slots):
+        """Kalman predict; tracks not in the Tracked state get no height velocity"""
+        if len(slots) == 0:
+            return
+        mean = self.mean[slots].copy()
+        mean[self.state[slots] != TRACKED, 7] = 0
+        self.mean[slots], self.covariance[slots] = self.kalman_filter.predict(
+            mean, self.covariance[slots]
+        )
+
+    def _update_tracks(self, slots, det_indices, boxes, scores):
+        """Kalman update of the tracks with their matched detections"""
+        if len(slots) == 0:
+            return
+        self.mean[slots], self.covariance[slots] = self.kalman_filter.update(
+            self.mean[slots], self.covariance[slots], self._xyah(boxes[det_indices])
+        )
+        self.state[slots] = TRACKED
+        self.activated[slots] = True
+        self.last_frame[slots] = self.frame_id
+        self.score[slots] = scores[det_indices]
+        self.det_index[slots] = det_indices
+
+    def _match(self, slots, boxes, scores, det_indices, thresh, fuse):
+        return self.assigner.match(
+            self.tlbr(slots), boxes[det_indices], thresh, scores[det_indices] if fuse else None
+        )
+
+    def update(self, frame, detections):
+        if len(detections) == 0:
+            return Tracks.empty()
+
+        det_boxes, det_scores, det_labels = detections.numpy()
+        det_boxes = det_boxes.astype(np.float64)
+        det_scores = det_scores.astype(np.float64)
+
+        self.frame_id += 1
+        self.det_index[:] = -1
+
+        high = np.flatnonzero(det_scores > self.track_thresh)
+        second = np.flatnonzero((det_scores > 0.1) & (det_scores < self.track_thresh))
+
+        confirmed = self.tracked[self.activated[self.tracked]]
+        unconfirmed = self.tracked[~self.activated[self.tracked]]
+
+        # Step 2: confirmed + lost tracks against high-score detections
+        pool = np.concatenate([confirmed, self.lost])
+        self._predict(pool)
+        matches, u_track, u_detection = self._match(
+            pool, det_boxes, det_scores, high, self.match_thresh, not self.mot20
+        )
+        matched_slots = pool[matches[:, 0]]
+        refind = matched_slots[self.state[matched_slots] != TRACKED]
+        self._update_tracks(matched_slots, high[matches[:, 1]], det_boxes, det_scores)
+
+        # Step 3: remaining tracked tracks against low-score detections
+        remaining = pool[u_track]
+        remaining = remaining[self.state[remaining] == TRACKED]
+        matches, u_track, _ = self._match(remaining, det_boxes, det_scores, second, 0.5, False)
+        self._update_tracks(
+            remaining[matches[:, 0]], second[matches[:, 1]], det_boxes, det_scores
+        )
+        new_lost = remaining[u_track]
+        self.state[new_lost] = LOST
+
+        # Unconfirmed tracks (not predicted) against the left high-score detections
+        left = high[u_detection]
+        matches, u_unconfirmed, u_detection = self._match(
+            unconfirmed, det_boxes, det_scores, left, 0.7, not self.mot20
+        )
+        self._update_tracks(
+            unconfirmed[matches[:, 0]], left[matches[:, 1]], det_boxes, det_scores
+        )
+        removed_now = [unconfirmed[u_unconfirmed]]
+        self.state[unconfirmed[u_unconfirmed]] = REMOVED
+
+        # Step 4: new tracks from confident unmatched detections
+        new_dets = left[u_detection]
+        new_dets = new_dets[det_scores[new_dets] >= self.det_thresh]
+        new_slots = self._new_slots(len(new_dets))
+        if len(new_slots):
+            self.mean[new_slots], self.covariance[new_slots] = self.kalman_filter.initiate(
+                self._xyah(det_boxes[new_dets])
+            )
+            self.track_id[new_slots] = np.arange(self.next_id, self.next_id + len(new_slots))
+            self.next_id += len(new_slots)
+            self.state[new_slots] = TRACKED
+            self.activated[new_slots] = self.frame_id == 1
+            self.score[new_slots] = det_scores[new_dets]
+            self.label[new_slots] = -1
+            self.label_score[new_slots] = np.nan
+            self.last_frame[new_slots] = self.frame_id
+            self.start_frame[new_slots] = self.frame_id
+            self.removed[new_slots] = False
+            self.det_index[new_slots] = new_dets
+
+        # Step 5: lost tracks past the buffer are removed
+        expired = self.lost[self.frame_id - self.last_frame[self.lost] > self.max_time_lost]
+        self.state[expired] = REMOVED
+        removed_now.append(expired)
+
+        # Same list bookkeeping as BYTETracker
+        tracked = self.tracked[self.state[self.tracked] == TRACKED]
+        tracked = np.concatenate([tracked, new_slots, refind])
+        lost = self.lost[~np.isin(self.lost, tracked)]
+        lost = np.concatenate([lost, new_lost])
+        # Only tracks removed in earlier frames leave the lost list
+        lost = lost[~self.removed[lost]]
+        self.removed[np.concatenate(removed_now)] = True
+        self.tracked, self.lost = self._remove_duplicates(tracked, lost)
+
+        self.in_use[:] = False
+        self.in_use[self.tracked] = True
+        self.in_use[self.lost] = True
+
+        output = self.tracked[self.activated[self.tracked]]
+        self._assign_labels(output, self.det_index[output], det_labels)
+        return self._tracks(output)
+
+    def _remove_duplicates(self, tracked, lost):
+        """Of a tracked and a lost track overlapping, keep the older one"""
+        if len(tracked) == 0 or len(lost) == 0:
+            return tracked, lost
+        pairs_p, pairs_q, iou = self.assigner.overlaps(self.tlbr(tracked), self.tlbr(lost))
+        duplicate = 1 - iou < 0.15
+        pairs_p, pairs_q = pairs_p[duplicate], pairs_q[duplicate]
+        age_p = self.last_frame[tracked[pairs_p]] - self.start_frame[tracked[pairs_p]]
+        age_q = self.last_frame[lost[pairs_q]] - self.start_frame[lost[pairs_q]]
+        keep_tracked = np.ones(len(tracked), dtype=bool)
+        keep_lost = np.ones(len(lost), dtype=bool)
+        keep_lost[pairs_q[age_p > age_q]] = False
+        keep_tracked[pairs_p[age_p <= age_q]] = False
+        return tracked[keep_tracked], lost[keep_lost]
+
+    def _assign_labels(self, slots, det_indices, det_labels):
+        """Keep the label of the most confident detection of each track"""
+        updated = det_indices >= 0
+        slots, det_indices = slots[updated], det_indices[updated]
+        scores = self.score[slots]
+        # NaN label score: first time the track is output
+        better = np.isnan(self.label_score[slots]) | (scores > self.label_score[slots])
+        slots, det_indices = slots[better], det_indices[better]
+        self.label[slots] = det_labels[det_indices]
+        self.label_score[slots] = self.score[slots]
+
+    def _tracks(self, slots):
+        """Output Tracks of confirmed slots"""
+        return Tracks(
+            self.track_id[slots], self.tlbr(slots), self.score[slots],
+            self.label[slots], np.ones(len(slots), dtype=bool),
+        )
+
+    def predict(self, frame):
+        """Advance the tracks one frame with the Kalman prediction only (no detections)"""
+        self.frame_id += 1
+        self._predict(np.concatenate([self.tracked, self.lost]))
+        return self._tracks(self.tracked[self.activated[self.tracked]])
@@ -1,22 +1,41 @@
 # -*- coding: utf-8 -*-
+import numpy as np
 from deep_sort_realtime.deepsort_tracker import DeepSort
 
+from src.modules.utils.detections import Tracks
+
 class Tracker_DeepSort:
     def __init__(self, config_tracker):
         """Handles object tracking using DeepSORT algorithm"""
         self.config_tracker = config_tracker
         self.tracker = DeepSort(**self.config_tracker)
 
-    def update(self, frame, boxes, scores, labels):
-        # Convert detections to DeepSORT format - [x1,y1,w,h]
-        detections = []
-        for box, score, label in zip(boxes, scores, labels):
-            x1, y1, x2, y2 = box.tolist()
-            w = x2 - x1
-            h = y2 - y1
-            detections.append(([x1, y1, w, h], score.item(), label.item()))
+    def update(self, frame, detections):
+        # Convert detections to DeepSORT format - ([x1,y1,w,h], score, class)
+        boxes, scores, labels = detections.numpy()
+        ltwh = boxes.astype(np.float64)
+        ltwh[:, 2:] -= ltwh[:, :2]
+        detections = list(zip(ltwh.tolist(), scores.tolist(), labels.tolist()))
 
         # Update tracks
         tracks = self.tracker.update_tracks(detections, frame=frame)
 
-        return tracks
\ No newline at end of file
+        return self.to_tracks(tracks)
+
+    def predict(self, frame):
+        """Advance the tracks one frame with the Kalman prediction only (no detections)"""
+        self.tracker.tracker.predict()
+        return self.to_tracks(self.tracker.tracker.tracks)
+
+    @staticmethod
+    def to_tracks(tracks):
+        """DeepSORT Track list -> Tracks"""
+        return Tracks(
+            # Ids are strings ("<n>", or "<date>_<n>" with the `today` option)
+            [int(str(track.track_id).rsplit("_", 1)[-1]) for track in tracks],
+            [track.to_ltrb() for track in tracks],
+            # det_conf is None when the track was not matched this frame
+            [np.nan if track.det_conf is None else track.det_conf for track in tracks],
+            [-1 if track.det_class is None else track.det_class for track in tracks],
+            [track.is_confirmed() for track in tracks],
+        )
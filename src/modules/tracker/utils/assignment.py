@@ -0,0 +1,205 @@
+import lap
+import numpy as np
+from scipy.sparse import coo_matrix
+from scipy.sparse.csgraph import connected_components
+
+from src.modules.tracker.utils.matching import fuse_score, iou_distance, iou_matrix, pair_iou
+
+
+def linear_assignment(cost_matrix, thresh):
+    """(matches (K, 2), unmatched rows, unmatched columns), pairs costing > thresh unmatched"""
+    rows, cols = cost_matrix.shape
+    if cost_matrix.size == 0:
+        return np.empty((0, 2), dtype=np.int64), np.arange(rows), np.arange(cols)
+
+    _, x, y = lap.lapjv(cost_matrix, extend_cost=True, cost_limit=thresh)
+    matched = np.flatnonzero(x >= 0)
+    matches = np.stack([matched, x[matched]], axis=1).astype(np.int64)
+    return matches, np.flatnonzero(x < 0), np.flatnonzero(y < 0)
+
+
+def sparse_assignment(rows, cols, costs, shape, thresh):
+    """
+    Exact assignment over candidate pairs (all costing <= thresh).
+
+    Pairs outside the candidates cost more than leaving both sides
+    unmatched, so the problem splits into the connected components of the
+    candidate graph. Components with a single row or a single column take
+    their cheapest pair (vectorised), the others are solved with LAPJV on
+    their own small dense matrix.
+    """
+    n_rows, n_cols = shape
+    if len(rows) == 0:
+        return np.empty((0, 2), dtype=np.int64), np.arange(n_rows), np.arange(n_cols)
+
+    # Bipartite graph: rows are nodes 0..n_rows-1, columns n_rows..
+    graph = coo_matrix(
+        (np.ones(len(rows)), (rows, cols + n_rows)), shape=(n_rows + n_cols,) * 2
+    )
+    n_components, component = connected_components(graph, directed=False)
+    rows_per_component = np.bincount(component[:n_rows], minlength=n_components)
+    cols_per_component = np.bincount(component[n_rows:], minlength=n_components)
+    pair_component = component[rows]
+    star = (
+        (rows_per_component[pair_component] == 1) | (cols_per_component[pair_component] == 1)
+    )
+
+    # Stars: cheapest pair of each component
+    stars = np.flatnonzero(star)
+    stars = stars[np.lexsort((costs[stars], pair_component[stars]))]
+    best = stars[np.diff(pair_component[stars], prepend=-1) != 0]
+    matches = [np.stack([rows[best], cols[best]], axis=1)]
+
+    # Position of every row and column inside its component
+    row_order, row_start, local_row = _component_layout(component[:n_rows], rows_per_component)
+    col_order, col_start, local_col = _component_layout(component[n_rows:], cols_per_component)
+
+    multi = np.flatnonzero(~star)
+    multi = multi[np.argsort(pair_component[multi], kind="stable")]
+    bounds = np.flatnonzero(np.diff(pair_component[multi], prepend=-1, append=-1))
+    for begin, end in zip(bounds[:-1].tolist(), bounds[1:].tolist()):
+        group = multi[begin:end]
+        index = pair_component[group[0]]
+        # Missing pairs cost more than leaving both sides unmatched
+        cost = np.full((rows_per_component[index], cols_per_component[index]), thresh + 1.0)
+        cost[local_row[rows[group]], local_col[cols[group]]] = costs[group]
+        _, x, _ = lap.lapjv(cost, extend_cost=True, cost_limit=thresh)
+        matched = np.flatnonzero(x >= 0)
+        matches.append(np.stack([
+            row_order[row_start[index] + matched], col_order[col_start[index] + x[matched]]
+        ], axis=1))
+    return _finish(np.concatenate(matches).astype(np.int64), n_rows, n_cols)
+
+
+def _component_layout(component, sizes):
+    """Nodes sorted by component, start of each component, local index of each node"""
+    order = np.argsort(component, kind="stable")
+    start = np.cumsum(sizes) - sizes
+    local = np.empty(len(component), dtype=np.int64)
+    local[order] = np.arange(len(component)) - start[component[order]]
+    return order, start, local
+
+
+def greedy_assignment(rows, cols, costs, shape, thresh):
+    """Approximate assignment: take the cheapest free pair first"""
+    n_rows, n_cols = shape
+    order = np.lexsort((cols, rows, costs))
+    row_free = np.ones(n_rows, dtype=bool)
+    col_free = np.ones(n_cols, dtype=bool)
+    matches = []
+    for row, col in zip(rows[order].tolist(), cols[order].tolist()):
+        if row_free[row] and col_free[col]:
+            row_free[row] = col_free[col] = False
+            matches.append((row, col))
+    return _finish(np.array(matches, dtype=np.int64).reshape(-1, 2), n_rows, n_cols)
+
+
+def _finish(matches, n_rows, n_cols):
+    """Matches by row (as LAPJV returns them) and the unmatched rows and columns"""
+    matches = matches[np.argsort(matches[:, 0], kind="stable")]
+    unmatched_rows = np.setdiff1d(np.arange(n_rows), matches[:, 0])
+    unmatched_cols = np.setdiff1d(np.arange(n_cols), matches[:, 1])
+    return matches, unmatched_rows, unmatched_cols
+
+
+def grid_pairs(boxes_a, boxes_b, cell_size=None):
+    """
+    Candidate (rows, cols) of overlapping tlbr boxes, without an N x M matrix.
+
+    Boxes are binned into a uniform grid (cells about twice the median box
+    size) and only boxes sharing a cell are paired. Every overlapping pair
+    shares a cell, so no overlap is missed. Boxes are grown by one pixel to
+    follow the +1 convention of iou_matrix.
+    """
+    boxes_a = np.asarray(boxes_a, dtype=np.float64).reshape(-1, 4)
+    boxes_b = np.asarray(boxes_b, dtype=np.float64).reshape(-1, 4)
+    empty = np.empty(0, dtype=np.int64)
+    if len(boxes_a) == 0 or len(boxes_b) == 0:
+        return empty, empty
+
+    boxes = np.concatenate([boxes_a, boxes_b])
+    if cell_size is None:
+        cell_size = max(2.0 * float(np.median(boxes[:, 2:] - boxes[:, :2])), 1.0)
+    origin = boxes[:, :2].min(axis=0)
+    first = np.floor((boxes[:, :2] - origin) / cell_size).astype(np.int64)
+    last = np.maximum(np.floor((boxes[:, 2:] + 1 - origin) / cell_size).astype(np.int64), first)
+    grid_width = int(last[:, 0].max()) + 1
+
+    # One (cell, box) entry per cell a box covers
+    spans = last - first + 1
+    counts = spans[:, 0] * spans[:, 1]
+    box_index = np.repeat(np.arange(len(boxes)), counts)
+    offset = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    cell_x = first[box_index, 0] + offset % spans[box_index, 0]
+    cell_y = first[box_index, 1] + offset // spans[box_index, 0]
+    cell = cell_y * grid_width + cell_x
+
+    in_a = box_index < len(boxes_a)
+    cell_a, index_a = cell[in_a], box_index[in_a]
+    order = np.argsort(cell[~in_a], kind="stable")
+    cell_b, index_b = cell[~in_a][order], box_index[~in_a][order] - len(boxes_a)
+
+    # Join the entries of A and B on their cell
+    start = np.searchsorted(cell_b, cell_a, side="left")
+    pair_counts = np.searchsorted(cell_b, cell_a, side="right") - start
+    rows = np.repeat(index_a, pair_counts)
+    shift = np.repeat(start - (np.cumsum(pair_counts) - pair_counts), pair_counts)
+    cols = index_b[np.arange(pair_counts.sum()) + shift]
+
+    # Boxes sharing several cells give the same pair several times
+    keys = np.unique(rows * len(boxes_b) + cols)
+    return keys // len(boxes_b), keys % len(boxes_b)
+
+
+class Assigner:
+    """
+    IoU track/detection assignment for the trackers.
+
+    Methods:
+    - "lapjv": exact LAPJV on the dense N x M IoU cost matrix.
+    - "sparse": exact as well. Candidate pairs are gated with grid_pairs
+      and each connected component is solved on its own (same matches as
+      "lapjv" up to ties). It never builds the dense matrix.
+    - "greedy": the same gated pairs, matched cheapest first. Faster, but
+      it can differ from the optimum in ambiguous crowds.
+
+    Non-overlapping pairs cost 1 and are never matched (thresholds are
+    below 1), so gating them away does not change the result.
+    """
+
+    METHODS = ("lapjv", "sparse", "greedy")
+
+    def __init__(self, method="lapjv"):
+        if method not in self.METHODS:
+            raise ValueError(f"Unsupported assignment: {method} (one of {self.METHODS})")
+        self.method = method
+
+    def overlaps(self, boxes_a, boxes_b):
+        """(rows, cols, iou) of the overlapping tlbr box pairs"""
+        if self.method == "lapjv":
+            iou = iou_matrix(boxes_a, boxes_b)
+            rows, cols = np.nonzero(iou > 0)
+            return rows, cols, iou[rows, cols]
+        rows, cols = grid_pairs(boxes_a, boxes_b)
+        iou = pair_iou(boxes_a, boxes_b, rows, cols)
+        keep = iou > 0
+        return rows[keep], cols[keep], iou[keep]
+
+    def match(self, boxes_a, boxes_b, thresh, scores=None):
+        """
+        Match tlbr boxes A (tracks) to B (detections) on 1 - IoU, or on
+        1 - IoU * score when detection scores are given (score fusion).
+        Returns (matches (K, 2), unmatched rows, unmatched columns).
+        """
+        shape = (len(boxes_a), len(boxes_b))
+        if self.method == "lapjv":
+            cost = iou_distance(boxes_a, boxes_b)
+            if scores is not None:
+                cost = fuse_score(cost, scores)
+            return linear_assignment(cost, thresh)
+
+        rows, cols, iou = self.overlaps(boxes_a, boxes_b)
+        costs = 1 - (iou if scores is None else iou * scores[cols])
+        keep = costs <= thresh
+        solver = sparse_assignment if self.method == "sparse" else greedy_assignment
+        return solver(rows[keep], cols[keep], costs[keep], shape, thresh)
@@ -0,0 +1,87 @@
+import numpy as np
+
+
+class BatchKalmanFilter:
+    """
+    Constant-velocity Kalman filter on (x, y, a, h) boxes, for many tracks at once.
+
+    Same model and noise as the ByteTrack/DeepSORT filter: the state is
+    (x, y, a, h, vx, vy, va, vh), with x, y the box center, a the aspect
+    ratio w / h and h the height. Every method takes stacked arrays, means
+    (N, 8) and covariances (N, 8, 8), and returns new ones.
+    """
+
+    def __init__(self):
+        ndim, dt = 4, 1.0
+        self._motion_mat = np.eye(2 * ndim)
+        self._motion_mat[:ndim, ndim:] = dt * np.eye(ndim)
+        self._std_weight_position = 1.0 / 20
+        self._std_weight_velocity = 1.0 / 160
+
+    def initiate(self, measurements):
+        """Means and covariances of new tracks from (N, 4) xyah measurements"""
+        measurements = np.asarray(measurements, dtype=np.float64).reshape(-1, 4)
+        mean = np.concatenate([measurements, np.zeros_like(measurements)], axis=1)
+        height = measurements[:, 3]
+        ones = np.ones_like(height)
+        std = np.stack([
+            2 * self._std_weight_position * height,
+            2 * self._std_weight_position * height,
+            1e-2 * ones,
+            2 * self._std_weight_position * height,
+            10 * self._std_weight_velocity * height,
+            10 * self._std_weight_velocity * height,
+            1e-5 * ones,
+            10 * self._std_weight_velocity * height,
+        ], axis=1)
+        return mean, self._diag(np.square(std))
+
+    def predict(self, mean, covariance):
+        """One time step for every track"""
+        height = mean[:, 3]
+        ones = np.ones_like(height)
+        std = np.stack([
+            self._std_weight_position * height,
+            self._std_weight_position * height,
+            1e-2 * ones,
+            self._std_weight_position * height,
+            self._std_weight_velocity * height,
+            self._std_weight_velocity * height,
+            1e-5 * ones,
+            self._std_weight_velocity * height,
+        ], axis=1)
+        mean = mean @ self._motion_mat.T
+        covariance = self._motion_mat @ covariance @ self._motion_mat.T
+        return mean, covariance + self._diag(np.square(std))
+
+    def update(self, mean, covariance, measurements):
+        """Correct every track with its (N, 4) xyah measurement"""
+        height = mean[:, 3]
+        std = np.stack([
+            self._std_weight_position * height,
+            self._std_weight_position * height,
+            np.full_like(height, 1e-1),
+            self._std_weight_position * height,
+        ], axis=1)
+        # Projection to measurement space: the first 4 state components
+        projected_mean = mean[:, :4]
+        projected_cov = covariance[:, :4, :4] + self._diag(np.square(std))
+
+        # K = P H^T S^-1, solved for all tracks at once (S is symmetric)
+        cross_cov = covariance[:, :, :4]
+        kalman_gain = np.linalg.solve(
+            projected_cov, cross_cov.transpose(0, 2, 1)
+        ).transpose(0, 2, 1)
+
+        innovation = measurements - projected_mean
+        new_mean = mean + np.einsum("nij,nj->ni", kalman_gain, innovation)
+        new_covariance = covariance - kalman_gain @ projected_cov @ kalman_gain.transpose(0, 2, 1)
+        return new_mean, new_covariance
+
+    @staticmethod
+    def _diag(values):
+        """(N, D) -> (N, D, D) diagonal matrices"""
+        matrices = np.zeros(values.shape + values.shape[-1:])
+        index = np.arange(values.shape[-1])
+        matrices[:, index, index] = values
+        return matrices
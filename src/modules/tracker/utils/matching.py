@@ -0,0 +1,56 @@
+import numpy as np
+
+
+def iou_matrix(boxes_a, boxes_b):
+    """
+    Pairwise IoU of (N, 4) and (M, 4) tlbr boxes.
+
+    Uses the same pixel convention as cython_bbox (used by the yolox
+    ByteTrack): widths and heights are x2 - x1 + 1.
+    """
+    boxes_a = np.asarray(boxes_a, dtype=np.float64).reshape(-1, 4)
+    boxes_b = np.asarray(boxes_b, dtype=np.float64).reshape(-1, 4)
+    if len(boxes_a) == 0 or len(boxes_b) == 0:
+        return np.zeros((len(boxes_a), len(boxes_b)))
+
+    area_a = (boxes_a[:, 2] - boxes_a[:, 0] + 1) * (boxes_a[:, 3] - boxes_a[:, 1] + 1)
+    area_b = (boxes_b[:, 2] - boxes_b[:, 0] + 1) * (boxes_b[:, 3] - boxes_b[:, 1] + 1)
+    width = (
+        np.minimum(boxes_a[:, None, 2], boxes_b[None, :, 2])
+        - np.maximum(boxes_a[:, None, 0], boxes_b[None, :, 0]) + 1
+    ).clip(min=0)
+    height = (
+        np.minimum(boxes_a[:, None, 3], boxes_b[None, :, 3])
+        - np.maximum(boxes_a[:, None, 1], boxes_b[None, :, 1]) + 1
+    ).clip(min=0)
+    intersection = width * height
+    union = area_a[:, None] + area_b[None, :] - intersection
+    return np.where(intersection > 0, intersection / union, 0.0)
+
+
+def pair_iou(boxes_a, boxes_b, rows, cols):
+    """IoU of the box pairs (boxes_a[rows], boxes_b[cols]), same convention as iou_matrix"""
+    box_a = np.asarray(boxes_a, dtype=np.float64).reshape(-1, 4)[rows]
+    box_b = np.asarray(boxes_b, dtype=np.float64).reshape(-1, 4)[cols]
+    area_a = (box_a[:, 2] - box_a[:, 0] + 1) * (box_a[:, 3] - box_a[:, 1] + 1)
+    area_b = (box_b[:, 2] - box_b[:, 0] + 1) * (box_b[:, 3] - box_b[:, 1] + 1)
+    width = (
+        np.minimum(box_a[:, 2], box_b[:, 2]) - np.maximum(box_a[:, 0], box_b[:, 0]) + 1
+    ).clip(min=0)
+    height = (
+        np.minimum(box_a[:, 3], box_b[:, 3]) - np.maximum(box_a[:, 1], box_b[:, 1]) + 1
+    ).clip(min=0)
+    intersection = width * height
+    return np.where(intersection > 0, intersection / (area_a + area_b - intersection), 0.0)
+
+
+def iou_distance(boxes_a, boxes_b):
+    """1 - IoU cost matrix"""
+    return 1 - iou_matrix(boxes_a, boxes_b)
+
+
+def fuse_score(cost_matrix, scores):
+    """Weight the IoU similarity by the detection scores"""
+    if cost_matrix.size == 0:
+        return cost_matrix
+    return 1 - (1 - cost_matrix) * scores[None, :]
@@ -0,0 +1,118 @@
+import numpy as np
+import torch
+
+
+class Detections:
+    """
+    Detections of one frame as a struct of arrays, on the detector device:
+    - boxes: (N, 4) float32 x1, y1, x2, y2
+    - scores: (N,) float32
+    - class_ids: (N,) int64
+
+    Tensors already in these dtypes are kept as they are (no copy).
+    numpy() gives views of the same memory when the tensors are on the CPU,
+    so the trackers read the arrays without per-box conversions.
+    """
+
+    __slots__ = ("boxes", "scores", "class_ids")
+
+    def __init__(self, boxes, scores, class_ids):
+        self.boxes = boxes.reshape(-1, 4).float().contiguous()
+        self.scores = scores.reshape(-1).float().contiguous()
+        self.class_ids = class_ids.reshape(-1).long().contiguous()
+
+    @classmethod
+    def empty(cls, device="cpu"):
+        return cls(
+            torch.empty((0, 4), device=device),
+            torch.empty(0, device=device),
+            torch.empty(0, dtype=torch.long, device=device),
+        )
+
+    @classmethod
+    def cat(cls, detections):
+        """One frame's detections from several parts (windows, tiles)"""
+        return cls(
+            torch.cat([part.boxes for part in detections]),
+            torch.cat([part.scores for part in detections]),
+            torch.cat([part.class_ids for part in detections]),
+        )
+
+    def __len__(self):
+        return len(self.scores)
+
+    @property
+    def device(self):
+        return self.scores.device
+
+    def select(self, index):
+        """Detections at a boolean mask or index tensor"""
+        return Detections(self.boxes[index], self.scores[index], self.class_ids[index])
+
+    def to(self, device):
+        return Detections(self.boxes.to(device), self.scores.to(device), self.class_ids.to(device))
+
+    def numpy(self):
+        """(boxes, scores, class_ids) NumPy arrays (views of CPU tensors)"""
+        return tuple(
+            tensor.detach().cpu().numpy()
+            for tensor in (self.boxes, self.scores, self.class_ids)
+        )
+
+
+class Tracks:
+    """
+    Tracks output by a tracker for one frame as a struct of NumPy arrays:
+    - track_ids: (N,) int64
+    - boxes: (N, 4) float32 x1, y1, x2, y2
+    - scores: (N,) float32 score of the last matched detection (NaN if unknown)
+    - class_ids: (N,) int64, -1 while the track has no class yet
+    - confirmed: (N,) bool, tentative tracks are neither counted nor drawn
+
+    The arrays are built per frame and never updated afterwards, so a Tracks
+    object can be handed to another thread as it is. torch() gives tensor
+    views of the same memory.
+    """
+
+    __slots__ = ("track_ids", "boxes", "scores", "class_ids", "confirmed")
+
+    def __init__(self, track_ids, boxes, scores, class_ids, confirmed):
+        self.track_ids = np.ascontiguousarray(track_ids, dtype=np.int64).reshape(-1)
+        self.boxes = np.ascontiguousarray(boxes, dtype=np.float32).reshape(-1, 4)
+        self.scores = np.ascontiguousarray(scores, dtype=np.float32).reshape(-1)
+        self.class_ids = np.ascontiguousarray(class_ids, dtype=np.int64).reshape(-1)
+        self.confirmed = np.ascontiguousarray(confirmed, dtype=bool).reshape(-1)
+
+    @classmethod
+    def empty(cls):
+        return cls([], [], [], [], [])
+
+    def __len__(self):
+        return len(self.track_ids)
+
+    def select(self, index):
+        """Tracks at a boolean mask or index array"""
+        return Tracks(
+            self.track_ids[index], self.boxes[index], self.scores[index],
+            self.class_ids[index], self.confirmed[index],
+        )
+
+    def active(self):
+        """Confirmed tracks that have a class"""
+        return self.select(self.confirmed & (self.class_ids >= 0))
+
+    def centers(self):
+        """(N, 4) float64 center x, center y, width, height"""
+        boxes = self.boxes.astype(np.float64)
+        return np.concatenate(
+            [(boxes[:, :2] + boxes[:, 2:]) / 2, boxes[:, 2:] - boxes[:, :2]], axis=1
+        )
+
+    def torch(self):
+        """(track_ids, boxes, scores, class_ids, confirmed) tensors sharing the arrays"""
+        return tuple(
+            torch.from_numpy(array)
+            for array in (
+                self.track_ids, self.boxes, self.scores, self.class_ids, self.confirmed
+            )
+        )
@@ -31,6 +31,16 @@ class ParseArguments:
             "--video", type=str, required=True, help="Path to input video")
         parser.add_argument(
             "--output", type=str, default="output.mp4", help="Path to save output video")
+        parser.add_argument(
+            "--lines", type=str, help="Path to the counting lines JSON file")
+        parser.add_argument(
+            "--read-mode", type=str, choices=["read", "grab", "seek", "keyframe"],
+            help="How skipped frames are read from the video"
+        )
+        parser.add_argument(
+            "--reduced-decode", type=ParseArguments.str_to_bool,
+            help="Decode frames at the model input size in headless runs"
+        )
         # Video Processor Arguments
         parser.add_argument(
             "--frame-skip", type=int, help="frames to skip for processing")
@@ -51,9 +61,59 @@ class ParseArguments:
         parser.add_argument(
             "--enable-drawer", type=ParseArguments.str_to_bool, help="Enable drawer"
         )
+        parser.add_argument(
+            "--pipeline", type=ParseArguments.str_to_bool,
+            help="Run decode/inference/tracking/rendering as pipelined stages"
+        )
+        parser.add_argument(
+            "--queue-size", type=int, help="Frames buffered between pipeline stages"
+        )
+        parser.add_argument(
+            "--batch-size", type=int, help="Sampled frames per detector forward pass"
+        )
+        parser.add_argument(
+            "--detection-cache", type=ParseArguments.str_to_bool,
+            help="Store/replay per-frame detections on disk"
+        )
+        parser.add_argument(
+            "--motion-gate", type=ParseArguments.str_to_bool,
+            help="Skip the detector on static frames (tracker prediction only, "
+                 "not with --detection-cache)"
+        )
+        parser.add_argument(
+            "--trace-export", type=ParseArguments.str_to_bool,
+            help="Write the per-stage spans as a Chrome/Perfetto trace in the summary directory"
+        )
+        parser.add_argument(
+            "--summary-dir", type=str, help="Directory of the summary files (default: Summary)"
+        )
+        parser.add_argument(
+            "--track-state-ttl", type=int,
+            help="Updates after which an unseen track's counting/label state is dropped"
+        )
+        parser.add_argument(
+            "--track-state-max-size", type=int,
+            help="Max tracks with counting/label state (least recently seen evicted)"
+        )
+        parser.add_argument(
+            "--warmup-iterations", type=int,
+            help="Detector runs on blank frames before the video (0: no warm-up)"
+        )
         # Model Arguments
         parser.add_argument(  
             "--model", type=str, default="yolo11s", help="Choose detection model")
+        parser.add_argument(
+            "--backend", type=str, choices=["torch", "onnx"],
+            help="Inference backend (onnx: exported once, run with ONNX Runtime on the CPU)"
+        )
+        parser.add_argument(
+            "--precision", type=str, choices=["fp32", "int8"],
+            help="Model precision (int8: quantized ONNX model, calibrated on our videos)"
+        )
+        parser.add_argument(
+            "--model-artifacts", type=ParseArguments.str_to_bool,
+            help="Load the prepared model serialized on the first run (off by default)"
+        )
 
         return parser.parse_args()
     
@@ -63,6 +123,9 @@ class ParseArguments:
 
         config.set("video", "input_path", args.video)
         config.set("video", "output_path", args.output)
+        config.set("video", "lines_path", args.lines)
+        config.set("video", "read_mode", args.read_mode)
+        config.set("video", "reduced_decode", args.reduced_decode)
         config.set("processor", "frame_skip", args.frame_skip)
         config.set("processor", "tracker", args.tracker)
         config.set("processor", "enable_tracking", args.enable_tracking)
@@ -71,6 +134,19 @@ class ParseArguments:
         config.set("processor", "enable_save", args.enable_save)
         config.set("processor", "enable_drawer", args.enable_drawer)
         config.set("processor", "model", args.model)    
+        config.set("processor", "pipeline", args.pipeline)
+        config.set("processor", "queue_size", args.queue_size)
+        config.set("processor", "batch_size", args.batch_size)
+        config.set("processor", "motion_gate", args.motion_gate)
+        config.set("processor", "trace_export", args.trace_export)
+        config.set("processor", "summary_dir", args.summary_dir)
+        config.set("processor", "track_state_ttl", args.track_state_ttl)
+        config.set("processor", "track_state_max_size", args.track_state_max_size)
+        config.set("processor", "warmup_iterations", args.warmup_iterations)
+        config.set("detector", "cache_enabled", args.detection_cache)
+        config.set("runtime", "backend", args.backend)
+        config.set("runtime", "precision", args.precision)
+        config.set("artifacts", "enabled", args.model_artifacts)
         # Show updated processor configuration
         updated_processor_config = config.sub_configs.get("processor", {}).get(
             "processor", {})
@@ -0,0 +1,97 @@
+from collections import OrderedDict
+
+
+class TrackStateStore:
+    """
+    Bounded per-track state, keyed by track id.
+
+    Every entry keeps the time it was last seen (any increasing clock, the
+    callers use their frame counter). Entries are ordered least recently
+    seen first, so expiring and evicting only look at the front:
+    - remove(): the tracker dropped the track;
+    - expire(now): not seen for more than `ttl`;
+    - the `max_size` cap evicts the least recently seen entries, but never
+      one seen at the current time.
+    `on_evict(track_id, value)` is called for every entry that leaves the
+    store, so owners can free what the value refers to (e.g. array slots).
+    """
+
+    def __init__(self, ttl=None, max_size=None, on_evict=None):
+        self.ttl = ttl
+        self.max_size = max_size
+        self.on_evict = on_evict
+        # track_id -> [value, last_seen], least recently seen first
+        self._entries = OrderedDict()
+        self.peak = 0
+        self.expired = 0
+        self.evicted = 0
+        self.removed = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, track_id):
+        return track_id in self._entries
+
+    def get(self, track_id, default=None):
+        entry = self._entries.get(track_id)
+        return default if entry is None else entry[0]
+
+    def put(self, track_id, value, now):
+        """Set the value of a track and mark it seen at `now`"""
+        self._entries[track_id] = [value, now]
+        self._entries.move_to_end(track_id)
+        self._enforce_cap(now)
+        self.peak = max(self.peak, len(self._entries))
+
+    def touch(self, track_id, now):
+        """Mark a track seen at `now`"""
+        entry = self._entries.get(track_id)
+        if entry is not None:
+            entry[1] = now
+            self._entries.move_to_end(track_id)
+
+    def remove(self, track_id):
+        """Drop a track the tracker removed"""
+        entry = self._entries.pop(track_id, None)
+        if entry is not None:
+            self.removed += 1
+            self._evicted(track_id, entry[0])
+
+    def expire(self, now):
+        """Drop the tracks not seen for more than `ttl`"""
+        if self.ttl is None:
+            return
+        while self._entries:
+            track_id, (value, last_seen) = next(iter(self._entries.items()))
+            if now - last_seen <= self.ttl:
+                break
+            del self._entries[track_id]
+            self.expired += 1
+            self._evicted(track_id, value)
+
+    def _enforce_cap(self, now):
+        if self.max_size is None:
+            return
+        while len(self._entries) > self.max_size:
+            track_id, (value, last_seen) = next(iter(self._entries.items()))
+            if last_seen >= now:
+                # Everything left was seen now: over the cap until next time
+                break
+            del self._entries[track_id]
+            self.evicted += 1
+            self._evicted(track_id, value)
+
+    def _evicted(self, track_id, value):
+        if self.on_evict is not None:
+            self.on_evict(track_id, value)
+
+    def stats(self):
+        """Live, peak and dropped entry counters"""
+        return {
+            "live": len(self._entries),
+            "peak": self.peak,
+            "expired": self.expired,
+            "evicted": self.evicted,
+            "removed": self.removed,
+        }
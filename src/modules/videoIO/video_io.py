@@ -1,12 +1,152 @@
 import cv2
 
+try:
+    # Optional: keyframe-only reading and scaled decoding
+    import av
+except ImportError:
+    av = None
+
 class VideoReader:
-    def __init__(self, video_path):
+    def __init__(self, video_path, output_size=None):
+        """
+        :param output_size: Optional (width, height) of the frames produced by
+                            read_frames (e.g. the model resized size). Only the
+                            scaled frame is materialised when PyAV is installed.
+        """
+        self.video_path = video_path
+        self.output_size = tuple(output_size) if output_size else None
         self.cap = cv2.VideoCapture(video_path)
+        # Number of frames in the video, known once the end has been reached
+        self.end_frame = None
 
     def read_frame(self):
         return self.cap.read()
 
+    def grab_frame(self):
+        """Advance one frame without the color conversion/copy of read_frame"""
+        return self.cap.grab()
+
+    def read_frames(self, frame_skip=1, max_frame=None, mode="grab", seek_threshold=30):
+        """
+        Yield (frame_index, frame) for every `frame_skip`-th frame.
+
+        Modes:
+        - "read": decode and convert every frame (previous behaviour).
+        - "grab": skipped frames are only grabbed; retrieve (BGR conversion and
+          copy) runs for the sampled frames only.
+        - "seek": jump to each sampled frame; used automatically by "grab" when
+          frame_skip >= seek_threshold (skips larger than a GOP).
+        - "keyframe": decode keyframes only (requires PyAV); frames closer than
+          frame_skip to the previous one are dropped.
+
+        With output_size set, frames are produced at that size: PyAV converts
+        the decoded YUV picture straight to a scaled BGR frame (one swscale
+        pass in the decoder thread); without PyAV the frame is resized after
+        decoding.
+        """
+        if mode == "keyframe":
+            yield from self._read_keyframes(frame_skip, max_frame)
+        elif mode == "seek" or (mode == "grab" and frame_skip >= seek_threshold):
+            yield from self._resized(self._read_seek(frame_skip, max_frame))
+        elif self.output_size and av is not None:
+            yield from self._read_scaled(frame_skip, max_frame)
+        else:
+            yield from self._resized(
+                self._read_sequential(frame_skip, max_frame, grab=mode == "grab")
+            )
+
+    def _resized(self, frames):
+        """Resize decoded frames to output_size (fallback without PyAV)"""
+        if not self.output_size:
+            yield from frames
+            return
+        for frame_index, frame in frames:
+            yield frame_index, cv2.resize(
+                frame, self.output_size, interpolation=cv2.INTER_AREA
+            )
+
+    def _read_sequential(self, frame_skip, max_frame, grab):
+        frame_count = 0
+        while max_frame is None or frame_count <= max_frame:
+            if frame_count % frame_skip == 0 or not grab:
+                ret, frame = self.cap.read()
+            else:
+                ret, frame = self.cap.grab(), None
+            if not ret:
+                self.end_frame = frame_count
+                return
+
+            if frame_count % frame_skip == 0:
+                yield frame_count, frame
+            frame_count += 1
+
+    def _read_seek(self, frame_skip, max_frame):
+        total_frames = int(self.cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        frame_count = 0
+        while max_frame is None or frame_count <= max_frame:
+            if frame_count >= total_frames > 0:
+                self.end_frame = total_frames
+                return
+            self.cap.set(cv2.CAP_PROP_POS_FRAMES, frame_count)
+            ret, frame = self.cap.read()
+            if not ret:
+                self.end_frame = frame_count
+                return
+
+            yield frame_count, frame
+            frame_count += frame_skip
+
+    def _read_scaled(self, frame_skip, max_frame):
+        container = av.open(self.video_path)
+        try:
+            stream = container.streams.video[0]
+            stream.thread_type = "AUTO"
+            width, height = self.output_size
+
+            frame_count = 0
+            for frame in container.decode(stream):
+                if max_frame is not None and frame_count > max_frame:
+                    return
+                if frame_count % frame_skip == 0:
+                    # Scale + YUV->BGR in one pass, the full-size BGR frame is never built
+                    yield frame_count, frame.to_ndarray(
+                        width=width, height=height, format="bgr24"
+                    )
+                frame_count += 1
+            self.end_frame = frame_count
+        finally:
+            container.close()
+
+    def _read_keyframes(self, frame_skip, max_frame):
+        if av is None:
+            raise ImportError("Keyframe reading requires PyAV (pip install av)")
+
+        container = av.open(self.video_path)
+        try:
+            stream = container.streams.video[0]
+            # The decoder drops every non-keyframe before decoding it
+            stream.codec_context.skip_frame = "NONKEY"
+            fps = float(stream.average_rate or self.cap.get(cv2.CAP_PROP_FPS))
+
+            last_index = None
+            for frame in container.decode(stream):
+                frame_index = int(round(frame.time * fps)) if frame.time is not None else 0
+                if max_frame is not None and frame_index > max_frame:
+                    return
+                if last_index is not None and frame_index - last_index < frame_skip:
+                    continue
+                last_index = frame_index
+                if self.output_size:
+                    width, height = self.output_size
+                    yield frame_index, frame.to_ndarray(
+                        width=width, height=height, format="bgr24"
+                    )
+                else:
+                    yield frame_index, frame.to_ndarray(format="bgr24")
+            self.end_frame = int(self.cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        finally:
+            container.close()
+
     def video_parameters(self):
         fps = int(self.cap.get(cv2.CAP_PROP_FPS))
         width = int(self.cap.get(cv2.CAP_PROP_FRAME_WIDTH))
@@ -0,0 +1,47 @@
+# -*- coding: utf-8 -*-
+"""
+python3 -m src.sweep --video data/input/Video1a.mp4 --model yolo11s
+
+Runs the tracker/counter parameter grid from src/config/sweep.yaml over cached
+detections. Record the detections first (frame_skip 1 covers every sweep value):
+python3 -m src.main --video data/input/Video1a.mp4 --model yolo11s
+--frame-skip 1 --detection-cache True --enable-display False --enable-save False
+"""
+
+import argparse
+import logging
+from src.config.config import ConfigManager
+from src.main import MAX_FRAME, setup_logging
+from src.modules.engine.parameter_sweep import ParameterSweep
+from src.modules.utils.allowed_classes import AllowedClasses
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(
+        description="Tracker/counter parameter sweep over cached detections."
+    )
+    parser.add_argument("--video", type=str, help="Path to input video")
+    parser.add_argument("--model", type=str, help="Model used to record the detections")
+    parser.add_argument("--workers", type=int, help="Number of worker processes")
+    return parser.parse_args()
+
+
+def main():
+    setup_logging()
+
+    # Load configurations (not saved back, the sweep does not change them)
+    config = ConfigManager()
+    args = parse_arguments()
+    config.set("video", "input_path", args.video)
+    config.set("processor", "model", args.model)
+    config.set("sweep", "max_workers", args.workers)
+
+    class_names, allowed_classes = AllowedClasses(config).get_allowed_classes()
+
+    sweep = ParameterSweep(config, class_names, allowed_classes, MAX_FRAME)
+    sweep.run()
+    logging.info(f"Sweep summary exported to {sweep.output_file}")
+
+
+if __name__ == "__main__":
+    main()